@@ -1,20 +1,38 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
 import os
+import random
 import re
 import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional, Tuple
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
 from urllib.error import HTTPError, URLError
 from urllib.request import Request, urlopen
 
+# Caption fingerprints are shared with the scraper so both group repeats alike
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+from instagram_sponsor.fingerprint import CaptionIndex  # noqa: E402
+
 
 DEF_INPUT = "outputs/all.json"
 DEF_OUTPUT = "outputs/filtered.json"
 DEF_DEEPSEEK_BASE = "https://api.deepseek.com"
 DEF_DEEPSEEK_MODEL = "deepseek-chat"
+DEF_CACHE = "outputs/.classify_cache.json"
+DEF_WORKERS = 4
+DEF_BATCH_SIZE = 8
+# Per-post character cap inside a batched prompt
+BATCH_CONTENT_CHARS = 4000
+# Below this many profiles a process pool costs more than it saves
+PROCESS_MIN_PROFILES = 2000
 
 
 def load_env_file(path: str = ".env") -> None:
@@ -40,6 +58,7 @@ def load_env_file(path: str = ".env") -> None:
         pass
 
 
+@lru_cache(maxsize=4096)
 def _iso_to_dt(ts: str) -> Optional[datetime]:
     s = ts.strip()
     if not s:
@@ -70,7 +89,15 @@ def _relative_to_dt(s: str, now: Optional[datetime] = None) -> Optional[datetime
     """
     if not s:
         return None
-    now = now or datetime.now(timezone.utc)
+    age = _relative_age(s)
+    if age is None:
+        return None
+    return (now or datetime.now(timezone.utc)) - age
+
+
+@lru_cache(maxsize=4096)
+def _relative_age(s: str) -> Optional[timedelta]:
+    # Memoized: a corpus only holds a handful of distinct strings like "1yr •"
     m = _REL_RE.search(s)
     if not m:
         return None
@@ -93,7 +120,7 @@ def _relative_to_dt(s: str, now: Optional[datetime] = None) -> Optional[datetime
     else:
         return None
 
-    return now - timedelta(days=days)
+    return timedelta(days=days)
 
 
 def parse_timestamp_to_dt(ts: str, now: Optional[datetime] = None) -> Optional[datetime]:
@@ -144,20 +171,103 @@ KEYWORDS_RE = [
 ]
 
 
+# One precompiled word-boundary alternation over both keyword lists; longest
+# first so multi-word phrases win. Word boundaries stop "ai" matching "said".
+_KEYWORDS_MATCHER = re.compile(
+    r"\b(?:" + "|".join(sorted(map(re.escape, KEYWORDS_AI + KEYWORDS_RE), key=len, reverse=True)) + r")\b",
+    re.IGNORECASE,
+)
+
+
 def _heuristic_relevant(text: str) -> bool:
-    t = text.lower()
-    return any(k in t for k in KEYWORDS_AI) or any(k in t for k in KEYWORDS_RE)
+    return _KEYWORDS_MATCHER.search(text) is not None
+
+
+LOG_LEVELS = {"error": 0, "info": 1, "trace": 2}
+
+
+class TraceLog:
+    """Level-gated stderr logger that buffers lines and writes them in blocks.
+
+    Per-post ``[trace]`` lines are the hot path of a large filter run; writing
+    them one ``print`` at a time dominated the heuristic mode.
+    """
+
+    def __init__(self, level: str = "trace", flush_every: int = 512) -> None:
+        self.level_name = level
+        self.level = LOG_LEVELS[level]
+        self.flush_every = flush_every
+        self._buf: List[str] = []
+        self._lock = threading.Lock()
+
+    def set_level(self, level: str) -> None:
+        self.level_name = level
+        self.level = LOG_LEVELS[level]
+
+    def enabled(self, level: str) -> bool:
+        return LOG_LEVELS[level] <= self.level
+
+    def __call__(self, level: str, msg: str) -> None:
+        if LOG_LEVELS[level] > self.level:
+            return
+        with self._lock:
+            self._buf.append(msg)
+            if len(self._buf) < self.flush_every and level != "error":
+                return
+            lines, self._buf = self._buf, []
+        sys.stderr.write("\n".join(lines) + "\n")
+
+    def flush(self) -> None:
+        with self._lock:
+            lines, self._buf = self._buf, []
+        if lines:
+            sys.stderr.write("\n".join(lines) + "\n")
+        sys.stderr.flush()
+
+
+log = TraceLog()
 
 
 class DeepseekClient:
-    def __init__(self, api_key: str, model: str = DEF_DEEPSEEK_MODEL, base_url: str = DEF_DEEPSEEK_BASE) -> None:
+    def __init__(
+        self,
+        api_key: str,
+        model: str = DEF_DEEPSEEK_MODEL,
+        base_url: str = DEF_DEEPSEEK_BASE,
+        max_retries: int = 4,
+        backoff: float = 1.0,
+    ) -> None:
         self.api_key = api_key
         self.model = model
         self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+    def _post_chat(self, body: Dict[str, Any], timeout: int) -> str:
+        """POST a chat completion, retrying with backoff on HTTP 429.
+
+        Returns the raw response body. Other HTTP/network errors propagate.
+        """
+        url = f"{self.base_url}/v1/chat/completions"
+        data = json.dumps(body).encode("utf-8")
+        attempt = 0
+        while True:
+            req = Request(url, data=data, method="POST")
+            req.add_header("Authorization", f"Bearer {self.api_key}")
+            req.add_header("Content-Type", "application/json")
+            try:
+                with urlopen(req, timeout=timeout) as resp:
+                    return resp.read().decode("utf-8")
+            except HTTPError as e:
+                if e.code != 429 or attempt >= self.max_retries:
+                    raise
+                delay = _retry_delay(e.headers.get("Retry-After") if e.headers else None, attempt, self.backoff)
+                log("info", f"[deepseek] rate limited (429); retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
 
     def classify(self, content: str, timeout: int = 30) -> Tuple[bool, str]:
         """Return (relevant, raw_response_text). Falls back to heuristic on error."""
-        url = f"{self.base_url}/v1/chat/completions"
         prompt = (
             "Decide if the following LinkedIn post content is relevant to any of: "
             "(A) AI (artificial intelligence), (B) Real Estate, or (C) AI applied to Real Estate.\n"
@@ -175,34 +285,243 @@ class DeepseekClient:
             "max_tokens": 64,
         }
 
-        data = json.dumps(body).encode("utf-8")
-        req = Request(url, data=data, method="POST")
-        req.add_header("Authorization", f"Bearer {self.api_key}")
-        req.add_header("Content-Type", "application/json")
-
         try:
-            with urlopen(req, timeout=timeout) as resp:
-                raw = resp.read().decode("utf-8")
+            raw = self._post_chat(body, timeout=timeout)
         except (HTTPError, URLError) as e:
-            print(f"[deepseek] API error: {e}", file=sys.stderr)
+            log("error", f"[deepseek] API error: {e}")
             return _heuristic_relevant(content), ""
         except Exception as e:
-            print(f"[deepseek] Unexpected error: {e}", file=sys.stderr)
+            log("error", f"[deepseek] Unexpected error: {e}")
             return _heuristic_relevant(content), ""
 
-        try:
-            obj = json.loads(raw)
-            # OpenAI-compatible shape
-            text = obj["choices"][0]["message"]["content"].strip()
-        except Exception:
-            text = raw.strip()
+        text = _completion_text(raw)
 
         # Extract JSON object from text
         relevant = _parse_relevance_from_text(text, fallback=_heuristic_relevant(content))
         return relevant, text
 
+    def classify_batch(self, contents: List[str], timeout: int = 60) -> List[Tuple[bool, str]]:
+        """Classify several contents in one request, in input order.
+
+        The model is asked for a JSON array of verdicts keyed by index. Items
+        missing from a malformed or partial answer, or from a request that
+        failed, are retried in two smaller batches, so one bad item cannot
+        send the whole batch to the heuristic; a single item goes through
+        ``classify``, whose last fallback is the keyword heuristic. A batch
+        still rate limited after all retries is not split, since more
+        requests would not help.
+        """
+        if not contents:
+            return []
+        if len(contents) == 1:
+            return [self.classify(contents[0], timeout=timeout)]
+
+        listing = "\n\n".join(
+            f"[{i}]\n{c.strip()[:BATCH_CONTENT_CHARS]}" for i, c in enumerate(contents)
+        )
+        prompt = (
+            "For each numbered LinkedIn post below, decide if it is relevant to any of: "
+            "(A) AI (artificial intelligence), (B) Real Estate, or (C) AI applied to Real Estate.\n"
+            "Respond strictly as a compact JSON array with one object per post, each with keys: "
+            "index (integer), relevant (boolean), category (one of: AI, RealEstate, AI_in_RealEstate, Other). No extra text.\n"
+            "Posts:"
+        )
+        messages = [
+            {"role": "system", "content": "You are a precise JSON-only classifier."},
+            {"role": "user", "content": f"{prompt}\n\n{listing}"},
+        ]
+        body = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": 0.0,
+            "max_tokens": 32 + 32 * len(contents),
+        }
+
+        try:
+            raw = self._post_chat(body, timeout=timeout)
+        except Exception as e:
+            if isinstance(e, HTTPError) and e.code == 429:
+                log("error", f"[deepseek] batch API error: {e}")
+                return [(_heuristic_relevant(c), "") for c in contents]
+            log("info", f"[deepseek] batch API error: {e}; splitting")
+            return self._classify_split(contents, list(range(len(contents))), [None] * len(contents), timeout)
+
+        verdicts = _parse_batch_verdicts(_completion_text(raw), len(contents))
+        results: List[Optional[Tuple[bool, str]]] = [verdicts.get(i) for i in range(len(contents))]
+        missing = [i for i, r in enumerate(results) if r is None]
+        if missing:
+            log("info", f"[deepseek] batch answer missing {len(missing)}/{len(contents)} verdicts; splitting")
+        return self._classify_split(contents, missing, results, timeout)
+
+    def _classify_split(
+        self,
+        contents: List[str],
+        missing: List[int],
+        results: List[Optional[Tuple[bool, str]]],
+        timeout: int,
+    ) -> List[Tuple[bool, str]]:
+        # Fill results[i] for i in missing by classifying them in two halves
+        half = (len(missing) + 1) // 2
+        for group in (missing[:half], missing[half:]):
+            if not group:
+                continue
+            for i, r in zip(group, self.classify_batch([contents[i] for i in group], timeout=timeout)):
+                results[i] = r
+        return [r for r in results if r is not None]
+
+
+def _completion_text(raw: str) -> str:
+    try:
+        obj = json.loads(raw)
+        # OpenAI-compatible shape
+        return obj["choices"][0]["message"]["content"].strip()
+    except Exception:
+        return raw.strip()
+
+
+def _retry_delay(retry_after: Optional[str], attempt: int, backoff: float) -> float:
+    """Honor a numeric Retry-After header, else exponential backoff with jitter."""
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+    return backoff * (2 ** attempt) * (0.5 + random.random() / 2)
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def group_duplicates(contents: List[str]) -> Dict[str, str]:
+    """Map each content to the first earlier content it repeats, else to itself.
+
+    Contents repeat each other when their caption fingerprints match exactly
+    or nearly (see ``instagram_sponsor.fingerprint``). Only originals are
+    indexed, so a chain of small edits does not drift into one group.
+    """
+    index = CaptionIndex()
+    out: Dict[str, str] = {}
+    for content in contents:
+        fp = index.fingerprint(content)
+        if fp is None:
+            out[content] = content
+            continue
+        _, rep = index.lookup(fp)
+        if rep is None:
+            index.put(fp, content)
+        out[content] = rep or content
+    return out
+
+
+class ClassificationCache:
+    """On-disk relevance verdicts keyed by content hash plus model name.
+
+    Stored as a flat JSON object so re-filtering an unchanged corpus makes no
+    API calls. Writes go through a temp file and an atomic rename.
+    """
+
+    def __init__(self, path: Optional[str]) -> None:
+        self.path = path
+        self._entries: Dict[str, bool] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    obj = json.load(f)
+                if isinstance(obj, dict):
+                    self._entries = {k: bool(v) for k, v in obj.items()}
+            except Exception as e:
+                print(f"[cache] ignoring unreadable cache {path}: {e}", file=sys.stderr)
+
+    @staticmethod
+    def key(content: str, model: str) -> str:
+        return f"{model}:{content_hash(content)}"
+
+    def get(self, content: str, model: str) -> Optional[bool]:
+        with self._lock:
+            return self._entries.get(self.key(content, model))
+
+    def put(self, content: str, model: str, relevant: bool) -> None:
+        with self._lock:
+            self._entries[self.key(content, model)] = relevant
+            self._dirty = True
+
+    def save(self) -> None:
+        with self._lock:
+            if not self.path or not self._dirty:
+                return
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp, self.path)
+            self._dirty = False
+
+
+def classify_concurrently(
+    client: DeepseekClient,
+    contents: List[str],
+    workers: int = DEF_WORKERS,
+    batch_size: int = DEF_BATCH_SIZE,
+) -> Dict[str, Tuple[bool, str]]:
+    """Classify unique contents through a bounded thread pool.
+
+    Contents are packed ``batch_size`` per request. Returns
+    {content: (relevant, raw_response_text)}.
+    """
+    results: Dict[str, Tuple[bool, str]] = {}
+    if not contents:
+        return results
+    size = max(1, batch_size)
+    batches = [contents[i:i + size] for i in range(0, len(contents), size)]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(client.classify_batch, b): b for b in batches}
+        for fut in as_completed(futures):
+            for content, verdict in zip(futures[fut], fut.result()):
+                results[content] = verdict
+    return results
+
 
 _JSON_OBJ_RE = re.compile(r"\{.*\}", re.DOTALL)
+_JSON_ARR_RE = re.compile(r"\[.*\]", re.DOTALL)
+
+
+def _parse_batch_verdicts(text: str, n: int) -> Dict[int, Tuple[bool, str]]:
+    """Parse a JSON array of {index, relevant} objects into {index: (relevant, raw_item)}.
+
+    Entries with an out-of-range index or a non-boolean verdict are dropped,
+    so the caller can retry exactly the posts that were not answered.
+    """
+    items: Any = None
+    try:
+        items = json.loads(text)
+    except Exception:
+        m = _JSON_ARR_RE.search(text)
+        if m:
+            try:
+                items = json.loads(m.group(0))
+            except Exception:
+                items = None
+    if isinstance(items, dict):
+        # Some models wrap the array, e.g. {"results": [...]}
+        items = next((v for v in items.values() if isinstance(v, list)), None)
+    if not isinstance(items, list):
+        return {}
+
+    out: Dict[int, Tuple[bool, str]] = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        idx = item.get("index")
+        relevant = item.get("relevant")
+        if isinstance(idx, bool) or not isinstance(idx, int) or not 0 <= idx < n:
+            continue
+        if not isinstance(relevant, bool):
+            continue
+        out[idx] = (relevant, json.dumps(item, ensure_ascii=False))
+    return out
 
 
 def _parse_relevance_from_text(text: str, fallback: bool) -> bool:
@@ -229,19 +548,39 @@ def filter_payload(
     payload: Dict[str, Any],
     client: Optional[DeepseekClient],
     now: Optional[datetime] = None,
+    cache: Optional[ClassificationCache] = None,
+    workers: int = DEF_WORKERS,
+    batch_size: int = DEF_BATCH_SIZE,
+    processes: int = 1,
+    dedup: bool = True,
+    fallbacks: Optional[Set[str]] = None,
 ) -> Dict[str, Any]:
     """Filter posts per profile based on recency and LLM relevance.
 
     The input payload should be a dict with key "profiles" -> list of {profile_url, posts[]}.
     Returns a similarly-shaped dict with posts filtered.
+
+    Posts that pass the cheap rules are collected first; their unique contents
+    are then classified concurrently (``workers`` threads, ``batch_size``
+    posts per request) and verdicts are read from / written to ``cache`` when
+    one is given. With ``dedup`` the model sees one content per group of
+    exact or near repeats (see ``group_duplicates``) and the group shares its
+    verdict. Without a client, ``processes > 1`` chunks large corpora across
+    a process pool instead. Contents that fell back to the keyword heuristic
+    after an API error are added to ``fallbacks`` when one is given.
     """
     now = now or datetime.now(timezone.utc)
     profiles = payload.get("profiles")
     if not isinstance(profiles, list):
         return {"profiles": []}
 
-    out_profiles: List[Dict[str, Any]] = []
-    relevance_cache: dict[str, bool] = {}
+    if client is None and processes > 1 and len(profiles) >= PROCESS_MIN_PROFILES:
+        return _filter_heuristic_parallel(profiles, now=now, processes=processes)
+
+    tracing = log.enabled("trace")
+
+    # Pass 1: cheap rules; collect surviving posts per profile
+    survivors: List[Tuple[str, List[Dict[str, Any]]]] = []
 
     for prof in profiles:
         if not isinstance(prof, dict):
@@ -250,13 +589,11 @@ def filter_payload(
         posts = prof.get("posts")
         if not isinstance(posts, list):
             # No valid posts list; treat as empty and skip including this profile
-            print(
-                f"[trace] Profile={profile_url} DROP (no posts list)",
-                file=sys.stderr,
-            )
+            if tracing:
+                log("trace", f"[trace] Profile={profile_url} DROP (no posts list)")
             continue
 
-        kept: List[Dict[str, Any]] = []
+        candidates: List[Dict[str, Any]] = []
         for post in posts:
             if not isinstance(post, dict):
                 continue
@@ -265,67 +602,46 @@ def filter_payload(
             timestamp = (post.get("timestamp") or "").strip()
 
             # Rule 0: Must have link, content, and timestamp
-            missing = []
-            if not link:
-                missing.append("link")
-            if not content:
-                missing.append("content")
-            if not timestamp:
-                missing.append("timestamp")
-            if missing:
-                print(
-                    f"[trace] Profile={profile_url} SKIP (missing {','.join(missing)}) link={link}",
-                    file=sys.stderr,
-                )
+            if not (link and content and timestamp):
+                if tracing:
+                    missing = [k for k, v in (("link", link), ("content", content), ("timestamp", timestamp)) if not v]
+                    log("trace", f"[trace] Profile={profile_url} SKIP (missing {','.join(missing)}) link={link}")
                 continue
 
             # Rule 1: Recency (<= 14 days old)
             if "https://www.linkedin.com/posts" not in link:
-                print(
-                    f"[trace] Profile={profile_url} SKIP (link not linkedin posts) link={link}",
-                    file=sys.stderr,
-                )
+                if tracing:
+                    log("trace", f"[trace] Profile={profile_url} SKIP (link not linkedin posts) link={link}")
                 continue
 
             # Rule 1: Recency (<= 14 days old)
             if not within_two_weeks(timestamp, now=now):
-                print(
-                    f"[trace] Profile={profile_url} SKIP (older than 2 weeks) ts={timestamp}",
-                    file=sys.stderr,
-                )
+                if tracing:
+                    log("trace", f"[trace] Profile={profile_url} SKIP (older than 2 weeks) ts={timestamp}")
                 continue
 
-            # Rule 2: Topic relevance (AI OR Real Estate)
-
-            key = content[:5000]
-            if key in relevance_cache:
-                ok = relevance_cache[key]
-                print(
-                    f"[trace] Profile={profile_url} cache-hit classify relevant={ok} link={post.get('link','')}",
-                    file=sys.stderr,
-                )
-            else:
-                if client is None:
-                    ok = _heuristic_relevant(content)
-                    raw = ""
-                    print(
-                        f"[trace] Profile={profile_url} classify source=heuristic relevant={ok} link={post.get('link','')}",
-                        file=sys.stderr,
-                    )
-                else:
-                    print(
-                        f"[trace] Profile={profile_url} classify source=LLM link={post.get('link','')}",
-                        file=sys.stderr,
-                    )
-                    ok, raw = client.classify(content)
-                relevance_cache[key] = ok
-                if raw:
-                    # Optional: emit trace for transparency
-                    print(
-                        f"[trace] Profile={profile_url} LLM: relevant={ok} :: {raw}",
-                        file=sys.stderr,
-                    )
-
+            candidates.append(post)
+        survivors.append((profile_url, candidates))
+
+    # Rule 2: Topic relevance (AI OR Real Estate), one verdict per unique content
+    verdicts = _classify_contents(
+        [(post.get("content") or "").strip() for _, posts in survivors for post in posts],
+        client=client,
+        cache=cache,
+        workers=workers,
+        batch_size=batch_size,
+        dedup=dedup,
+        fallbacks=fallbacks,
+    )
+
+    # Pass 2: assemble kept posts
+    out_profiles: List[Dict[str, Any]] = []
+    for profile_url, candidates in survivors:
+        kept: List[Dict[str, Any]] = []
+        for post in candidates:
+            ok = verdicts[(post.get("content") or "").strip()]
+            if tracing:
+                log("trace", f"[trace] Profile={profile_url} relevant={ok} link={post.get('link','')}")
             if ok:
                 kept.append(post)
 
@@ -334,15 +650,233 @@ def filter_payload(
                 "profile_url": profile_url,
                 "posts": kept,
             })
-        else:
-            print(
-                f"[trace] Profile={profile_url} DROP (no kept posts)",
-                file=sys.stderr,
-            )
+        elif tracing:
+            log("trace", f"[trace] Profile={profile_url} DROP (no kept posts)")
 
     return {"profiles": out_profiles}
 
 
+def _filter_chunk(profiles: List[Any], now: datetime, level: str) -> Dict[str, Any]:
+    # Process-pool entry point: heuristic filtering of one slice of profiles.
+    # Per-chunk summaries are noise; children only speak at trace level.
+    log.set_level(level if level == "trace" else "error")
+    try:
+        return filter_payload({"profiles": profiles}, client=None, now=now)
+    finally:
+        log.flush()
+
+
+def _filter_heuristic_parallel(profiles: List[Any], now: datetime, processes: int) -> Dict[str, Any]:
+    level = log.level_name
+    size = max(1, -(-len(profiles) // (processes * 4)))
+    chunks = [profiles[i:i + size] for i in range(0, len(profiles), size)]
+    log("info", f"[trace] classify source=heuristic profiles={len(profiles)} chunks={len(chunks)} processes={processes}")
+    log.flush()
+    out_profiles: List[Dict[str, Any]] = []
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        # map() preserves chunk order, so output order matches the input
+        for res in pool.map(_filter_chunk, chunks, [now] * len(chunks), [level] * len(chunks)):
+            out_profiles.extend(res["profiles"])
+    return {"profiles": out_profiles}
+
+
+def _classify_contents(
+    contents: List[str],
+    client: Optional[DeepseekClient],
+    cache: Optional[ClassificationCache],
+    workers: int,
+    batch_size: int,
+    dedup: bool = True,
+    fallbacks: Optional[Set[str]] = None,
+) -> Dict[str, bool]:
+    verdicts: Dict[str, bool] = {}
+    unique = list(dict.fromkeys(contents))
+
+    if client is None:
+        for content in unique:
+            verdicts[content] = _heuristic_relevant(content)
+        log("info", f"[trace] classify source=heuristic n={len(unique)}")
+        return verdicts
+
+    # Repeats of a content share its verdict, whether cached or fetched now
+    group = group_duplicates(unique) if dedup else {}
+    known: Dict[str, bool] = {}
+    hits = 0
+    for content in unique:
+        hit = cache.get(content, client.model) if cache is not None else None
+        if hit is not None:
+            verdicts[content] = hit
+            known.setdefault(group.get(content, content), hit)
+            hits += 1
+    asked: Dict[str, str] = {}
+    for content in unique:
+        if content in verdicts:
+            continue
+        g = group.get(content, content)
+        if g in known:
+            verdicts[content] = known[g]
+        else:
+            asked.setdefault(g, content)
+    pending = list(asked.values())
+    log(
+        "info",
+        f"[trace] classify source=LLM unique={len(unique)} cache-hits={hits} "
+        f"repeats={len(unique) - hits - len(pending)} posts={len(pending)} "
+        f"batch-size={batch_size} workers={workers}",
+    )
+
+    try:
+        results = classify_concurrently(client, pending, workers=workers, batch_size=batch_size)
+        for content, (ok, raw) in results.items():
+            verdicts[content] = ok
+            # Only cache real model answers; heuristic fallbacks should be retried next run
+            if raw and cache is not None:
+                cache.put(content, client.model, ok)
+            if raw:
+                log("trace", f"[trace] LLM: relevant={ok} :: {raw}")
+        for content in unique:
+            rep = asked.get(group.get(content, content))
+            if rep is None:
+                continue
+            if content not in verdicts:
+                verdicts[content] = verdicts[rep]
+            if fallbacks is not None and not results[rep][1]:
+                fallbacks.add(content)
+    finally:
+        if cache is not None:
+            cache.save()
+    return verdicts
+
+
+def manifest_path_for(output: str) -> str:
+    root, _ = os.path.splitext(output)
+    return f"{root}.manifest.json"
+
+
+def _post_key(profile_url: str, link: str) -> str:
+    return f"{profile_url}\t{link}"
+
+
+def _input_watermark(path: str, classifier: Dict[str, Any]) -> Dict[str, Any]:
+    st = os.stat(path)
+    return {"input": os.path.abspath(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns, "classifier": classifier}
+
+
+def input_post_keys(payload: Dict[str, Any]) -> Dict[str, int]:
+    """Keys of every linked post in an input payload, mapped to their position in it."""
+    keys: Dict[str, int] = {}
+    for prof in payload.get("profiles") or []:
+        if not isinstance(prof, dict) or not isinstance(prof.get("posts"), list):
+            continue
+        url = prof.get("profile_url", "")
+        for post in prof["posts"]:
+            if isinstance(post, dict) and (post.get("link") or "").strip():
+                keys.setdefault(_post_key(url, post["link"].strip()), len(keys))
+    return keys
+
+
+def load_manifest(path: str) -> Dict[str, Any]:
+    """Load an incremental-filter manifest: {"watermark": {...}, "posts": {key: content_hash}}."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            obj = json.load(f)
+        if isinstance(obj, dict) and isinstance(obj.get("posts"), dict):
+            return obj
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"[incremental] ignoring unreadable manifest {path}: {e}", file=sys.stderr)
+    return {"watermark": {}, "posts": {}}
+
+
+def save_manifest(path: str, manifest: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def select_new_posts(payload: Dict[str, Any], seen: Dict[str, str]) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """Return (delta_payload, delta_keys) holding only posts new or changed since ``seen``.
+
+    ``seen`` maps (profile_url, link) keys to content hashes. ``delta_keys`` has
+    the same shape for the selected posts, ready to be merged into the manifest.
+    Posts without a link cannot be tracked and are always selected.
+    """
+    profiles = payload.get("profiles")
+    if not isinstance(profiles, list):
+        return {"profiles": []}, {}
+
+    delta_profiles: List[Dict[str, Any]] = []
+    delta_keys: Dict[str, str] = {}
+    for prof in profiles:
+        if not isinstance(prof, dict):
+            continue
+        profile_url = prof.get("profile_url", "")
+        posts = prof.get("posts")
+        if not isinstance(posts, list):
+            continue
+        fresh: List[Any] = []
+        for post in posts:
+            if not isinstance(post, dict):
+                continue
+            link = (post.get("link") or "").strip()
+            h = content_hash((post.get("content") or "").strip())
+            if link:
+                key = _post_key(profile_url, link)
+                if seen.get(key) == h:
+                    continue
+                delta_keys[key] = h
+            fresh.append(post)
+        if fresh:
+            delta_profiles.append({"profile_url": profile_url, "posts": fresh})
+    return {"profiles": delta_profiles}, delta_keys
+
+
+def merge_filtered(
+    existing: Dict[str, Any],
+    delta: Dict[str, Any],
+    replaced: Dict[str, str],
+    current: Dict[str, int],
+    now: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """Merge newly filtered posts into a previous filtered payload.
+
+    Previously kept posts whose key is in ``replaced`` were re-evaluated, so
+    they are dropped in favour of the delta's kept posts. So are posts no
+    longer in the input (their key is not in ``current``) and posts that have
+    aged past the recency cutoff since they were kept. Posts and profiles are
+    then put back in input order using the positions in ``current``, so the
+    result matches a full run.
+    """
+    now = now or datetime.now(timezone.utc)
+    merged: Dict[str, List[Dict[str, Any]]] = {}
+    for prof in existing.get("profiles") or []:
+        if not isinstance(prof, dict):
+            continue
+        url = prof.get("profile_url", "")
+        posts = []
+        for p in prof.get("posts") or []:
+            if not isinstance(p, dict):
+                continue
+            key = _post_key(url, (p.get("link") or "").strip())
+            if key in replaced or key not in current:
+                continue
+            if within_two_weeks((p.get("timestamp") or "").strip(), now=now):
+                posts.append(p)
+        merged.setdefault(url, []).extend(posts)
+    for prof in delta.get("profiles") or []:
+        merged.setdefault(prof.get("profile_url", ""), []).extend(prof.get("posts") or [])
+
+    def position(url: str, post: Dict[str, Any]) -> int:
+        return current.get(_post_key(url, (post.get("link") or "").strip()), len(current))
+
+    ordered = [(url, sorted(posts, key=lambda p: position(url, p))) for url, posts in merged.items() if posts]
+    ordered.sort(key=lambda t: position(t[0], t[1][0]))
+    return {"profiles": [{"profile_url": url, "posts": posts} for url, posts in ordered]}
+
+
 def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Filter LinkedIn posts by recency and topic using DeepSeek.")
     p.add_argument("--input", "-i", default=DEF_INPUT, help="Path to aggregated input JSON (default: outputs/all.json)")
@@ -351,6 +885,15 @@ def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
     p.add_argument("--model", default=os.environ.get("DEEPSEEK_MODEL", DEF_DEEPSEEK_MODEL), help="DeepSeek model name (default: deepseek-chat)")
     p.add_argument("--no-llm", action="store_true", help="Disable DeepSeek calls and use simple keyword heuristic only")
     p.add_argument("--no-dotenv", action="store_true", help="Do not read .env at startup")
+    p.add_argument("--workers", type=int, default=DEF_WORKERS, help=f"Concurrent DeepSeek requests (default: {DEF_WORKERS})")
+    p.add_argument("--batch-size", type=int, default=DEF_BATCH_SIZE, help=f"Posts packed into one DeepSeek request (default: {DEF_BATCH_SIZE}; 1 = one request per post)")
+    p.add_argument("--cache", default=DEF_CACHE, help=f"Path to the persistent classification cache (default: {DEF_CACHE})")
+    p.add_argument("--no-cache", action="store_true", help="Do not read or write the classification cache")
+    p.add_argument("--no-dedup", action="store_true", help="Send every distinct content to the model, even exact or near repeats of another")
+    p.add_argument("--processes", type=int, default=1, help="With --no-llm, chunk large inputs across this many processes (default: 1; 0 = CPU count)")
+    p.add_argument("--incremental", action="store_true", help="Only filter posts new or changed since the last incremental run and merge them into --output")
+    p.add_argument("--manifest", default=None, help="Manifest for --incremental (default: <output>.manifest.json)")
+    p.add_argument("--log-level", choices=list(LOG_LEVELS), default="trace", help="stderr verbosity: error, info (summaries) or trace (per post; default)")
     return p.parse_args(argv)
 
 
@@ -359,6 +902,7 @@ def main(argv: Optional[List[str]] = None) -> int:
 
     if not args.no_dotenv:
         load_env_file()
+    log.set_level(args.log_level)
 
     api_key = os.environ.get("DEEPSEEK_API_KEY")
     client: Optional[DeepseekClient]
@@ -371,12 +915,53 @@ def main(argv: Optional[List[str]] = None) -> int:
         else:
             client = DeepseekClient(api_key=api_key, model=args.model, base_url=args.base_url)
 
+    manifest_path = args.manifest or manifest_path_for(args.output)
+    manifest: Dict[str, Any] = {"watermark": {}, "posts": {}}
+    # Verdicts from another model (or the heuristic) do not carry over
+    classifier = {"model": args.model, "no_llm": client is None}
+    watermark = _input_watermark(args.input, classifier)
+    if args.incremental:
+        manifest = load_manifest(manifest_path)
+        if manifest.get("watermark") == watermark and os.path.exists(args.output):
+            print(f"Input unchanged since last incremental run; kept {args.output}", file=sys.stderr)
+            return 0
+        if (manifest.get("watermark") or {}).get("classifier") != classifier:
+            if manifest["posts"]:
+                print("[incremental] classifier changed; filtering every post again", file=sys.stderr)
+            manifest["posts"] = {}
+
     # Load input
     with open(args.input, "r", encoding="utf-8") as f:
         payload = json.load(f)
 
+    delta_keys: Dict[str, str] = {}
+    work = payload
+    if args.incremental:
+        work, delta_keys = select_new_posts(payload, manifest["posts"])
+        print(f"[incremental] {len(delta_keys)} new or changed posts to filter", file=sys.stderr)
+
+    cache = None if args.no_cache else ClassificationCache(args.cache)
+    fallbacks: Set[str] = set()
+
     # Filter
-    filtered = filter_payload(payload, client=client)
+    filtered = filter_payload(
+        work,
+        client=client,
+        cache=cache,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        processes=args.processes or (os.cpu_count() or 1),
+        dedup=not args.no_dedup,
+        fallbacks=fallbacks,
+    )
+    log.flush()
+
+    current: Dict[str, int] = {}
+    if args.incremental:
+        current = input_post_keys(payload)
+        if os.path.exists(args.output):
+            with open(args.output, "r", encoding="utf-8") as f:
+                filtered = merge_filtered(json.load(f), filtered, delta_keys, current)
 
     # Write output
     os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
@@ -388,6 +973,15 @@ def main(argv: Optional[List[str]] = None) -> int:
     total_after = sum(len(p.get("posts", [])) for p in filtered.get("profiles", [])) if isinstance(filtered.get("profiles"), list) else 0
     print(f"Filtered posts: {total_before} → {total_after}", file=sys.stderr)
     print(f"Wrote: {args.output}")
+
+    if args.incremental:
+        # Heuristic fallbacks after an API error are retried next run, like the cache does
+        retry = {content_hash(c) for c in fallbacks}
+        manifest["posts"] = {k: h for k, h in manifest["posts"].items() if k in current}
+        manifest["posts"].update((k, h) for k, h in delta_keys.items() if h not in retry)
+        # A watermark that cannot match keeps the next run from skipping those retries
+        manifest["watermark"] = dict(watermark, pending_retries=len(retry)) if retry else watermark
+        save_manifest(manifest_path, manifest)
     return 0
 
 
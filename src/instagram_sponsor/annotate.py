@@ -0,0 +1,225 @@
+"""Detection and enrichment of extracted posts.
+
+Kept apart from the scraper so annotating (or re-annotating a saved
+aggregate) does not load Playwright.
+
+A sponsored post often yields several hotel candidates (a tagged handle, a
+location, a caption fragment). All of them are enriched concurrently, and
+each result is scored by how much the candidate's source is trusted and how
+much contact data it found. A strong result returns at once and cancels the
+calls that have not started. Each call is given up on after running for
+the time budget; time spent queued for a thread does not count. Calls given
+up on finish in the background, and the hotel registry keeps their results:
+a post that got nothing checks the registry once more before settling for
+empty fields.
+
+With a ``CaptionIndex`` a post whose caption repeats an earlier one (same
+caption, or a near copy by SimHash) reuses that post's results. An exact
+copy with the same tagged accounts takes over its caption-based reasons.
+The hotel carries over when the earlier post's chosen candidate is also a
+candidate of this one. The paid-partnership banner is the post's own.
+"""
+
+from __future__ import annotations
+
+import functools
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .detection import find_hotel_candidates, sponsored_flags
+from .fingerprint import EXACT, CaptionIndex
+from .hotels import HotelRegistry
+from .metrics import METRICS
+from .records import HotelInfo, Post
+
+# How far a candidate's origin is trusted to name the hotel that was stayed at
+SOURCE_CONFIDENCE = {"tagged": 0.9, "location": 0.7, "caption": 0.3}
+# Share of a result's score carried by each enriched field
+FIELD_WEIGHTS = {"email": 0.4, "phone": 0.25, "website": 0.25, "address": 0.1}
+# Stop waiting for other candidates once a result scores this high
+GOOD_SCORE = 0.7
+ENRICH_BUDGET_S = 30.0
+ENRICH_WORKERS = 8
+# How often a post waiting on queued calls checks whether they have started
+_POLL_S = 0.5
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _enrich_pool() -> ThreadPoolExecutor:
+    # Shared by every post, so abandoned calls never pile up beyond the pool size
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=ENRICH_WORKERS, thread_name_prefix="enrich")
+        return _pool
+
+
+def score_enrichment(candidate: Dict[str, str], enriched: Dict[str, Optional[str]]) -> float:
+    found = sum(w for f, w in FIELD_WEIGHTS.items() if enriched.get(f))
+    return SOURCE_CONFIDENCE.get(candidate.get("source") or "", 0.5) * found
+
+
+# Shared by every post with no hotel
+_NO_HOTEL = HotelInfo()
+
+Resolver = Callable[[Dict[str, str]], Tuple[Optional[str], Dict[str, Optional[str]]]]
+
+
+def enrich_best_candidate(
+    candidates: List[Dict[str, str]],
+    resolve: Resolver,
+    budget_s: float = ENRICH_BUDGET_S,
+    good_score: float = GOOD_SCORE,
+    known: Optional[Callable[[Dict[str, str]], Optional[Tuple[str, Dict[str, Optional[str]]]]]] = None,
+) -> Tuple[Dict[str, str], Optional[str], Dict[str, Optional[str]]]:
+    """Enrich ``candidates`` concurrently and return ``(candidate, hotel_id, enriched)`` for the best one.
+
+    ``resolve`` maps a candidate to ``(hotel_id, enriched fields)``. A call
+    that has run for ``budget_s`` is given up on; one still queued behind
+    other posts' calls is waited for. When nothing useful comes back,
+    ``known`` (a registry lookup that never enriches) is asked for each
+    candidate, since a call given up on here may have finished for another
+    post; failing that the most trusted candidate is returned with empty
+    fields.
+    """
+    by_trust = sorted(candidates, key=lambda c: -SOURCE_CONFIDENCE.get(c.get("source") or "", 0.5))
+    empty: Dict[str, Optional[str]] = {f: None for f in FIELD_WEIGHTS}
+    best: Tuple[float, Dict[str, str], Optional[str], Dict[str, Optional[str]]] = (
+        -1.0, by_trust[0], None, dict(empty, enrichment_source="none")
+    )
+    started: Dict[int, float] = {}
+
+    def timed(i: int, c: Dict[str, str]) -> Tuple[Optional[str], Dict[str, Optional[str]]]:
+        started[i] = time.monotonic()
+        return resolve(c)
+
+    pool = _enrich_pool()
+    futures: Dict[Future, int] = {pool.submit(timed, i, c): i for i, c in enumerate(by_trust)}
+    pending = set(futures)
+    try:
+        while pending:
+            now = time.monotonic()
+            pending = {f for f in pending if now - started.get(futures[f], now) < budget_s}
+            if not pending:
+                break
+            limits = [started[futures[f]] + budget_s - now for f in pending if futures[f] in started]
+            done, pending = wait(pending, timeout=min(limits, default=_POLL_S), return_when=FIRST_COMPLETED)
+            for fut in done:
+                c = by_trust[futures[fut]]
+                try:
+                    hid, enriched = fut.result()
+                except Exception:
+                    continue
+                score = score_enrichment(c, enriched)
+                if score > best[0]:
+                    best = (score, c, hid, enriched)
+            if best[0] >= good_score:
+                break
+    finally:
+        for fut in pending:
+            fut.cancel()
+    if best[0] <= 0 and known is not None:
+        for c in by_trust:
+            found = known(c)
+            if found is None:
+                continue
+            score = score_enrichment(c, found[1])
+            if best[2] is None or score > best[0]:
+                best = (score, c, found[0], found[1])
+    return best[1], best[2], best[3]
+
+
+class _Annotated(NamedTuple):
+    # What a caption's first post resolved to, kept in the CaptionIndex
+    reasons: Tuple[str, ...]
+    tagged_accounts: Tuple[str, ...]
+    candidate: Optional[Dict[str, str]]
+    hotel: HotelInfo
+    hotel_id: Optional[str]
+
+
+def _candidate_key(c: Dict[str, str]) -> Tuple[str, str]:
+    return (c.get("instagram_handle") or "").lower(), (c.get("name") or "").lower()
+
+
+def annotate_post(
+    post: Post,
+    paid_banner: bool,
+    google_places_api_key: str | None,
+    hotels: HotelRegistry | None = None,
+    captions: CaptionIndex | None = None,
+) -> Post:
+    """Add sponsorship flags and enriched hotel info to an extracted post (in place).
+
+    With a ``hotels`` registry each hotel is enriched once per run and the post
+    gets a ``hotel_id`` reference into the registry's table. With ``captions``
+    a repeated caption reuses the earlier post's detection and hotel.
+    """
+    fp = captions.fingerprint(post.caption) if captions is not None else None
+    match, prior = captions.lookup(fp) if fp is not None else (None, None)
+    if match is not None:
+        METRICS.inc("caption_duplicates_total", match=match)
+
+    if match == EXACT and prior.tagged_accounts == post.tagged_accounts:
+        reasons = (["banner"] if paid_banner else []) + list(prior.reasons)
+        sponsored = bool(reasons)
+    else:
+        sponsored, reasons = sponsored_flags(
+            caption=post.caption,
+            paid_banner_present=paid_banner,
+            tagged_accounts=post.tagged_accounts,
+        )
+
+    hotel_info = _NO_HOTEL
+    hotel_id = None
+    c: Optional[Dict[str, str]] = None
+    reused = False
+    if sponsored:
+        candidates = find_hotel_candidates(
+            post.caption,
+            post.hashtags,
+            post.mentions,
+            post.tagged_accounts,
+            post.location_name,
+        )
+        if candidates and prior is not None and prior.candidate is not None:
+            reused = _candidate_key(prior.candidate) in {_candidate_key(x) for x in candidates}
+        if reused:
+            c, hotel_id, hotel_info = prior.candidate, prior.hotel_id, prior.hotel
+            if hotels is not None and hotel_id is not None:
+                hotels.count_post(hotel_id)
+        elif candidates:
+            if hotels is not None:
+                resolve: Resolver = functools.partial(hotels.resolve, count=False)
+            else:
+                from .enrichment import enrich_hotel_candidate
+
+                def resolve(c: Dict[str, str]) -> Tuple[Optional[str], Dict[str, Optional[str]]]:
+                    return None, enrich_hotel_candidate(c, google_places_api_key)
+
+            c, hotel_id, enriched = enrich_best_candidate(
+                candidates, resolve, known=hotels.lookup if hotels is not None else None
+            )
+            if hotels is not None and hotel_id is not None:
+                hotels.count_post(hotel_id)
+            hotel_info = HotelInfo.from_dict({
+                "name": c.get("name") or None,
+                "instagram_handle": (c.get("instagram_handle") or None),
+                **enriched,
+            })
+
+    if fp is not None and not reused and (prior is None or c is not None):
+        # First sight of the caption, or the first time a hotel was resolved for it
+        captions.put(fp, _Annotated(
+            tuple(r for r in reasons if r != "banner"), post.tagged_accounts, c, hotel_info, hotel_id
+        ))
+
+    post.sponsored = sponsored
+    post.sponsored_reasons = tuple(reasons)
+    post.hotel = hotel_info
+    post.hotel_id = hotel_id
+    return post
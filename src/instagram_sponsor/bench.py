@@ -0,0 +1,195 @@
+"""Start-up benchmarks for the CLI.
+
+Each measurement runs in a fresh interpreter, so module caches from earlier
+imports cannot hide a slow import. ``run_import_bench`` fails (returns 1)
+when an offline command goes over budget or pulls in Playwright, which makes
+it usable as a CI gate.
+
+``run_memory_bench`` compares what a decoded aggregate costs as plain JSON
+dicts and as the slotted records of ``records``, on synthetic posts.
+"""
+
+from __future__ import annotations
+
+import gc
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Modules each command loads before doing any work, and whether it must run without Playwright
+IMPORT_TARGETS: Dict[str, Tuple[Tuple[str, ...], bool]] = {
+    "cli": (("instagram_sponsor.cli",), True),
+    "filter": (("instagram_sponsor.cli", "instagram_sponsor.pipeline", "instagram_sponsor.writer"), True),
+    "export": (("instagram_sponsor.cli", "instagram_sponsor.pipeline", "instagram_sponsor.export"), True),
+    "redetect": (("instagram_sponsor.cli", "instagram_sponsor.annotate", "instagram_sponsor.writer"), True),
+    "scrape": (("instagram_sponsor.cli", "instagram_sponsor.scraper"), False),
+}
+
+_PROBE = (
+    "import sys, time\n"
+    "t = time.perf_counter()\n"
+    "{imports}\n"
+    "print(time.perf_counter() - t, 'playwright' in sys.modules)\n"
+)
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    src = str(Path(__file__).resolve().parent.parent)
+    env["PYTHONPATH"] = src + (os.pathsep + env["PYTHONPATH"] if env.get("PYTHONPATH") else "")
+    return env
+
+
+def measure_import(modules: Tuple[str, ...], repeat: int = 5) -> Tuple[Optional[float], bool, str]:
+    """Best-of-``repeat`` import time in ms, whether Playwright got loaded, and any error."""
+    code = _PROBE.format(imports="\n".join(f"import {m}" for m in modules))
+    best: Optional[float] = None
+    loaded = False
+    for _ in range(max(1, repeat)):
+        proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=_env())
+        if proc.returncode != 0:
+            return None, False, (proc.stderr.strip().splitlines() or ["failed"])[-1]
+        secs, pw = proc.stdout.split()
+        best = min(best, float(secs) * 1000) if best is not None else float(secs) * 1000
+        loaded = loaded or pw == "True"
+    return best, loaded, ""
+
+
+def measure_help(repeat: int = 5) -> float:
+    """Best wall-clock ms for ``python -m instagram_sponsor.cli --help``, interpreter start included."""
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        t = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "instagram_sponsor.cli", "--help"],
+            capture_output=True,
+            env=_env(),
+            check=True,
+        )
+        best = min(best, (time.perf_counter() - t) * 1000)
+    return best
+
+
+def run_import_bench(budget_ms: float = 100.0, repeat: int = 5) -> int:
+    failures: List[str] = []
+    print(f"{'command':<10} {'import ms':>10}  notes")
+    for name, (modules, offline) in IMPORT_TARGETS.items():
+        ms, loaded, err = measure_import(modules, repeat)
+        if ms is None:
+            print(f"{name:<10} {'-':>10}  unavailable: {err}")
+            if offline:
+                failures.append(f"{name}: {err}")
+            continue
+        notes = []
+        if offline and loaded:
+            notes.append("loads playwright")
+            failures.append(f"{name} imports playwright")
+        if offline and ms > budget_ms:
+            notes.append(f"over {budget_ms:.0f}ms budget")
+            failures.append(f"{name} took {ms:.1f}ms")
+        print(f"{name:<10} {ms:>10.1f}  {', '.join(notes)}")
+    help_ms = measure_help(repeat)
+    print(f"{'--help':<10} {help_ms:>10.1f}  wall clock incl. interpreter start")
+    if help_ms > budget_ms:
+        failures.append(f"--help took {help_ms:.1f}ms")
+    for f in failures:
+        print(f"FAIL: {f}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+def synthetic_aggregate(n_posts: int, posts_per_profile: int = 6, seed: int = 0) -> str:
+    """A JSON aggregate of ``n_posts`` posts shaped like real ones; about one in five is sponsored."""
+    rng = random.Random(seed)
+    empty_hotel = dict.fromkeys(("name", "instagram_handle", "website", "email", "address", "phone", "enrichment_source"))
+    hotels = [
+        dict(
+            empty_hotel,
+            name=f"Hotel {i}",
+            instagram_handle=f"hotel{i}",
+            website=f"https://hotel{i}.example.com",
+            email=f"stay@hotel{i}.example.com",
+            phone=f"+1 555 01{i:02d}",
+            enrichment_source="bio",
+        )
+        for i in range(50)
+    ]
+    profiles = []
+    for i in range(0, n_posts, posts_per_profile):
+        posts = []
+        for j in range(min(posts_per_profile, n_posts - i)):
+            sponsored = rng.random() < 0.2
+            h = rng.randrange(len(hotels))
+            tags = [f"travel{rng.randrange(500)}" for _ in range(rng.randrange(2, 8))]
+            posts.append({
+                "post_url": f"https://www.instagram.com/p/{i + j:011d}/",
+                "date_iso": f"2025-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}T12:00:00.000Z",
+                "caption": " ".join(f"word{rng.randrange(2000)}" for _ in range(rng.randrange(10, 60))),
+                "hashtags": tags,
+                "mentions": [f"friend{rng.randrange(300)}" for _ in range(rng.randrange(0, 3))],
+                "tagged_accounts": [f"hotel{h}"] if sponsored else [],
+                "location_name": f"Hotel {h}" if sponsored else "",
+                "sponsored": sponsored,
+                "sponsored_reasons": ["keyword", "tagged_hotel"] if sponsored else [],
+                "hotel": dict(hotels[h]) if sponsored else dict(empty_hotel),
+                "hotel_id": f"h{h:04d}" if sponsored else None,
+            })
+        profiles.append({
+            "profile_url": f"https://www.instagram.com/creator{i}/",
+            "scraped_at": "2025-06-01T00:00:00+00:00",
+            "posts": posts,
+        })
+    return json.dumps({"profiles": profiles})
+
+
+def _retained(build: Callable[[], Any]) -> int:
+    """Bytes still allocated once ``build()`` has returned its result."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        obj = build()
+        gc.collect()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del obj
+    return size
+
+
+def _ms(fn: Callable[[], Any]) -> float:
+    # Timed apart from _retained: tracing slows allocation several times over
+    t = time.perf_counter()
+    fn()
+    return (time.perf_counter() - t) * 1000
+
+
+def run_memory_bench(n_posts: int = 100_000) -> int:
+    from .records import ProfileResult, json_default
+
+    text = synthetic_aggregate(n_posts)
+
+    def as_dicts() -> List[Dict]:
+        return json.loads(text)["profiles"]
+
+    def as_records() -> List[ProfileResult]:
+        hotels: Dict = {}
+        return [ProfileResult.from_dict(p, hotels) for p in json.loads(text)["profiles"]]
+
+    dict_bytes = _retained(as_dicts)
+    rec_bytes = _retained(as_records)
+    dicts, records = as_dicts(), as_records()
+    rows = [
+        ("dicts", dict_bytes, _ms(as_dicts), _ms(lambda: json.dumps(dicts))),
+        ("records", rec_bytes, _ms(as_records), _ms(lambda: json.dumps(records, default=json_default))),
+    ]
+    print(f"{n_posts} posts")
+    print(f"{'layout':<8} {'MB':>8} {'B/post':>8} {'decode ms':>10} {'encode ms':>10}")
+    for name, size, dec, enc in rows:
+        print(f"{name:<8} {size / 2**20:>8.1f} {size / n_posts:>8.0f} {dec:>10.0f} {enc:>10.0f}")
+    print(f"records hold the same posts in {1 - rec_bytes / dict_bytes:.0%} less memory")
+    return 0
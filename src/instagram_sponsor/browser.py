@@ -0,0 +1,210 @@
+"""Persistent Chromium context with page/context recycling.
+
+Chromium's RSS grows steadily over thousands of profile navigations until the
+renderer crashes or the box swaps. The supervisor recycles the page every N
+profiles and the whole context every M profiles or once the browser's
+resident memory passes a ceiling. The context is persistent, so the
+logged-in session survives a relaunch.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+from typing import Dict, List, Optional
+
+from .failures import ProfileUnavailable
+from .selectors import SelectorsBroken
+from .session import SessionState
+
+
+def add_browser_args(ap) -> None:
+    """Register the recycling options shared by the scrape and pipeline CLIs."""
+    ap.add_argument(
+        "--recycle-page-every",
+        type=int,
+        default=50,
+        help="Replace the browser page after this many profiles (default 50; 0 = never)",
+    )
+    ap.add_argument(
+        "--recycle-context-every",
+        type=int,
+        default=500,
+        help="Relaunch the browser context after this many profiles (default 500; 0 = never)",
+    )
+    ap.add_argument(
+        "--max-browser-rss-mb",
+        type=float,
+        default=3072,
+        help="Relaunch the browser context when its resident memory exceeds this (default 3072; 0 = off)",
+    )
+    ap.add_argument(
+        "--session-check-hours",
+        type=float,
+        default=12.0,
+        help="Trust a login verified this recently and skip the homepage check at start-up (default 12; 0 = always check)",
+    )
+
+
+def open_browser(p, user_data_dir: str, headless: bool):
+    """Launch the persistent Chromium context; returns (context, page)."""
+    context = p.chromium.launch_persistent_context(
+        user_data_dir=user_data_dir,
+        headless=headless,
+        viewport={"width": 1280, "height": 900},
+        args=["--disable-blink-features=AutomationControlled"],
+    )
+    # A persistent context opens with a blank tab; use it rather than adding another
+    page = context.pages[0] if context.pages else context.new_page()
+    return context, page
+
+
+def _process_kb(pid: int, page_kb: int) -> int:
+    # Proportional set size: pages shared between Chromium processes are split among them
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1])
+    except (OSError, IndexError, ValueError):
+        pass
+    # Kernels before 4.14: plain RSS, which counts shared pages once per process
+    with open(f"/proc/{pid}/statm", "r") as f:
+        return int(f.read().split()[1]) * page_kb
+
+
+def descendant_rss_mb(root_pid: Optional[int] = None) -> Optional[float]:
+    """Total memory (MB) of all processes below ``root_pid``.
+
+    Playwright's driver and Chromium run as children of this process, so this
+    measures the browser without needing its PID. Each process counts its
+    PSS, so pages Chromium's processes share are counted once overall. Where
+    ``smaps_rollup`` is missing it falls back to RSS, which overcounts shared
+    pages. Reads /proc; returns None where that is unavailable.
+    """
+    root = root_pid or os.getpid()
+    try:
+        entries = [e for e in os.listdir("/proc") if e.isdigit()]
+    except OSError:
+        return None
+    children: Dict[int, List[int]] = {}
+    for e in entries:
+        try:
+            with open(f"/proc/{e}/stat", "rb") as f:
+                stat = f.read().decode("ascii", "replace")
+            # Field 4 (ppid) follows the parenthesised command name
+            ppid = int(stat.rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(e))
+
+    page_kb = os.sysconf("SC_PAGE_SIZE") // 1024
+    total_kb = 0
+    stack = list(children.get(root, []))
+    while stack:
+        pid = stack.pop()
+        stack.extend(children.get(pid, []))
+        try:
+            total_kb += _process_kb(pid, page_kb)
+        except (OSError, IndexError, ValueError):
+            continue
+    return total_kb / 1024.0
+
+
+class BrowserSupervisor:
+    """Own the browser context and page; recycle them between profiles.
+
+    Call ``profile_done()`` after each profile's results are safely recorded;
+    recycling only ever happens there, so no in-flight work is lost. ``page``
+    always holds the live page. ``session`` tracks whether the saved login
+    was recently verified (see ``session.SessionState``).
+    """
+
+    def __init__(
+        self,
+        p,
+        user_data_dir: str,
+        headless: bool,
+        recycle_page_every: int = 50,
+        recycle_context_every: int = 500,
+        max_rss_mb: float = 0,
+        session_check_hours: float = 12.0,
+    ) -> None:
+        self._p = p
+        self.user_data_dir = user_data_dir
+        self.headless = headless
+        self.recycle_page_every = recycle_page_every
+        self.recycle_context_every = recycle_context_every
+        self.max_rss_mb = max_rss_mb
+        self.context = None
+        self.page = None
+        self._page_profiles = 0
+        self._context_profiles = 0
+        self.recycles = {"page": 0, "context": 0}
+        self.session = SessionState(user_data_dir, max_age_hours=session_check_hours)
+
+    def start(self):
+        self.context, self.page = open_browser(self._p, user_data_dir=self.user_data_dir, headless=self.headless)
+        self._page_profiles = 0
+        self._context_profiles = 0
+        return self.page
+
+    def profile_done(self) -> None:
+        self._page_profiles += 1
+        self._context_profiles += 1
+        if self.recycle_context_every and self._context_profiles >= self.recycle_context_every:
+            self.recycle_context(f"{self._context_profiles} profiles")
+            return
+        if self.max_rss_mb:
+            rss = descendant_rss_mb()
+            if rss is not None and rss > self.max_rss_mb:
+                self.recycle_context(f"browser RSS {rss:.0f}MB > {self.max_rss_mb:.0f}MB")
+                return
+        if self.recycle_page_every and self._page_profiles >= self.recycle_page_every:
+            self.recycle_page()
+
+    def call(self, fn, *args, **kwargs):
+        """Run ``fn(page, *args, **kwargs)``; after a browser error relaunch the context and retry once.
+
+        The retry runs ``fn`` again from the start, so ``fn`` should only
+        read the page and return what it found; work with side effects
+        belongs after ``call`` returns.
+        """
+        try:
+            return fn(self.page, *args, **kwargs)
+        except ProfileUnavailable as e:
+            # The profile, not the browser, is the problem; a fresh context would not help
+            if e.kind == "login_wall":
+                self.session.invalidate()
+            raise
+        except SelectorsBroken:
+            raise
+        except Exception as e:
+            self.recycle_context(f"{e.__class__.__name__}: {e}")
+            return fn(self.page, *args, **kwargs)
+
+    def recycle_page(self) -> None:
+        old = self.page
+        self.page = self.context.new_page()
+        try:
+            old.close()
+        except Exception:
+            pass
+        self._page_profiles = 0
+        self.recycles["page"] += 1
+
+    def recycle_context(self, reason: str = "requested") -> None:
+        """Close and relaunch the persistent context (session cookies are kept on disk)."""
+        print(f"[browser] recycling context: {reason}", file=sys.stderr)
+        self.close()
+        self.start()
+        self.recycles["context"] += 1
+
+    def close(self) -> None:
+        if self.context is not None:
+            try:
+                self.context.close()
+            except Exception:
+                pass
+        self.context = None
+        self.page = None
@@ -1,24 +1,59 @@
+"""Command-line entry point: ``scrape``, ``filter``, ``export``, ``redetect`` and ``bench``.
+
+Only ``scrape`` needs Playwright. Each command imports what it uses inside
+its handler, so ``--help`` and the offline commands start without loading
+the browser stack. ``python -m instagram_sponsor.cli --csv …`` without a
+command still means ``scrape``.
+"""
+
 from __future__ import annotations
 
 import argparse
+import itertools
 import os
 import sys
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Iterator
 
-from .scraper import run
-from .utils import read_profile_urls
+from .browser import add_browser_args
+from .fingerprint import add_dedup_args
+from .metrics import METRICS, add_metrics_args
+from .precheck import add_precheck_args
+from .scheduler import add_schedule_args
+from .utils import aggregate_format_for, iter_profile_urls, parse_shard, parse_since, post_cutoff
+from .workqueue import add_queue_args
+from .writer import add_writer_args
 
 
-def parse_args(argv: list[str]) -> argparse.Namespace:
-    ap = argparse.ArgumentParser(
-        prog="instagram-sponsor",
-        description=(
-            "Iterate CSV Instagram profile URLs, open profiles, and capture posts "
-            "with metadata to detect sponsored hotel stays and enrich hotel contacts."
-        ),
+COMMANDS = ("scrape", "filter", "export", "redetect", "bench")
+
+
+def _add_cutoff_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument(
+        "--since",
+        type=parse_since,
+        default=None,
+        help="Cutoff date (ISO); scrape stops each profile at its first (non-pinned) older post",
     )
-    ap.add_argument("--csv", required=True, help="Path to input CSV (must include Instagram profile URL column)")
+    ap.add_argument(
+        "--max-age-days",
+        type=float,
+        default=None,
+        help="Like --since, relative to now (e.g. 14); the later cutoff wins when both are given",
+    )
+
+
+def _add_scrape_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--csv", help="Path to input CSV (must include Instagram profile URL column)")
     ap.add_argument("--url-column", default="Instagram Url", help="CSV column containing profile URLs")
+    ap.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=None,
+        metavar="I/N",
+        help="Only take profiles in shard I of N (0-based, split by URL hash) so N workers can share one CSV",
+    )
     ap.add_argument("--out", default="outputs", help="Output directory (parent of aggregated file)")
     ap.add_argument(
         "--limit",
@@ -26,6 +61,7 @@ def parse_args(argv: list[str]) -> argparse.Namespace:
         default=6,
         help="Max posts per profile to collect (default 6)",
     )
+    _add_cutoff_args(ap)
     ap.add_argument(
         "--headless", action="store_true", help="Run browser headless (first run should be non-headless to login)"
     )
@@ -46,23 +82,31 @@ def parse_args(argv: list[str]) -> argparse.Namespace:
             "Format for the aggregated file: 'json' writes a JSON array of profile objects; 'ndjson' writes one JSON object per line."
         ),
     )
+    add_browser_args(ap)
+    add_writer_args(ap)
+    add_queue_args(ap)
+    add_schedule_args(ap)
+    add_metrics_args(ap)
+    add_precheck_args(ap)
+    add_dedup_args(ap)
     ap.add_argument(
         "--google-places-key",
         default=os.environ.get("GOOGLE_PLACES_API_KEY", ""),
         help="Google Places API key (env: GOOGLE_PLACES_API_KEY). Optional.",
     )
-    return ap.parse_args(argv)
 
 
-def main(argv: list[str] | None = None) -> int:
-    ns = parse_args(argv or sys.argv[1:])
-    urls = read_profile_urls(ns.csv, ns.url_column)
-    if not urls:
-        print("No profile URLs found.")
-        return 1
-    Path(ns.out).mkdir(parents=True, exist_ok=True)
-    run(
-        urls,
+def _profile_urls(ns: argparse.Namespace) -> Iterator[str]:
+    from .scheduler import load_history, prioritize
+
+    urls = iter_profile_urls(ns.csv, ns.url_column, shard=ns.shard)
+    if ns.history:
+        urls = iter(prioritize(urls, load_history(ns.history), ns.explore_share, ns.stale_days))
+    return urls
+
+
+def _run_kwargs(ns: argparse.Namespace) -> dict:
+    return dict(
         out_dir=ns.out,
         limit=ns.limit,
         headless=ns.headless,
@@ -70,10 +114,274 @@ def main(argv: list[str] | None = None) -> int:
         out_file=ns.out_file,
         aggregate_format=ns.aggregate_format,
         google_places_api_key=(ns.google_places_key or None),
+        recycle_page_every=ns.recycle_page_every,
+        recycle_context_every=ns.recycle_context_every,
+        max_rss_mb=ns.max_browser_rss_mb,
+        session_check_hours=ns.session_check_hours,
+        flush_every=ns.flush_every,
+        flush_interval=ns.flush_interval,
+        since=post_cutoff(ns.since, ns.max_age_days),
+        precheck=_precheck(ns),
+        caption_dedup=ns.caption_dedup,
+    )
+
+
+def _precheck(ns: argparse.Namespace):
+    if not ns.precheck:
+        return None
+    from .precheck import PreChecker
+
+    return PreChecker(ns.precheck_cache, workers=ns.precheck_workers)
+
+
+def _scrape_queue(ns: argparse.Namespace) -> int:
+    from .scraper import run
+    from .workqueue import WorkQueue, export_results
+
+    queue = WorkQueue(ns.queue, lease_seconds=ns.lease_seconds, max_attempts=ns.max_attempts)
+    try:
+        if ns.queue_export:
+            n = export_results(queue, ns.out_file, ns.aggregate_format)
+            print(f"Exported {n} profile(s) → {ns.out_file}", file=sys.stderr)
+            return 0
+        if ns.csv:
+            urls = _profile_urls(ns)
+            if ns.precheck:
+                urls = _precheck(ns).filter(urls)
+            added = queue.enqueue(urls)
+            print(f"Queued {added} new profile(s) → {ns.queue}", file=sys.stderr)
+        Path(ns.out).mkdir(parents=True, exist_ok=True)
+        run([], queue=queue, **dict(_run_kwargs(ns), precheck=None))
+    finally:
+        queue.close()
+    return 0
+
+
+def _cmd_scrape(ns: argparse.Namespace) -> int:
+    from .metrics import start_metrics
+
+    stop_metrics = start_metrics(ns.metrics_port, ns.metrics_json, ns.metrics_interval)
+    try:
+        return _scrape_queue(ns) if ns.queue else _scrape_csv(ns)
+    finally:
+        stop_metrics()
+
+
+def _scrape_csv(ns: argparse.Namespace) -> int:
+    from .scraper import run
+
+    urls = _profile_urls(ns)
+    first = next(urls, None)
+    if first is None:
+        print("No profile URLs found.")
+        return 1
+    Path(ns.out).mkdir(parents=True, exist_ok=True)
+    run(itertools.chain([first], urls), **_run_kwargs(ns))
+    return 0
+
+
+@contextmanager
+def _replacing(out: Path) -> Iterator[Path]:
+    """Yield a temp path beside ``out`` that replaces it, hotels sidecar included, only on success."""
+    from .hotels import hotels_sidecar_path
+
+    tmp = out.with_name(f".{out.stem}.tmp{out.suffix}")
+    tmp_sidecar = hotels_sidecar_path(tmp)
+    for p in (tmp, tmp_sidecar):
+        p.unlink(missing_ok=True)
+    try:
+        yield tmp
+    except BaseException:
+        for p in (tmp, tmp_sidecar):
+            p.unlink(missing_ok=True)
+        raise
+    os.replace(tmp, out)
+    if tmp_sidecar.exists():
+        os.replace(tmp_sidecar, hotels_sidecar_path(out))
+
+
+def _cmd_filter(ns: argparse.Namespace) -> int:
+    from dataclasses import replace
+
+    from .hotels import load_hotels
+    from .pipeline import keep_post
+    from .utils import iter_aggregate
+    from .writer import AggregateWriter
+
+    if Path(ns.output).resolve() == Path(ns.input).resolve():
+        print("--output must differ from --input", file=sys.stderr)
+        return 2
+    cutoff = post_cutoff(ns.since, ns.max_age_days)
+    hotels = load_hotels(ns.input, aggregate_format_for(ns.input))
+    referenced = set()
+    profiles = posts = 0
+    out = Path(ns.output)
+    fmt = aggregate_format_for(out)
+    with _replacing(out) as tmp, AggregateWriter(
+        tmp,
+        fmt,
+        # JSON is written once at close; NDJSON appends as it goes
+        flush_every=1000 if fmt == "ndjson" else 0,
+        flush_interval=float("inf"),
+        hotels=lambda: [h for h in hotels if h.get("hotel_id") in referenced],
+    ) as writer:
+        for payload in iter_aggregate(ns.input):
+            kept = [p for p in payload.posts if keep_post(p, not ns.all_posts, cutoff)]
+            if not kept and not ns.keep_empty:
+                continue
+            referenced.update(p.hotel_id for p in kept)
+            writer.add(replace(payload, posts=kept))
+            profiles += 1
+            posts += len(kept)
+    print(f"Kept {posts} post(s) from {profiles} profile(s) → {out}", file=sys.stderr)
+    return 0
+
+
+def _cmd_export(ns: argparse.Namespace) -> int:
+    from .export import HotelsCsvWriter
+    from .pipeline import keep_post
+    from .utils import iter_aggregate
+
+    cutoff = post_cutoff(ns.since, ns.max_age_days)
+    out = Path(ns.output)
+    if out.exists() and not ns.append:
+        out.unlink()
+    rows = 0
+    with HotelsCsvWriter(out) as w:
+        for payload in iter_aggregate(ns.input):
+            kept = [p for p in payload.posts if keep_post(p, not ns.all_posts, cutoff)]
+            rows += w.write_profile(payload.profile_url, kept)
+    print(f"Wrote {rows} row(s) → {out}", file=sys.stderr)
+    return 0
+
+
+def _cmd_redetect(ns: argparse.Namespace) -> int:
+    from .annotate import annotate_post
+    from .fingerprint import CaptionIndex
+    from .hotels import HotelRegistry, load_hotels
+    from .utils import iter_aggregate
+    from .writer import AggregateWriter
+
+    if Path(ns.output).resolve() == Path(ns.input).resolve():
+        print("--output must differ from --input", file=sys.stderr)
+        return 2
+    # Counts are rebuilt from the re-detected posts
+    rows = [dict(r, post_count=0) for r in load_hotels(ns.input, aggregate_format_for(ns.input))]
+    hotels = HotelRegistry(ns.google_places_key or None, rows=rows, enrich=ns.enrich)
+    captions = CaptionIndex() if ns.caption_dedup else None
+    before = after = total = 0
+    out = Path(ns.output)
+    fmt = aggregate_format_for(out)
+    with _replacing(out) as tmp, AggregateWriter(
+        tmp,
+        fmt,
+        # JSON is written once at close; NDJSON appends as it goes
+        flush_every=1000 if fmt == "ndjson" else 0,
+        flush_interval=float("inf"),
+        hotels=hotels.table,
+    ) as writer:
+        for payload in iter_aggregate(ns.input):
+            for post in payload.posts:
+                before += bool(post.sponsored)
+                # The banner is only seen in the browser; its earlier verdict is all we have
+                banner = "banner" in post.sponsored_reasons
+                annotate_post(post, banner, ns.google_places_key or None, hotels, captions)
+                after += bool(post.sponsored)
+                total += 1
+            writer.add(payload)
+    print(
+        f"Re-detected {total} post(s): {after} sponsored (was {before}); "
+        f"{hotels.enrichments} hotel(s) enriched, {_caption_repeats()} repeated caption(s) reused → {out}",
+        file=sys.stderr,
     )
     return 0
 
 
+def _caption_repeats() -> int:
+    return int(METRICS.value("caption_duplicates_total", match="exact") + METRICS.value("caption_duplicates_total", match="near"))
+
+
+def _cmd_bench(ns: argparse.Namespace) -> int:
+    if ns.memory:
+        from .bench import run_memory_bench
+
+        return run_memory_bench(ns.posts)
+    from .bench import run_import_bench
+
+    return run_import_bench(budget_ms=ns.budget_ms, repeat=ns.repeat)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(
+        prog="instagram-sponsor",
+        description=(
+            "Iterate CSV Instagram profile URLs, open profiles, and capture posts "
+            "with metadata to detect sponsored hotel stays and enrich hotel contacts."
+        ),
+    )
+    sub = ap.add_subparsers(dest="command", metavar="COMMAND", required=True)
+
+    sp = sub.add_parser("scrape", help="Scrape profiles from a CSV or a work queue (needs Playwright)")
+    _add_scrape_args(sp)
+    sp.set_defaults(func=_cmd_scrape)
+
+    sp = sub.add_parser("filter", help="Write an aggregate keeping only sponsored and/or recent posts")
+    sp.add_argument("--input", default="outputs/all.json", help="Aggregate to read (.json or .ndjson)")
+    sp.add_argument("--output", required=True, help="Aggregate to write; format follows the suffix")
+    sp.add_argument("--all-posts", action="store_true", help="Keep non-sponsored posts too")
+    sp.add_argument("--keep-empty", action="store_true", help="Keep profiles left with no posts")
+    _add_cutoff_args(sp)
+    sp.set_defaults(func=_cmd_filter)
+
+    sp = sub.add_parser("export", help="Export an aggregate's posts to the hotels CSV")
+    sp.add_argument("--input", default="outputs/all.json", help="Aggregate to read (.json or .ndjson)")
+    sp.add_argument("--output", default="outputs/hotels.csv", help="CSV to write (default: outputs/hotels.csv)")
+    sp.add_argument("--all-posts", action="store_true", help="Export every post, not only sponsored ones")
+    sp.add_argument("--append", action="store_true", help="Append to an existing CSV instead of replacing it")
+    _add_cutoff_args(sp)
+    sp.set_defaults(func=_cmd_export)
+
+    sp = sub.add_parser("redetect", help="Re-run sponsorship and hotel detection over a saved aggregate")
+    sp.add_argument("--input", default="outputs/all.json", help="Aggregate to read (.json or .ndjson)")
+    sp.add_argument("--output", required=True, help="Aggregate to write; format follows the suffix")
+    sp.add_argument(
+        "--no-enrich",
+        dest="enrich",
+        action="store_false",
+        help="Only reuse hotels already in the aggregate's table; make no network requests",
+    )
+    sp.add_argument(
+        "--google-places-key",
+        default=os.environ.get("GOOGLE_PLACES_API_KEY", ""),
+        help="Google Places API key (env: GOOGLE_PLACES_API_KEY). Optional.",
+    )
+    add_dedup_args(sp)
+    sp.set_defaults(func=_cmd_redetect)
+
+    sp = sub.add_parser("bench", help="Measure start-up import time of each command, or post memory")
+    sp.add_argument("--budget-ms", type=float, default=100.0, help="Fail if an offline command exceeds this (default 100)")
+    sp.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per measurement; the best is kept (default 5)")
+    sp.add_argument("--memory", action="store_true", help="Compare memory of posts held as dicts and as records instead")
+    sp.add_argument("--posts", type=int, default=100_000, help="Synthetic posts for --memory (default 100000)")
+    sp.set_defaults(func=_cmd_bench)
+    return ap
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    if argv and argv[0] not in COMMANDS and argv[0] not in ("-h", "--help"):
+        # Invocations from before the subcommands existed
+        argv = ["scrape", *argv]
+    ap = build_parser()
+    ns = ap.parse_args(argv)
+    if ns.command == "scrape" and not ns.csv and not ns.queue:
+        ap.error("scrape: --csv is required unless --queue is given")
+    return ns
+
+
+def main(argv: list[str] | None = None) -> int:
+    ns = parse_args(argv or sys.argv[1:])
+    return ns.func(ns)
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
-
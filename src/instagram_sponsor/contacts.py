@@ -0,0 +1,244 @@
+"""Streaming contact extractor for hotel web pages.
+
+``ContactExtractor`` is an ``html.parser`` fed one chunk at a time, so a
+page is never held in memory whole. In one pass it collects every email and
+phone number it can attribute, scored by where it was found:
+
+- ``mailto:`` / ``tel:`` links and schema.org ``email`` / ``telephone``
+  microdata and JSON-LD fields are explicit and score high.
+- Addresses and numbers in visible text score lower. A number scores higher
+  when a word like "phone" or "tel" precedes it, and it is rejected when it
+  looks like a date range, a year or a bare ID.
+
+Repeated sightings add a small bonus. ``emails()`` / ``phones()`` return the
+candidates best first.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import unquote, urldefrag, urljoin
+
+SCORE_LINK = 10.0
+SCORE_STRUCTURED = 9.0
+SCORE_TEXT_EMAIL = 5.0
+SCORE_TEXT_PHONE = 3.0
+# Scores trusted enough to stop looking: any well-formed email, a labelled or linked phone
+CONFIDENT_EMAIL = 5.0
+CONFIDENT_PHONE = 6.0
+
+_EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,24}")
+_PHONE_RE = re.compile(r"(?<![\w/])\+?\(?\d[\d\s().-]{5,20}\d(?![\w/])")
+_PHONE_CONTEXT_RE = re.compile(r"(phone|tel|telephone|call(?: us)?|whats ?app|mobile|fax|reservations?)\W{0,6}$", re.I)
+_DATE_LIKE_RE = re.compile(r"^\s*(?:19|20)\d\d\s*[-/–]\s*(?:(?:19|20)?\d\d|\d{1,2}[-/]\d{1,2})\s*$|^\d{1,4}[./-]\d{1,2}[./-]\d{1,4}$")
+_IMAGE_TLDS = ("png", "jpg", "jpeg", "gif", "webp", "svg")
+_IGNORED_EMAIL_DOMAINS = ("example.com", "sentry.io", "wixpress.com", "domain.com")
+_TEXT_FLUSH = 64 * 1024
+_CONTEXT_CHARS = 40
+
+
+def confident_contacts(emails: List[Tuple[str, float]], phones: List[Tuple[str, float]]) -> bool:
+    """True if ranked candidates, possibly from several pages, include a trusted email and phone."""
+    return any(score >= CONFIDENT_EMAIL for _, score in emails) and any(score >= CONFIDENT_PHONE for _, score in phones)
+
+
+def normalize_email(raw: str) -> Optional[str]:
+    email = unquote(raw).split("?", 1)[0].strip().strip(".,;:").lower()
+    if not _EMAIL_RE.fullmatch(email):
+        return None
+    domain = email.rsplit("@", 1)[1]
+    if domain.rsplit(".", 1)[-1] in _IMAGE_TLDS or domain.endswith(_IGNORED_EMAIL_DOMAINS):
+        return None
+    return email
+
+
+def normalize_phone(raw: str) -> Optional[Tuple[str, str]]:
+    """``(display form, digits key)`` for a plausible phone number, else None."""
+    display = re.sub(r"\s+", " ", unquote(raw)).strip(" .-")
+    if _DATE_LIKE_RE.match(display):
+        return None
+    digits = re.sub(r"\D", "", display)
+    if not 7 <= len(digits) <= 15 or len(set(digits)) <= 2:
+        return None
+    return display, digits
+
+
+class ContactExtractor(HTMLParser):
+    def __init__(self, base_url: str = "") -> None:
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.links: Set[str] = set()
+        # key -> [best score, display form, sightings]
+        self._emails: Dict[str, List[Any]] = {}
+        self._phones: Dict[str, List[Any]] = {}
+        self._text: List[str] = []
+        self._text_len = 0
+        self._context = ""
+        self._skip = 0  # inside <style>/<noscript> or a non-JSON-LD <script>
+        self._jsonld: Optional[List[str]] = None
+        self._itemprop: Optional[str] = None
+        self._itemprop_text: List[str] = []
+
+    # -- recording ---------------------------------------------------------
+
+    def _add(self, table: Dict[str, List[Any]], key: str, display: str, score: float) -> None:
+        entry = table.get(key)
+        if entry is None:
+            table[key] = [score, display, 1]
+            return
+        if score > entry[0]:
+            entry[0], entry[1] = score, display
+        entry[2] += 1
+
+    def add_email(self, raw: str, score: float) -> None:
+        email = normalize_email(raw)
+        if email:
+            self._add(self._emails, email, email, score)
+
+    def add_phone(self, raw: str, score: float) -> None:
+        norm = normalize_phone(raw)
+        if norm:
+            self._add(self._phones, norm[1], norm[0], score)
+
+    # -- parser callbacks --------------------------------------------------
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        self._flush_text()
+        a = {k: (v or "") for k, v in attrs}
+        if tag in ("style", "noscript") or (tag == "script" and "ld+json" not in a.get("type", "")):
+            self._skip += 1
+            return
+        if tag == "script":
+            self._jsonld = []
+            return
+        href = a.get("href", "").strip()
+        if href:
+            low = href.lower()
+            if low.startswith("mailto:"):
+                self.add_email(href[7:], SCORE_LINK)
+            elif low.startswith("tel:"):
+                self.add_phone(href[4:], SCORE_LINK)
+            elif not low.startswith(("javascript:", "data:", "#")):
+                self.links.add(urldefrag(urljoin(self.base_url, href))[0])
+        prop = a.get("itemprop", "").lower()
+        if prop in ("email", "telephone"):
+            if a.get("content"):
+                self._structured(prop, a["content"])
+            else:
+                self._itemprop, self._itemprop_text = prop, []
+
+    def handle_startendtag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        self.handle_starttag(tag, attrs)
+        if tag in ("style", "noscript", "script"):
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "script" and self._jsonld is not None:
+            self._parse_jsonld("".join(self._jsonld))
+            self._jsonld = None
+            return
+        if tag in ("style", "noscript", "script"):
+            self._skip = max(0, self._skip - 1)
+            return
+        self._flush_text()
+
+    def handle_data(self, data: str) -> None:
+        if self._jsonld is not None:
+            self._jsonld.append(data)
+            return
+        if self._skip:
+            return
+        if self._itemprop is not None:
+            self._itemprop_text.append(data)
+        self._text.append(data)
+        self._text_len += len(data)
+        if self._text_len > _TEXT_FLUSH:
+            self._flush_text()
+
+    def close(self) -> None:
+        super().close()
+        self._flush_text()
+
+    # -- helpers -----------------------------------------------------------
+
+    def _structured(self, prop: str, value: str) -> None:
+        if prop == "email":
+            self.add_email(value.replace("mailto:", ""), SCORE_STRUCTURED)
+        else:
+            self.add_phone(value.replace("tel:", ""), SCORE_STRUCTURED)
+
+    def _parse_jsonld(self, raw: str) -> None:
+        try:
+            obj = json.loads(raw)
+        except ValueError:
+            return
+        stack: List[Any] = [obj]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, dict):
+                for k, v in node.items():
+                    if k in ("email", "telephone") and isinstance(v, str):
+                        self._structured(k, v)
+                    elif isinstance(v, (dict, list)):
+                        stack.append(v)
+            elif isinstance(node, list):
+                stack.extend(node)
+
+    def _flush_text(self) -> None:
+        # Text is scanned per run between tags, so a number split across feed() chunks stays whole
+        if self._itemprop is not None and self._itemprop_text:
+            self._structured(self._itemprop, "".join(self._itemprop_text).strip())
+            self._itemprop = None
+        if not self._text:
+            return
+        text = "".join(self._text)
+        self._text, self._text_len = [], 0
+        for m in _EMAIL_RE.finditer(text):
+            self.add_email(m.group(0), SCORE_TEXT_EMAIL)
+        for m in _PHONE_RE.finditer(text):
+            if m.group(0).isdigit():
+                # An unformatted digit run in running text is an ID or a date far more often than a phone
+                continue
+            before = (self._context + text[: m.start()])[-_CONTEXT_CHARS:]
+            score = SCORE_TEXT_PHONE
+            if _PHONE_CONTEXT_RE.search(before):
+                score += 3
+            if m.group(0).startswith("+"):
+                score += 1
+            self.add_phone(m.group(0), score)
+        self._context = (self._context + text)[-_CONTEXT_CHARS:]
+
+    # -- results -----------------------------------------------------------
+
+    @staticmethod
+    def _ranked(table: Dict[str, List[Any]]) -> List[Tuple[str, float]]:
+        # Each repeat sighting adds 0.25, up to +1
+        scored = [(display, score + min(1.0, 0.25 * (hits - 1))) for score, display, hits in table.values()]
+        return sorted(scored, key=lambda t: -t[1])
+
+    def emails(self) -> List[Tuple[str, float]]:
+        return self._ranked(self._emails)
+
+    def phones(self) -> List[Tuple[str, float]]:
+        return self._ranked(self._phones)
+
+    def best(self) -> Tuple[Optional[str], Optional[str]]:
+        emails, phones = self.emails(), self.phones()
+        return (emails[0][0] if emails else None), (phones[0][0] if phones else None)
+
+    @property
+    def confident(self) -> bool:
+        """An email and a phone have both been seen with enough confidence to stop reading."""
+        return any(e[0] >= CONFIDENT_EMAIL for e in self._emails.values()) and any(
+            p[0] >= CONFIDENT_PHONE for p in self._phones.values()
+        )
+
+
+def extract_contacts(html: str, base_url: str = "") -> ContactExtractor:
+    ex = ContactExtractor(base_url)
+    ex.feed(html)
+    ex.close()
+    return ex
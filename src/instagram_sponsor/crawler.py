@@ -0,0 +1,183 @@
+"""Bounded crawler for hotel contact pages.
+
+Starting from a hotel's website, the homepage is streamed through a
+``ContactExtractor`` that ranks every email and phone number on it and
+collects its links. Unless both fields are already known with confidence,
+the best-ranked same-domain links (contact, about, impressum…) are fetched
+concurrently, up to a per-domain page budget, and the best candidates over
+all pages win. Bodies are read in chunks and parsing stops as soon as both
+fields are confidently known, on one page or across the pages read so far
+(an email on the contact page, a phone on the imprint). Pages still in
+flight at that point are abandoned at their next chunk. Page fetches from
+all concurrent crawls share one pool of ``CRAWL_THREADS`` threads, so
+enrichment workers do not each bring their own. robots.txt is honoured and
+cached per host for the life of the process.
+"""
+
+from __future__ import annotations
+
+import codecs
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+from .contacts import ContactExtractor, confident_contacts
+from .enrichment import UA, _http_get, _http_open
+
+CHUNK_BYTES = 16 * 1024
+MAX_PAGE_BYTES = 512 * 1024
+# Contact-page fetches in flight across all crawls in the process
+CRAWL_THREADS = 4
+
+# Path/anchor keywords and their weight when ranking links to follow
+LINK_KEYWORDS: Tuple[Tuple[str, int], ...] = (
+    ("contact", 10),
+    ("kontakt", 10),
+    ("contacto", 10),
+    ("contatti", 10),
+    ("impressum", 8),
+    ("imprint", 8),
+    ("reach", 6),
+    ("find-us", 6),
+    ("location", 5),
+    ("about", 4),
+    ("reservation", 3),
+    ("booking", 2),
+)
+_SKIP_EXT = (".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg", ".pdf", ".zip", ".mp4", ".css", ".js", ".ico")
+
+
+def rank_link(url: str) -> int:
+    path = urlparse(url).path.lower()
+    if path.endswith(_SKIP_EXT):
+        return 0
+    return max((w for kw, w in LINK_KEYWORDS if kw in path), default=0)
+
+
+def _host(url: str) -> str:
+    host = (urlparse(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+class RobotsCache:
+    """Parsed robots.txt per scheme+host; unreachable files allow everything."""
+
+    def __init__(self) -> None:
+        self._rules: Dict[str, RobotFileParser] = {}
+        self._lock = threading.Lock()
+
+    def allowed(self, url: str, timeout: float = 10) -> bool:
+        p = urlparse(url)
+        base = f"{p.scheme}://{p.netloc}"
+        with self._lock:
+            rp = self._rules.get(base)
+        if rp is None:
+            rp = RobotFileParser()
+            try:
+                rp.parse(_http_get(base + "/robots.txt", timeout=timeout).splitlines())
+            except Exception:
+                rp.parse([])
+            with self._lock:
+                self._rules.setdefault(base, rp)
+        return rp.can_fetch(UA, url)
+
+
+ROBOTS = RobotsCache()
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _crawl_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=CRAWL_THREADS, thread_name_prefix="crawl")
+        return _pool
+
+
+def scan_page(url: str, stop: threading.Event, timeout: float = 10) -> ContactExtractor:
+    """Stream ``url`` through an extractor until the body ends, both fields are confidently found, or ``stop`` is set."""
+    with _http_open(url, timeout=timeout) as resp:
+        final_url = resp.geturl() or url
+        extractor = ContactExtractor(final_url)
+        ctype = (resp.headers.get("Content-Type") or "text/html").lower()
+        if "html" not in ctype and "text" not in ctype:
+            return extractor
+        charset = resp.headers.get_content_charset() or "utf-8"
+        try:
+            decoder = codecs.getincrementaldecoder(charset)(errors="replace")
+        except LookupError:
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        read = 0
+        while read < MAX_PAGE_BYTES and not stop.is_set():
+            chunk = resp.read(CHUNK_BYTES)
+            if not chunk:
+                break
+            read += len(chunk)
+            extractor.feed(decoder.decode(chunk))
+            if extractor.confident:
+                break
+    extractor.close()
+    return extractor
+
+
+def _top(ranked: List[Tuple[str, float]]) -> Optional[str]:
+    return max(ranked, key=lambda t: t[1])[0] if ranked else None
+
+
+def crawl_contacts(
+    website: str,
+    max_pages: int = 4,
+    timeout: float = 10,
+    robots: Optional[RobotsCache] = ROBOTS,
+) -> Tuple[Optional[str], Optional[str], int]:
+    """Return ``(email, phone, pages_fetched)`` for a hotel website.
+
+    At most ``max_pages`` pages of the site's domain are fetched, the
+    homepage first and then the ranked contact pages through the shared pool.
+    """
+    stop = threading.Event()
+    if robots is not None and not robots.allowed(website, timeout):
+        return None, None, 0
+    try:
+        home = scan_page(website, stop, timeout)
+    except Exception:
+        return None, None, 0
+    emails, phones = home.emails(), home.phones()
+    fetched = 1
+    if home.confident or max_pages <= 1:
+        return _top(emails), _top(phones), fetched
+
+    domain = _host(home.base_url)
+    seen = {website, home.base_url}
+    ranked: List[Tuple[int, str]] = sorted(
+        ((rank_link(u), u) for u in home.links if _host(u) == domain and u not in seen),
+        key=lambda t: (-t[0], len(t[1])),
+    )
+    queue = [u for score, u in ranked if score > 0][: max_pages - 1]
+    queue = [u for u in queue if robots is None or robots.allowed(u, timeout)]
+    if not queue:
+        return _top(emails), _top(phones), fetched
+
+    pool = _crawl_pool()
+    pending = {pool.submit(scan_page, u, stop, timeout) for u in queue}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for fut in done:
+            fetched += 1
+            try:
+                page = fut.result()
+            except Exception:
+                continue
+            emails += page.emails()
+            phones += page.phones()
+        if confident_contacts(emails, phones):
+            # Queued pages never start; running ones give up at their next chunk
+            stop.set()
+            for fut in pending:
+                fut.cancel()
+            break
+    return _top(emails), _top(phones), fetched
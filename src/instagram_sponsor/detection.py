@@ -61,21 +61,22 @@ def find_hotel_candidates(
     if location_name:
         ln = location_name.strip()
         if any(term in ln.lower() for term in HOTEL_TERMS):
-            candidates.append({"name": ln, "instagram_handle": ""})
+            candidates.append({"name": ln, "instagram_handle": "", "source": "location"})
 
-    # From tagged accounts / mentions
-    for acc in list(dict.fromkeys((tagged_accounts or []) + (mentions or []))):
+    # From tagged accounts / mentions. The scraper fills tagged accounts from
+    # caption mentions, so the two are one source.
+    for acc in dict.fromkeys([*(tagged_accounts or ()), *(mentions or ())]):
         h = acc.strip().lstrip("@")
         if not h:
             continue
         if any(term in h.lower() for term in HOTEL_TERMS):
-            candidates.append({"name": "", "instagram_handle": h})
+            candidates.append({"name": "", "instagram_handle": h, "source": "tagged"})
 
     # From caption fuzzy (look for hotel term followed by words)
     m = re.search(r"\b(" + "|".join(map(re.escape, HOTEL_TERMS)) + r")\b.*", text)
     if m:
         frag = text[m.start(): m.end()]
-        candidates.append({"name": frag[:80].strip(), "instagram_handle": ""})
+        candidates.append({"name": frag[:80].strip(), "instagram_handle": "", "source": "caption"})
 
     # Deduplicate by (name, handle)
     seen = set()
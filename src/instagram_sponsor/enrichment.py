@@ -14,26 +14,30 @@ UA = (
 )
 
 
-def _http_get(url: str, timeout: int = 20) -> str:
+def _http_open(url: str, timeout: float = 20):
+    """Open ``url`` with the browser UA; the caller reads (or streams) and closes the response.
+
+    Goes through the on-disk conditional-request cache unless it is disabled.
+    """
+    from .httpcache import default_cache
+
     req = Request(url, headers={"User-Agent": UA})
-    with urlopen(req, timeout=timeout) as resp:
-        return resp.read().decode("utf-8", errors="replace")
+    cache = default_cache()
+    if cache is None:
+        return urlopen(req, timeout=timeout)
+    return cache.open(req, timeout=timeout)
 
 
-_MAIL_RE = re.compile(r"mailto:([a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+)")
-_PHONE_RE = re.compile(r"\+?\d[\d\s().-]{7,}\d")
+def _http_get(url: str, timeout: float = 20) -> str:
+    with _http_open(url, timeout=timeout) as resp:
+        return resp.read().decode("utf-8", errors="replace")
 
 
 def parse_contact_from_html(html: str) -> Tuple[Optional[str], Optional[str]]:
-    email = None
-    phone = None
-    m = _MAIL_RE.search(html)
-    if m:
-        email = m.group(1)
-    m2 = _PHONE_RE.search(html)
-    if m2:
-        phone = m2.group(0)
-    return email, phone
+    """Best-ranked ``(email, phone)`` on a page; see ``contacts.ContactExtractor``."""
+    from .contacts import extract_contacts
+
+    return extract_contacts(html).best()
 
 
 def enrich_from_instagram_bio_html(html: str) -> Tuple[Optional[str], Optional[str]]:
@@ -98,23 +102,15 @@ def enrich_hotel_candidate(
         except Exception:
             pass
 
-    # Crawl website home/contact if we have a website
-    if website and source == "instagram_bio":
-        try:
-            home = _http_get(website)
-            e2, p2 = parse_contact_from_html(home)
+    # Crawl the website's home and likely contact pages if we have a website
+    if website and source == "instagram_bio" and not (email and phone):
+        from .crawler import crawl_contacts
+
+        e2, p2, _ = crawl_contacts(website)
+        if (e2 and not email) or (p2 and not phone):
             email = email or e2
             phone = phone or p2
-            # Try a naive contact/about link
-            m = re.search(r"href=\"(https?://[^\"]*(contact|about)[^\"]*)\"", home, re.I)
-            if m:
-                cont = _http_get(m.group(1))
-                e3, p3 = parse_contact_from_html(cont)
-                email = email or e3
-                phone = phone or p3
-                source = "website_crawl"
-        except Exception:
-            pass
+            source = "website_crawl"
 
     # Google Places fallback
     if (not website or not email) and (candidate.get("name") or "") and google_places_api_key:
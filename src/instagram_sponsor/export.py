@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import csv
+from pathlib import Path
+from typing import List
+
+from .records import HotelInfo, Post
+
+HOTELS_CSV_HEADER = [
+    "Creator Profile",
+    "Post URL",
+    "Post Date",
+    "Sponsored",
+    "Reason",
+    "Hotel Name",
+    "Hotel Instagram",
+    "Hotel Website",
+    "Hotel Email",
+    "Hotel Address",
+    "Hotel Phone",
+    "Enrichment Source",
+]
+
+
+_NO_HOTEL = HotelInfo()
+
+
+def hotel_row(profile_url: str, post: Post) -> List:
+    hotel = post.hotel or _NO_HOTEL
+    return [
+        profile_url,
+        post.post_url or "",
+        post.date_iso,
+        bool(post.sponsored),
+        ",".join(post.sponsored_reasons),
+        hotel.name or "",
+        hotel.instagram_handle or "",
+        hotel.website or "",
+        hotel.email or "",
+        hotel.address or "",
+        hotel.phone or "",
+        hotel.enrichment_source or "",
+    ]
+
+
+class HotelsCsvWriter:
+    """Append hotel rows to a CSV as profiles complete.
+
+    The header is written only when the file is new or empty, so an existing
+    export is extended rather than rewritten. Rows are flushed per profile.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        p = Path(path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        fresh = not p.exists() or p.stat().st_size == 0
+        self._f = p.open("a", newline="", encoding="utf-8")
+        self._w = csv.writer(self._f)
+        if fresh:
+            self._w.writerow(HOTELS_CSV_HEADER)
+            self._f.flush()
+
+    def write_profile(self, profile_url: str, posts: List[Post]) -> int:
+        for post in posts:
+            self._w.writerow(hotel_row(profile_url, post))
+        self._f.flush()
+        return len(posts)
+
+    def close(self) -> None:
+        self._f.close()
+
+    def __enter__(self) -> "HotelsCsvWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
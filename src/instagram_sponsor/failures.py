@@ -0,0 +1,81 @@
+"""Why a profile could not be scraped, and when to try it again.
+
+``ProfileUnavailable`` carries one of ``FAILURE_KINDS``. Private and missing
+profiles are permanent: they are recorded with an ``unavailable`` marker so
+later runs skip them. Timeouts and login walls are transient: the profile is
+retried after an exponential backoff instead of being stored with no
+posts, which would mark it scraped for good.
+"""
+
+from __future__ import annotations
+
+import heapq
+import random
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+FAILURE_KINDS = ("timeout", "login_wall", "private", "not_found")
+TRANSIENT_KINDS = ("timeout", "login_wall")
+
+
+class ProfileUnavailable(Exception):
+    def __init__(self, kind: str, url: str, detail: str = "") -> None:
+        super().__init__(f"{kind}: {url}" + (f" ({detail})" if detail else ""))
+        self.kind = kind
+        self.url = url
+
+    @property
+    def transient(self) -> bool:
+        return self.kind in TRANSIENT_KINDS
+
+
+def backoff_delay(attempt: int, base: float = 60.0, cap: float = 900.0) -> float:
+    """Seconds to wait before retry number ``attempt`` (1-based), with ±25% jitter."""
+    return min(cap, base * 2 ** (attempt - 1)) * random.uniform(0.75, 1.25)
+
+
+class RetryQueue:
+    """Profiles waiting for another attempt after a transient failure."""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 60.0, max_delay: float = 900.0) -> None:
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.attempts: Dict[str, int] = {}
+        self._heap: List[Tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, url: str) -> Optional[float]:
+        """Schedule ``url`` again; returns the delay, or None once its attempts are used up."""
+        n = self.attempts.get(url, 1)
+        if n >= self.max_attempts:
+            return None
+        self.attempts[url] = n + 1
+        delay = backoff_delay(n, self.base_delay, self.max_delay)
+        heapq.heappush(self._heap, (time.monotonic() + delay, url))
+        return delay
+
+    def pop_due(self) -> Optional[str]:
+        if self._heap and self._heap[0][0] <= time.monotonic():
+            return heapq.heappop(self._heap)[1]
+        return None
+
+    def wait_next(self) -> Optional[str]:
+        """Sleep until the next retry is due and return it; None when nothing is waiting."""
+        if not self._heap:
+            return None
+        due, url = heapq.heappop(self._heap)
+        time.sleep(max(0.0, due - time.monotonic()))
+        return url
+
+
+def with_retries(urls: Iterable[str], retries: RetryQueue) -> Iterator[str]:
+    """Interleave due retries with ``urls``, then wait out the retries left at the end."""
+    for url in urls:
+        while (due := retries.pop_due()) is not None:
+            yield due
+        yield url
+    while (url := retries.wait_next()) is not None:
+        yield url
@@ -0,0 +1,121 @@
+"""Caption fingerprints, so repeated content is annotated once.
+
+Creators cross-post one caption as a reel and a post, and agencies hand the
+same caption, give or take a line, to many creators. A caption is normalized
+(NFKC, case-folded, URLs, punctuation and emoji dropped) and gets two
+fingerprints:
+
+- ``exact``: a 64-bit hash of the normalized text.
+- ``sim``: a 64-bit SimHash over word pairs. Captions within
+  ``max_distance`` differing bits (default 6) are near copies. Captions
+  shorter than ``min_tokens`` words get no SimHash, since a few shared
+  words say little.
+
+``CaptionIndex`` stores a value per fingerprint. Near lookups split the 64
+bits into ``max_distance + 1`` bands. A near copy matches its original
+exactly on at least one band, so only entries sharing a band are compared.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+EXACT, NEAR = "exact", "near"
+
+_URL_RE = re.compile(r"https?://\S+|www\.\S+")
+# Words, hashtags and mentions; punctuation and emoji fall away
+_TOKEN_RE = re.compile(r"[#@]?\w+")
+
+
+def add_dedup_args(ap) -> None:
+    """Register the caption de-duplication option shared by the scrape, pipeline and redetect CLIs."""
+    ap.add_argument(
+        "--no-caption-dedup",
+        dest="caption_dedup",
+        action="store_false",
+        help="Annotate every post from scratch instead of reusing the results of a repeated caption",
+    )
+
+
+def caption_tokens(text: str) -> List[str]:
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    return _TOKEN_RE.findall(_URL_RE.sub(" ", text))
+
+
+def _hash64(s: str) -> int:
+    return int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(tokens: List[str], shingle: int = 2) -> int:
+    """64-bit SimHash of ``tokens`` over ``shingle``-word windows."""
+    grams = [" ".join(tokens[i:i + shingle]) for i in range(max(1, len(tokens) - shingle + 1))]
+    counts = [0] * 64
+    for g in grams:
+        h = _hash64(g)
+        for bit in range(64):
+            counts[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit, c in enumerate(counts) if c > 0)
+
+
+@dataclass(frozen=True, slots=True)
+class Fingerprint:
+    exact: int
+    sim: Optional[int] = None
+
+
+def fingerprint(caption: str, min_tokens: int = 8) -> Optional[Fingerprint]:
+    """Fingerprint of ``caption``; None when nothing is left after normalizing."""
+    tokens = caption_tokens(caption)
+    if not tokens:
+        return None
+    return Fingerprint(_hash64(" ".join(tokens)), simhash(tokens) if len(tokens) >= min_tokens else None)
+
+
+class CaptionIndex:
+    """Values keyed by caption fingerprint, found again by exact or near match. Thread-safe."""
+
+    def __init__(self, max_distance: int = 6, min_tokens: int = 8) -> None:
+        self.max_distance = max_distance
+        self.min_tokens = min_tokens
+        n = max_distance + 1
+        self._bands = [(i * 64 // n, (i + 1) * 64 // n - i * 64 // n) for i in range(n)]
+        self._exact: Dict[int, Any] = {}
+        self._near: List[Dict[int, List[Tuple[int, int]]]] = [{} for _ in self._bands]
+        self._lock = threading.Lock()
+
+    def fingerprint(self, caption: str) -> Optional[Fingerprint]:
+        return fingerprint(caption, self.min_tokens)
+
+    def _band_keys(self, sim: int) -> List[int]:
+        return [sim >> shift & ((1 << width) - 1) for shift, width in self._bands]
+
+    def lookup(self, fp: Fingerprint) -> Tuple[Optional[str], Any]:
+        """``(EXACT or NEAR, value)`` for a stored copy of ``fp``, else ``(None, None)``."""
+        with self._lock:
+            if fp.exact in self._exact:
+                return EXACT, self._exact[fp.exact]
+            if fp.sim is None:
+                return None, None
+            best: Optional[Tuple[int, int]] = None
+            for band, key in zip(self._near, self._band_keys(fp.sim)):
+                for sim, exact in band.get(key, ()):
+                    d = (sim ^ fp.sim).bit_count()
+                    if d <= self.max_distance and (best is None or d < best[0]):
+                        best = (d, exact)
+            return (NEAR, self._exact[best[1]]) if best is not None else (None, None)
+
+    def put(self, fp: Fingerprint, value: Any) -> None:
+        with self._lock:
+            fresh = fp.exact not in self._exact
+            self._exact[fp.exact] = value
+            if fresh and fp.sim is not None:
+                for band, key in zip(self._near, self._band_keys(fp.sim)):
+                    band.setdefault(key, []).append((fp.sim, fp.exact))
+
+    def __len__(self) -> int:
+        return len(self._exact)
@@ -0,0 +1,204 @@
+"""In-run hotel entity registry.
+
+A popular resort tagged by many creators used to be enriched once per
+sponsored post. The registry keys hotel candidates by canonical Instagram
+handle or normalized name, enriches each entity once (concurrent requests for
+the same hotel wait on the first), and hands out a stable ``hotel_id`` that
+posts reference. A free-text name that misses exactly is resolved fuzzily
+through a trigram index over known names, so caption fragments of one hotel
+share an entity. A fuzzy match must also agree word for word once generic
+words ("hotel", "resort", "the"…) are dropped, allowing only a typo-sized
+difference per word, so "hotel in paris with my love" never resolves to the
+Rome one. Handles are canonical and only ever match exactly, and fuzzy
+matches are not remembered as aliases. ``table()`` is emitted as the
+``hotels`` table beside the aggregate.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from .resolver import TrigramIndex, trigrams
+
+
+_HOTEL_FIELDS = ("website", "email", "address", "phone", "enrichment_source")
+# Words that say nothing about which hotel is meant
+_GENERIC_WORDS = frozenset(
+    "the a an and of in at by on hotel hotels resort resorts spa suites inn lodge boutique de la le el".split()
+)
+
+
+def normalize_hotel_name(name: str) -> str:
+    s = re.sub(r"[^\w\s]", " ", (name or "").lower())
+    s = re.sub(r"\s+", " ", s).strip()
+    return s[4:] if s.startswith("the ") else s
+
+
+def hotel_key(candidate: Dict[str, str]) -> str:
+    handle = (candidate.get("instagram_handle") or "").strip().lstrip("@").lower()
+    if handle:
+        return f"ig:{handle}"
+    return f"name:{normalize_hotel_name(candidate.get('name') or '')}"
+
+
+def hotel_id_for(key: str) -> str:
+    # Stable across runs so ids in older aggregates stay valid
+    return "h_" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+
+
+def hotels_sidecar_path(agg_path: str | Path) -> Path:
+    p = Path(agg_path)
+    return p.with_name(f"{p.stem}.hotels.json")
+
+
+def load_hotels(agg_path: str | Path, aggregate_format: str = "json") -> List[Dict]:
+    """Read the hotels table saved with an aggregate (inline for JSON, sidecar for NDJSON)."""
+    p = Path(agg_path) if aggregate_format != "ndjson" else hotels_sidecar_path(agg_path)
+    try:
+        with p.open("r", encoding="utf-8") as f:
+            obj = json.load(f)
+    except (OSError, ValueError):
+        return []
+    rows = obj.get("hotels") if isinstance(obj, dict) else None
+    return [r for r in rows if isinstance(r, dict)] if isinstance(rows, list) else []
+
+
+def _distinctive_words(name: str) -> FrozenSet[str]:
+    return frozenset(normalize_hotel_name(name).replace("_", " ").split()) - _GENERIC_WORDS
+
+
+def _similar_word(a: str, b: str) -> bool:
+    ga, gb = trigrams(a), trigrams(b)
+    return min(len(a), len(b)) >= 5 and 2 * len(ga & gb) / (len(ga) + len(gb)) >= 0.6
+
+
+def names_agree(a: str, b: str) -> bool:
+    """True if two hotel names share their distinctive words, up to a typo in each."""
+    wa, wb = _distinctive_words(a), _distinctive_words(b)
+    if not wa or not wb:
+        return False
+    only_a, only_b = wa - wb, wb - wa
+    return len(only_a) == len(only_b) and all(any(_similar_word(x, y) for y in only_b) for x in only_a)
+
+
+class HotelRegistry:
+    def __init__(
+        self,
+        google_places_api_key: Optional[str] = None,
+        rows: Optional[List[Dict]] = None,
+        match_threshold: float = 0.7,
+        enrich: bool = True,
+    ) -> None:
+        self.google_places_api_key = google_places_api_key
+        # False: resolve against known hotels only; unknown ones get empty fields and no id
+        self.enrich = enrich
+        self._hotels: Dict[str, Dict] = {}
+        self._ids: Dict[str, str] = {}
+        self._inflight: Dict[str, threading.Event] = {}
+        self._index = TrigramIndex(threshold=match_threshold)
+        self._lock = threading.Lock()
+        self.enrichments = 0
+        self.hits = 0
+        self.fuzzy_hits = 0
+        for row in rows or []:
+            key = row.get("key")
+            if key and row.get("hotel_id"):
+                self._ids[key] = row["hotel_id"]
+                self._hotels[row["hotel_id"]] = dict(row, post_count=int(row.get("post_count") or 0))
+                self._index_row(row)
+
+    def _index_row(self, row: Dict) -> None:
+        if row.get("name"):
+            self._index.add(row["name"], row["hotel_id"])
+
+    def _fuzzy_match(self, candidate: Dict[str, str]) -> Optional[str]:
+        # Handles are canonical; only a free-text name is matched fuzzily
+        name = candidate.get("name") or ""
+        if (candidate.get("instagram_handle") or "").strip().lstrip("@") or not name:
+            return None
+        for hid, _score in self._index.candidates(name):
+            if names_agree(name, self._hotels[hid].get("name") or ""):
+                return hid
+        return None
+
+    def _known(self, key: str, candidate: Dict[str, str], count: bool) -> Optional[Tuple[str, Dict[str, Optional[str]]]]:
+        # Caller holds the lock
+        hid = self._ids.get(key)
+        if hid is None:
+            hid = self._fuzzy_match(candidate)
+            if hid is not None:
+                self.fuzzy_hits += 1
+        if hid is None:
+            return None
+        row = self._hotels[hid]
+        row["post_count"] += int(count)
+        self.hits += 1
+        return hid, {f: row.get(f) for f in _HOTEL_FIELDS}
+
+    def lookup(self, candidate: Dict[str, str]) -> Optional[Tuple[str, Dict[str, Optional[str]]]]:
+        """``(hotel_id, fields)`` if the hotel is already known, without enriching or counting a post."""
+        with self._lock:
+            return self._known(hotel_key(candidate), candidate, count=False)
+
+    def resolve(
+        self, candidate: Dict[str, str], count: bool = True
+    ) -> Tuple[Optional[str], Dict[str, Optional[str]]]:
+        """Return ``(hotel_id, enriched fields)``, enriching only on first sight.
+
+        ``count=False`` leaves ``post_count`` alone, for candidates that may
+        not end up on the post; see ``count_post``.
+        """
+        key = hotel_key(candidate)
+        while True:
+            with self._lock:
+                known = self._known(key, candidate, count)
+                if known is not None:
+                    return known
+                if not self.enrich:
+                    return None, {f: None for f in _HOTEL_FIELDS}
+                waiter = self._inflight.get(key)
+                if waiter is None:
+                    self._inflight[key] = threading.Event()
+                    break
+            # Another worker is enriching this hotel; wait for its answer
+            waiter.wait()
+
+        # urllib is only loaded once a hotel actually needs enriching
+        from .enrichment import enrich_hotel_candidate
+
+        try:
+            enriched = enrich_hotel_candidate(candidate, self.google_places_api_key)
+        except Exception:
+            with self._lock:
+                self._inflight.pop(key).set()
+            raise
+        hid = hotel_id_for(key)
+        with self._lock:
+            self._hotels[hid] = {
+                "hotel_id": hid,
+                "key": key,
+                "name": candidate.get("name") or None,
+                "instagram_handle": candidate.get("instagram_handle") or None,
+                **{f: enriched.get(f) for f in _HOTEL_FIELDS},
+                "post_count": int(count),
+            }
+            self._ids[key] = hid
+            self._index_row(self._hotels[hid])
+            self.enrichments += 1
+            self._inflight.pop(key).set()
+        return hid, enriched
+
+    def count_post(self, hotel_id: str) -> None:
+        with self._lock:
+            row = self._hotels.get(hotel_id)
+            if row is not None:
+                row["post_count"] += 1
+
+    def table(self) -> List[Dict]:
+        with self._lock:
+            return [dict(row) for row in self._hotels.values()]
@@ -0,0 +1,325 @@
+"""On-disk HTTP cache with conditional revalidation.
+
+Sits under ``enrichment._http_open`` so the Instagram bio fetches, the
+website crawler and robots.txt lookups all share it. A 200 response is
+stored with its ``ETag``, ``Last-Modified``, ``Cache-Control`` and
+``Expires``. Later requests are answered from disk while ``max-age`` (or,
+without one, ``Expires``) holds, and are otherwise revalidated with
+``If-None-Match`` / ``If-Modified-Since``. A 304 is served from the stored
+body, so an unchanged page costs one round trip and no body.
+
+Bodies are written to disk as the caller reads them and are only kept when
+read to the end. A page the crawler abandons early is not cached, since a
+later reader could need the rest. ``no-store`` responses and bodies over
+``max_body_bytes`` are never stored, and neither are requests that carry an
+API key or token in their query string (Google Places lookups): nothing
+keyed by a secret is written to disk.
+
+The stored bodies are kept under ``max_bytes`` in total. When a new body
+pushes them over, the least recently used entries (by body mtime, which a
+cache hit refreshes) are deleted until they are back under 90% of the limit.
+The running total is kept per process, so workers sharing one directory can
+overshoot it briefly; each one trims it again on its next store.
+
+The directory comes from ``HTTP_CACHE_DIR`` (default ``outputs/.http_cache``);
+set it to ``off`` to disable caching. ``HTTP_CACHE_MAX_MB`` sets the size
+limit (default 256).
+"""
+
+from __future__ import annotations
+
+import email.message
+import email.utils
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+DEFAULT_DIR = "outputs/.http_cache"
+DEFAULT_MAX_MB = 256
+_KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Cache-Control", "Expires")
+_MAX_AGE_RE = re.compile(r"max-age\s*=\s*(\d+)", re.I)
+_SECRET_PARAM_RE = re.compile(r"([?&](?:key|api_key|token)=)[^&]*", re.I)
+
+
+def _cache_control(headers: Dict[str, str]) -> str:
+    return (headers.get("Cache-Control") or "").lower()
+
+
+def _expires(headers: Dict[str, str]) -> Optional[float]:
+    try:
+        return email.utils.parsedate_to_datetime(headers["Expires"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        # Missing, or an invalid date such as "0", which means already expired
+        return None
+
+
+def _headers_message(headers: Dict[str, str]) -> email.message.Message:
+    msg = email.message.Message()
+    for k, v in headers.items():
+        msg[k] = v
+    return msg
+
+
+class CachedResponse:
+    """File-backed stand-in for an ``http.client.HTTPResponse``."""
+
+    status = 200
+
+    def __init__(self, url: str, headers: Dict[str, str], body_path: Path, on_read=None) -> None:
+        self.url = url
+        self.headers = _headers_message(headers)
+        self._f = body_path.open("rb")
+        self._on_read = on_read
+
+    def geturl(self) -> str:
+        return self.url
+
+    def read(self, n: int = -1) -> bytes:
+        data = self._f.read(n)
+        if self._on_read is not None:
+            self._on_read(len(data))
+        return data
+
+    def close(self) -> None:
+        self._f.close()
+
+    def __enter__(self) -> "CachedResponse":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class _TeeResponse:
+    """Wrap a live response; copy what is read into the cache and commit it at EOF."""
+
+    def __init__(self, resp, cache: "HttpCache", key: str, meta: Dict[str, Any]) -> None:
+        self._resp = resp
+        self.status = resp.status
+        self.headers = resp.headers
+        self._cache = cache
+        self._key = key
+        self._meta = meta
+        self._tmp = cache.dir / f".{key}.{threading.get_ident()}.part"
+        self._out = self._tmp.open("wb")
+        self._size = 0
+        self._complete = False
+
+    def geturl(self) -> str:
+        return self._resp.geturl()
+
+    def read(self, n: int = -1) -> bytes:
+        data = self._resp.read() if n is None or n < 0 else self._resp.read(n)
+        self._cache._count("bytes_downloaded", len(data))
+        if self._out is not None:
+            self._size += len(data)
+            if self._size > self._cache.max_body_bytes:
+                self._abandon()
+            else:
+                self._out.write(data)
+        if not data or n is None or n < 0:
+            self._complete = True
+        return data
+
+    def _abandon(self) -> None:
+        if self._out is not None:
+            self._out.close()
+            self._out = None
+            self._tmp.unlink(missing_ok=True)
+
+    def close(self) -> None:
+        try:
+            if self._out is not None:
+                self._out.close()
+                self._out = None
+                if self._complete:
+                    self._cache._commit(self._key, self._tmp, self._meta)
+                else:
+                    self._tmp.unlink(missing_ok=True)
+        finally:
+            self._resp.close()
+
+    def __enter__(self) -> "_TeeResponse":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class HttpCache:
+    def __init__(
+        self,
+        directory: str | Path,
+        max_body_bytes: int = 2 * 1024 * 1024,
+        max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024,
+    ) -> None:
+        self.dir = Path(directory)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.max_body_bytes = max_body_bytes
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.stats = {
+            "fresh": 0,
+            "revalidated": 0,
+            "fetched": 0,
+            "evicted": 0,
+            "bytes_downloaded": 0,
+            "bytes_from_cache": 0,
+        }
+        # key -> [last used, body size]; seeded from what earlier runs left on disk
+        self._entries: Dict[str, List[float]] = {}
+        for entry in os.scandir(self.dir):
+            if entry.name.endswith(".body") and not entry.name.startswith("."):
+                st = entry.stat()
+                self._entries[entry.name[: -len(".body")]] = [st.st_mtime, st.st_size]
+        self._total = sum(size for _, size in self._entries.values())
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.stats[name] += n
+
+    def _paths(self, key: str):
+        return self.dir / f"{key}.json", self.dir / f"{key}.body"
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        meta_path, body_path = self._paths(key)
+        try:
+            with meta_path.open("r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return meta if body_path.exists() else None
+
+    def _write_meta(self, key: str, meta: Dict[str, Any]) -> None:
+        meta_path, _ = self._paths(key)
+        tmp = meta_path.with_name(f".{meta_path.name}.{threading.get_ident()}.tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, meta_path)
+
+    def _commit(self, key: str, tmp_body: Path, meta: Dict[str, Any]) -> None:
+        _, body_path = self._paths(key)
+        size = tmp_body.stat().st_size
+        os.replace(tmp_body, body_path)
+        self._write_meta(key, meta)
+        with self._lock:
+            old = self._entries.get(key)
+            self._total += size - (old[1] if old else 0)
+            self._entries[key] = [time.time(), size]
+            if self._total > self.max_bytes:
+                self._evict(int(self.max_bytes * 0.9))
+
+    def _evict(self, target: int) -> None:
+        # Caller holds the lock
+        for key, (_, size) in sorted(self._entries.items(), key=lambda kv: kv[1][0]):
+            if self._total <= target:
+                break
+            for path in self._paths(key):
+                path.unlink(missing_ok=True)
+            del self._entries[key]
+            self._total -= size
+            self.stats["evicted"] += 1
+
+    def _touch(self, key: str) -> None:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry[0] = now
+        try:
+            os.utime(self._paths(key)[1], (now, now))
+        except OSError:
+            pass
+
+    def _fresh(self, meta: Dict[str, Any]) -> bool:
+        cc = _cache_control(meta["headers"])
+        if "no-cache" in cc:
+            return False
+        m = _MAX_AGE_RE.search(cc)
+        if m:
+            return time.time() - meta["stored_at"] < int(m.group(1))
+        expires = _expires(meta["headers"])
+        return expires is not None and time.time() < expires
+
+    def _served(self, key: str, meta: Dict[str, Any]) -> CachedResponse:
+        self._touch(key)
+        _, body_path = self._paths(key)
+        return CachedResponse(meta["final_url"], meta["headers"], body_path, lambda n: self._count("bytes_from_cache", n))
+
+    def open(self, req: Request, timeout: float = 20):
+        """Like ``urlopen(req)`` for GETs, answering from the cache where it may."""
+        url = req.full_url
+        if _SECRET_PARAM_RE.search(url):
+            self._count("fetched")
+            return urlopen(req, timeout=timeout)
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        meta = self._load(key)
+        if meta is not None and self._fresh(meta):
+            self._count("fresh")
+            return self._served(key, meta)
+        if meta is not None:
+            if meta["headers"].get("ETag"):
+                req.add_header("If-None-Match", meta["headers"]["ETag"])
+            if meta["headers"].get("Last-Modified"):
+                req.add_header("If-Modified-Since", meta["headers"]["Last-Modified"])
+        try:
+            resp = urlopen(req, timeout=timeout)
+        except HTTPError as e:
+            if e.code != 304 or meta is None:
+                raise
+            # Unchanged: refresh the stored validators/max-age and serve the stored body
+            with e:
+                for h in _KEPT_HEADERS:
+                    if e.headers.get(h):
+                        meta["headers"][h] = e.headers[h]
+            meta["stored_at"] = time.time()
+            self._write_meta(key, meta)
+            self._count("revalidated")
+            return self._served(key, meta)
+
+        self._count("fetched")
+        headers = {h: resp.headers[h] for h in _KEPT_HEADERS if resp.headers.get(h)}
+        cc = _cache_control(headers)
+        cacheable = (
+            resp.status == 200
+            and "no-store" not in cc
+            and (
+                headers.get("ETag")
+                or headers.get("Last-Modified")
+                or _MAX_AGE_RE.search(cc)
+                or _expires(headers) is not None
+            )
+        )
+        if not cacheable:
+            return resp
+        meta = {
+            "url": url,
+            "final_url": resp.geturl(),
+            "headers": headers,
+            "stored_at": time.time(),
+        }
+        return _TeeResponse(resp, self, key, meta)
+
+
+_default: Optional[HttpCache] = None
+_default_lock = threading.Lock()
+
+
+def default_cache() -> Optional[HttpCache]:
+    """The process-wide cache configured by ``HTTP_CACHE_DIR``; None when disabled."""
+    global _default
+    directory = os.environ.get("HTTP_CACHE_DIR", DEFAULT_DIR)
+    if directory.lower() in ("", "0", "off", "none"):
+        return None
+    with _default_lock:
+        if _default is None or _default.dir != Path(directory):
+            max_mb = float(os.environ.get("HTTP_CACHE_MAX_MB") or DEFAULT_MAX_MB)
+            _default = HttpCache(directory, max_bytes=int(max_mb * 1024 * 1024))
+        return _default
@@ -0,0 +1,346 @@
+"""In-process run metrics with a Prometheus endpoint and JSON snapshots.
+
+Counters, gauges and histograms are recorded in the module-level
+``METRICS`` registry wherever the work happens (scraper loop, pipeline
+stages, ``jitter_sleep``). Values that already live elsewhere are read at
+export time through gauge callbacks: hotel-registry and HTTP-cache hit
+counts and browser RSS. Recording is a dict update under a lock, so it
+stays on even when nothing is exported.
+
+``start_metrics`` serves ``/metrics`` (Prometheus text format) and
+``/metrics.json`` on localhost and/or rewrites a JSON snapshot file
+periodically.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .records import ProfileResult
+
+PREFIX = "instagram_sponsor"
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 4, 6, 8, 12, 20, 50)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def add_metrics_args(ap) -> None:
+    """Register the metrics options shared by the scrape and pipeline CLIs."""
+    ap.add_argument(
+        "--metrics-port",
+        type=int,
+        default=0,
+        help="Serve Prometheus metrics on 127.0.0.1:PORT/metrics (default 0 = off)",
+    )
+    ap.add_argument("--metrics-json", default=None, help="Rewrite a JSON metrics snapshot to this path periodically")
+    ap.add_argument(
+        "--metrics-interval",
+        type=float,
+        default=30.0,
+        help="Seconds between JSON snapshots (default 30)",
+    )
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.sum += value
+        self.count += 1
+        for i, b in enumerate(self.buckets):
+            if value <= b:
+                self.counts[i] += 1
+
+
+def _fmt_labels(labels: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+def _fmt_value(v: float) -> str:
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class Metrics:
+    def __init__(self, prefix: str = PREFIX) -> None:
+        self.prefix = prefix
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._meta: Dict[str, Tuple[str, str]] = {}
+        self._buckets: Dict[str, Tuple[float, ...]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._hists: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._gauge_fns: Dict[str, Callable[[], Optional[float]]] = {}
+
+    def describe(self, name: str, kind: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        with self._lock:
+            self._meta[name] = (kind, help_text)
+            if kind == "histogram":
+                self._buckets[name] = buckets
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        with self._lock:
+            self._gauges.setdefault(name, {})[tuple(sorted(labels.items()))] = value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._hists.setdefault(name, {})
+            h = series.get(key)
+            if h is None:
+                h = series[key] = _Histogram(self._buckets.get(name, LATENCY_BUCKETS))
+            h.observe(value)
+
+    def value(self, name: str, **labels: str) -> float:
+        """Current value of a counter or gauge series (0 if never recorded)."""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            return self._counters.get(name, {}).get(key, self._gauges.get(name, {}).get(key, 0))
+
+    @contextmanager
+    def timer(self, name: str, **labels: str) -> Iterator[None]:
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t, **labels)
+
+    def gauge_fn(self, name: str, fn: Callable[[], Optional[float]], help_text: str = "", kind: str = "gauge") -> None:
+        """Read ``fn()`` at export time; the latest registration for a name wins.
+
+        ``kind="counter"`` exports a value that only ever grows, such as a
+        running total kept by another object.
+        """
+        with self._lock:
+            self._gauge_fns[name] = fn
+            self._meta.setdefault(name, (kind, help_text))
+
+    def _callback_values(self) -> Dict[str, float]:
+        with self._lock:
+            fns = dict(self._gauge_fns)
+        out: Dict[str, float] = {}
+        for name, fn in fns.items():
+            try:
+                v = fn()
+            except Exception:
+                continue
+            if v is not None:
+                out[name] = float(v)
+        return out
+
+    def render_prometheus(self) -> str:
+        callbacks = self._callback_values()
+        lines: List[str] = []
+        with self._lock:
+            names = sorted(set(self._counters) | set(self._gauges) | set(self._hists) | set(callbacks))
+            for name in names:
+                full = f"{self.prefix}_{name}"
+                kind, help_text = self._meta.get(name, ("untyped", ""))
+                if help_text:
+                    lines.append(f"# HELP {full} {help_text}")
+                lines.append(f"# TYPE {full} {kind}")
+                for key, v in sorted(self._counters.get(name, {}).items()):
+                    lines.append(f"{full}{_fmt_labels(key)} {_fmt_value(v)}")
+                for key, v in sorted(self._gauges.get(name, {}).items()):
+                    lines.append(f"{full}{_fmt_labels(key)} {_fmt_value(v)}")
+                if name in callbacks:
+                    lines.append(f"{full} {_fmt_value(callbacks[name])}")
+                for key, h in sorted(self._hists.get(name, {}).items()):
+                    for b, c in zip(h.buckets, h.counts):
+                        lines.append(f"{full}_bucket{_fmt_labels(key, ('le', _fmt_value(b)))} {c}")
+                    lines.append(f"{full}_bucket{_fmt_labels(key, ('le', '+Inf'))} {h.count}")
+                    lines.append(f"{full}_sum{_fmt_labels(key)} {_fmt_value(h.sum)}")
+                    lines.append(f"{full}_count{_fmt_labels(key)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict:
+        def label_str(key: LabelKey) -> str:
+            return ",".join(f"{k}={v}" for k, v in key) or "_"
+
+        callbacks = self._callback_values()
+        with self._lock:
+            counter_fns = {n for n in callbacks if self._meta.get(n, ("gauge",))[0] == "counter"}
+            return {
+                "time": time.time(),
+                "uptime_s": round(time.time() - self.started, 1),
+                "counters": {
+                    **{n: {label_str(k): v for k, v in s.items()} for n, s in self._counters.items()},
+                    **{n: {"_": v} for n, v in callbacks.items() if n in counter_fns},
+                },
+                "gauges": {
+                    **{n: {label_str(k): v for k, v in s.items()} for n, s in self._gauges.items()},
+                    **{n: {"_": v} for n, v in callbacks.items() if n not in counter_fns},
+                },
+                "histograms": {
+                    n: {
+                        label_str(k): {
+                            "count": h.count,
+                            "sum": round(h.sum, 6),
+                            "buckets": {_fmt_value(b): c for b, c in zip(h.buckets, h.counts)},
+                        }
+                        for k, h in s.items()
+                    }
+                    for n, s in self._hists.items()
+                },
+            }
+
+
+METRICS = Metrics()
+METRICS.describe(
+    "profiles_total",
+    "counter",
+    "Profiles finished or given up on, by status (done, empty, failed, timeout, login_wall, private, not_found)",
+)
+METRICS.describe("retries_total", "counter", "Transient profile failures scheduled for another attempt, by status")
+METRICS.describe("posts_total", "counter", "Posts extracted")
+METRICS.describe("sponsored_posts_total", "counter", "Posts detected as sponsored")
+METRICS.describe("posts_per_profile", "histogram", "Posts extracted per profile", COUNT_BUCKETS)
+METRICS.describe("stage_seconds", "histogram", "Latency per stage (profile, extract, annotate, write)")
+METRICS.describe("precheck_total", "counter", "HTTP pre-check verdicts (exists, private, missing, redirected, unknown)")
+METRICS.describe("sleep_seconds_total", "counter", "Time spent in deliberate jitter sleeps")
+METRICS.describe("timeout_ms", "gauge", "Current adaptive browser timeout per stage, in ms")
+METRICS.describe("timeouts_total", "counter", "Browser waits that ran into their timeout, by stage")
+METRICS.describe("caption_duplicates_total", "counter", "Posts whose caption repeated an earlier one (exact, near)")
+
+
+def record_profile(payload: ProfileResult, seconds: Optional[float] = None) -> None:
+    """Count one finished profile payload: status, posts and sponsored posts."""
+    posts = payload.posts
+    sponsored = sum(1 for p in posts if p.sponsored)
+    METRICS.inc("profiles_total", status=payload.unavailable or ("done" if posts else "empty"))
+    METRICS.inc("posts_total", len(posts))
+    METRICS.inc("sponsored_posts_total", sponsored)
+    METRICS.observe("posts_per_profile", len(posts))
+    if seconds is not None:
+        METRICS.observe("stage_seconds", seconds, stage="profile")
+
+
+def watch_run(hotels: Any) -> None:
+    """Expose enrichment reuse, HTTP cache hits, sponsored rate and browser RSS, read at export time."""
+    from . import httpcache
+    from .browser import descendant_rss_mb
+
+    METRICS.gauge_fn(
+        "hotel_registry_hits_total", lambda: hotels.hits, "Hotel candidates answered from the registry", "counter"
+    )
+    METRICS.gauge_fn(
+        "hotel_registry_fuzzy_hits_total", lambda: hotels.fuzzy_hits, "Registry hits via fuzzy name match", "counter"
+    )
+    METRICS.gauge_fn(
+        "hotel_enrichments_total", lambda: hotels.enrichments, "Hotels enriched over the network this run", "counter"
+    )
+    for stat in ("fresh", "revalidated", "fetched", "evicted", "bytes_downloaded", "bytes_from_cache"):
+        METRICS.gauge_fn(
+            f"http_cache_{stat}_total",
+            # Read the cache already in use; default_cache() would create one just to report zeros
+            lambda stat=stat: (httpcache._default.stats[stat] if httpcache._default is not None else None),
+            f"Enrichment HTTP cache: {stat.replace('_', ' ')}",
+            "counter",
+        )
+    METRICS.gauge_fn("sponsored_rate", _sponsored_rate, "Share of extracted posts detected as sponsored")
+    METRICS.gauge_fn("browser_rss_mb", descendant_rss_mb, "Memory (PSS) of the browser processes, in MB")
+
+
+def _sponsored_rate() -> Optional[float]:
+    posts = METRICS.value("posts_total")
+    return METRICS.value("sponsored_posts_total") / posts if posts else None
+
+
+def _handler(registry: Metrics):
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.startswith("/metrics.json"):
+                body = json.dumps(registry.snapshot()).encode("utf-8")
+                ctype = "application/json"
+            elif self.path.startswith("/metrics"):
+                body = registry.render_prometheus().encode("utf-8")
+                ctype = "text/plain; version=0.0.4"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args) -> None:
+            pass
+
+    return MetricsHandler
+
+
+def start_metrics(
+    port: int = 0,
+    json_path: Optional[str] = None,
+    interval: float = 30.0,
+    registry: Metrics = METRICS,
+) -> Callable[[], None]:
+    """Start the HTTP endpoint and/or snapshot writer; returns a function that stops both.
+
+    The stop function writes a last snapshot, so the file reflects the end of the run.
+    """
+    from http.server import ThreadingHTTPServer
+
+    from .utils import write_json
+
+    stops: List[Callable[[], None]] = []
+    if port:
+        server = ThreadingHTTPServer(("127.0.0.1", port), _handler(registry))
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+
+        def _stop_server() -> None:
+            server.shutdown()
+            server.server_close()
+
+        stops.append(_stop_server)
+    if json_path:
+        done = threading.Event()
+
+        def _loop() -> None:
+            while not done.wait(interval):
+                try:
+                    write_json(json_path, registry.snapshot())
+                except OSError:
+                    pass
+
+        t = threading.Thread(target=_loop, name="metrics-json", daemon=True)
+        t.start()
+
+        def _stop_snapshots() -> None:
+            done.set()
+            t.join()
+            write_json(json_path, registry.snapshot())
+
+        stops.append(_stop_snapshots)
+
+    def stop() -> None:
+        for s in stops:
+            s()
+
+    return stop
@@ -0,0 +1,387 @@
+"""Streaming scrape → detect/enrich → filter → export pipeline.
+
+The browser thread only extracts posts. Detection and enrichment run in a
+small worker pool, and a single writer appends each finished profile to the
+NDJSON aggregate and its kept posts to the hotels CSV. Stages are joined by
+bounded queues, so a slow stage blocks the ones upstream (backpressure)
+instead of buffering the whole run, and nothing is rewritten wholesale.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sized
+
+from .annotate import annotate_post
+from .browser import BrowserSupervisor, add_browser_args
+from .export import HotelsCsvWriter
+from .failures import ProfileUnavailable, RetryQueue, with_retries
+from .fingerprint import CaptionIndex, add_dedup_args
+from .hotels import HotelRegistry, load_hotels
+from .metrics import METRICS, add_metrics_args, record_profile, start_metrics, watch_run
+from .precheck import PreChecker, add_precheck_args
+from .records import Post, ProfileResult
+from .scheduler import add_schedule_args, load_history, prioritize
+from .selectors import SelectorsBroken
+from .writer import AggregateWriter, add_writer_args
+from .utils import iter_profile_urls, jitter_sleep, load_aggregate, parse_iso, parse_shard, parse_since, post_cutoff
+
+
+_DONE = object()
+
+
+class _StageFailed(RuntimeError):
+    """Raised in one stage after another has failed; the real error is in ``errors``."""
+
+
+def _put(q: "queue.Queue[Any]", item: Any, failed: threading.Event) -> None:
+    # Blocking put that gives up once another stage has failed
+    while True:
+        if failed.is_set():
+            raise _StageFailed("pipeline stage failed")
+        try:
+            q.put(item, timeout=0.5)
+            return
+        except queue.Full:
+            continue
+
+
+def _get(q: "queue.Queue[Any]", failed: threading.Event) -> Any:
+    while True:
+        try:
+            return q.get(timeout=0.5)
+        except queue.Empty:
+            if failed.is_set():
+                raise _StageFailed("pipeline stage failed")
+
+
+def keep_post(post: Post, sponsored_only: bool = True, cutoff: Optional[datetime] = None) -> bool:
+    """Filter stage: sponsored posts, newer than ``cutoff`` when one is given.
+
+    Posts with an unparseable date are kept rather than dropped.
+    """
+    if sponsored_only and not post.sponsored:
+        return False
+    if cutoff is not None:
+        dt = parse_iso(post.date_iso)
+        if dt is not None and dt < cutoff:
+            return False
+    return True
+
+
+def _annotate_worker(
+    raw_q: "queue.Queue[Any]",
+    done_q: "queue.Queue[Any]",
+    failed: threading.Event,
+    errors: List[BaseException],
+    google_places_api_key: Optional[str],
+    hotels: HotelRegistry,
+    captions: Optional[CaptionIndex],
+) -> None:
+    try:
+        while True:
+            item = _get(raw_q, failed)
+            if item is _DONE:
+                break
+            url, extracted, unavailable = item
+            with METRICS.timer("stage_seconds", stage="annotate"):
+                posts = [
+                    annotate_post(post, banner, google_places_api_key, hotels, captions)
+                    for post, banner in extracted
+                ]
+            scraped_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+            _put(done_q, ProfileResult(url, scraped_at, posts, unavailable), failed)
+    except BaseException as e:
+        errors.append(e)
+        failed.set()
+    finally:
+        try:
+            _put(done_q, _DONE, failed)
+        except _StageFailed:
+            pass
+
+
+def _writer(
+    done_q: "queue.Queue[Any]",
+    n_workers: int,
+    aggregate: AggregateWriter,
+    csv_writer: HotelsCsvWriter,
+    sponsored_only: bool,
+    cutoff: Optional[datetime],
+    failed: threading.Event,
+    errors: List[BaseException],
+    stats: Dict[str, int],
+) -> None:
+    try:
+        remaining = n_workers
+        while remaining:
+            item = _get(done_q, failed)
+            if item is _DONE:
+                remaining -= 1
+                continue
+            record_profile(item)
+            with METRICS.timer("stage_seconds", stage="write"):
+                aggregate.add(item)
+            kept = [p for p in item.posts if keep_post(p, sponsored_only, cutoff)]
+            stats["profiles"] += 1
+            stats["posts"] += len(item.posts)
+            stats["rows"] += csv_writer.write_profile(item.profile_url, kept)
+    except BaseException as e:
+        errors.append(e)
+        failed.set()
+
+
+def run_pipeline(
+    profile_urls: Iterable[str],
+    csv_out: str,
+    out_file: str = "outputs/all.ndjson",
+    limit: int = 6,
+    headless: bool = False,
+    user_data_dir: str = ".pw_instagram",
+    google_places_api_key: Optional[str] = None,
+    sponsored_only: bool = True,
+    max_age_days: Optional[float] = None,
+    since: Optional[datetime] = None,
+    enrich_workers: int = 2,
+    buffer_size: int = 4,
+    recycle_page_every: int = 50,
+    recycle_context_every: int = 500,
+    max_rss_mb: float = 0,
+    flush_every: int = 10,
+    flush_interval: float = 30.0,
+    precheck: Optional[PreChecker] = None,
+    session_check_hours: float = 12.0,
+    caption_dedup: bool = True,
+) -> Dict[str, int]:
+    """Scrape profiles and stream results to ``out_file`` (NDJSON) and ``csv_out``.
+
+    Profiles already present in ``out_file`` are skipped. Posts older than
+    ``since`` / ``max_age_days`` end their profile's scrape early. Profiles
+    that time out or hit a login wall are retried later in the run with
+    backoff; private and missing ones are written with an ``unavailable``
+    marker. ``precheck`` triages profiles over HTTP before they reach the
+    browser. ``buffer_size`` bounds each inter-stage queue (in profiles).
+    With ``caption_dedup`` repeated captions reuse earlier results.
+    Returns simple counters.
+    """
+    # The browser stack is only loaded by the command that needs it
+    from playwright.sync_api import sync_playwright
+    from tqdm import tqdm
+
+    from .scraper import _count_failure, _ensure_logged_in, _failed, iter_profile_posts
+
+    retries = RetryQueue()
+
+    agg_path = Path(out_file)
+    processed_urls, _ = load_aggregate(agg_path, "ndjson")
+    cutoff = post_cutoff(since, max_age_days)
+
+    raw_q: "queue.Queue[Any]" = queue.Queue(maxsize=buffer_size)
+    done_q: "queue.Queue[Any]" = queue.Queue(maxsize=buffer_size)
+    failed = threading.Event()
+    errors: List[BaseException] = []
+    stats = {"profiles": 0, "posts": 0, "rows": 0, "hotels": 0}
+    n_workers = max(1, enrich_workers)
+
+    hotels = HotelRegistry(google_places_api_key, rows=load_hotels(agg_path, "ndjson"))
+    watch_run(hotels)
+    # Shared by the enrichment workers, so a copy is caught whichever worker sees it
+    captions = CaptionIndex() if caption_dedup else None
+    aggregate = AggregateWriter(
+        agg_path,
+        "ndjson",
+        flush_every=flush_every,
+        flush_interval=flush_interval,
+        hotels=hotels.table,
+    )
+    with aggregate, HotelsCsvWriter(csv_out) as csv_writer:
+        workers = [
+            threading.Thread(
+                target=_annotate_worker,
+                args=(raw_q, done_q, failed, errors, google_places_api_key, hotels, captions),
+                name=f"enrich-{i}",
+                daemon=True,
+            )
+            for i in range(n_workers)
+        ]
+        writer = threading.Thread(
+            target=_writer,
+            args=(done_q, n_workers, aggregate, csv_writer, sponsored_only, cutoff, failed, errors, stats),
+            name="writer",
+            daemon=True,
+        )
+        for t in workers + [writer]:
+            t.start()
+
+        try:
+            with sync_playwright() as p:
+                browser = BrowserSupervisor(
+                    p,
+                    user_data_dir=user_data_dir,
+                    headless=headless,
+                    recycle_page_every=recycle_page_every,
+                    recycle_context_every=recycle_context_every,
+                    max_rss_mb=max_rss_mb,
+                    session_check_hours=session_check_hours,
+                )
+                _ensure_logged_in(browser.start(), headless=headless, session=browser.session)
+                # Streamed URL lists have no length; tqdm then shows a running count
+                total = len(profile_urls) if isinstance(profile_urls, Sized) else None
+                urls = profile_urls
+                if precheck is not None:
+                    urls = precheck.filter(urls, skip=processed_urls)
+                urls = with_retries(urls, retries)
+                for idx, url in enumerate(tqdm(urls, total=total, desc="Profiles", unit="profile"), start=1):
+                    if url in processed_urls:
+                        tqdm.write(f"[{idx}/{total or '?'}] Skipping already scraped: {url}")
+                        continue
+                    tqdm.write(f"[{idx}/{total or '?'}] {url} → {agg_path}")
+                    unavailable = None
+                    try:
+                        with METRICS.timer("stage_seconds", stage="extract"):
+                            extracted = browser.call(
+                                lambda page: list(iter_profile_posts(page, url, limit=limit, since=cutoff))
+                            )
+                    except SelectorsBroken:
+                        raise
+                    except ProfileUnavailable as e:
+                        if e.transient:
+                            delay = retries.push(url)
+                            _count_failure(e.kind, final=delay is None)
+                            tqdm.write(f"  {e}; " + (f"retrying in {delay:.0f}s" if delay is not None else "giving up for this run"))
+                            continue
+                        extracted, unavailable = [], e.kind
+                    except Exception as e:
+                        _failed(url, e, retries)
+                        continue
+                    _put(raw_q, (url, extracted, unavailable), failed)
+                    jitter_sleep(1.0, 2.0)
+                    # Extracted posts are handed off; safe to recycle the page/context now
+                    browser.profile_done()
+                browser.close()
+        except _StageFailed:
+            # An enrichment or writer thread failed; its error is raised below
+            pass
+        finally:
+            # Let in-flight profiles drain through enrichment and the writer
+            for _ in workers:
+                try:
+                    _put(raw_q, _DONE, failed)
+                except _StageFailed:
+                    break
+            for t in workers + [writer]:
+                t.join()
+
+    if errors:
+        raise errors[0]
+    stats["hotels"] = len(hotels.table())
+    return stats
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(
+        prog="instagram-sponsor-pipeline",
+        description=(
+            "Scrape, detect, enrich, filter and export in one streaming run: each finished "
+            "profile is appended to the NDJSON aggregate and its kept posts to the hotels CSV."
+        ),
+    )
+    ap.add_argument("--csv", required=True, help="Path to input CSV (must include Instagram profile URL column)")
+    ap.add_argument("--url-column", default="Instagram Url", help="CSV column containing profile URLs")
+    ap.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=None,
+        metavar="I/N",
+        help="Only take profiles in shard I of N (0-based, split by URL hash) so N workers can share one CSV",
+    )
+    ap.add_argument("--limit", type=int, default=6, help="Max posts per profile to collect (default 6)")
+    ap.add_argument("--headless", action="store_true", help="Run browser headless (first run should be non-headless to login)")
+    ap.add_argument("--user-data-dir", default=".pw_instagram", help="Persistent Chromium user data dir for session reuse")
+    ap.add_argument("--out-file", default="outputs/all.ndjson", help="NDJSON aggregate to append to (default: outputs/all.ndjson)")
+    ap.add_argument("--csv-out", default="outputs/hotels.csv", help="Hotels CSV to append kept posts to (default: outputs/hotels.csv)")
+    ap.add_argument("--all-posts", action="store_true", help="Export every post, not only sponsored ones")
+    ap.add_argument(
+        "--since",
+        type=parse_since,
+        default=None,
+        help="Stop each profile at its first (non-pinned) post older than this ISO date",
+    )
+    ap.add_argument(
+        "--max-age-days",
+        type=float,
+        default=None,
+        help="Like --since, relative to now; older posts are neither opened nor exported",
+    )
+    ap.add_argument("--enrich-workers", type=int, default=2, help="Concurrent detection/enrichment workers (default 2)")
+    ap.add_argument("--buffer", type=int, default=4, help="Profiles buffered between stages (default 4)")
+    add_browser_args(ap)
+    add_writer_args(ap)
+    add_schedule_args(ap)
+    add_metrics_args(ap)
+    add_precheck_args(ap)
+    add_dedup_args(ap)
+    ap.add_argument(
+        "--google-places-key",
+        default=os.environ.get("GOOGLE_PLACES_API_KEY", ""),
+        help="Google Places API key (env: GOOGLE_PLACES_API_KEY). Optional.",
+    )
+    return ap.parse_args(argv)
+
+
+def main(argv: List[str] | None = None) -> int:
+    ns = parse_args(argv or sys.argv[1:])
+    urls = iter_profile_urls(ns.csv, ns.url_column, shard=ns.shard)
+    if ns.history:
+        urls = iter(prioritize(urls, load_history(ns.history), ns.explore_share, ns.stale_days))
+    first = next(urls, None)
+    if first is None:
+        print("No profile URLs found.")
+        return 1
+    stop_metrics = start_metrics(ns.metrics_port, ns.metrics_json, ns.metrics_interval)
+    try:
+        stats = _run(ns, itertools.chain([first], urls))
+    finally:
+        stop_metrics()
+    print(
+        f"Profiles: {stats['profiles']}  posts: {stats['posts']}  hotels: {stats['hotels']}  "
+        f"CSV rows: {stats['rows']} → {ns.csv_out}",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def _run(ns: argparse.Namespace, urls: Iterable[str]) -> Dict[str, int]:
+    return run_pipeline(
+        urls,
+        csv_out=ns.csv_out,
+        out_file=ns.out_file,
+        limit=ns.limit,
+        headless=ns.headless,
+        user_data_dir=ns.user_data_dir,
+        google_places_api_key=(ns.google_places_key or None),
+        sponsored_only=not ns.all_posts,
+        max_age_days=ns.max_age_days,
+        since=ns.since,
+        enrich_workers=ns.enrich_workers,
+        buffer_size=ns.buffer,
+        recycle_page_every=ns.recycle_page_every,
+        recycle_context_every=ns.recycle_context_every,
+        max_rss_mb=ns.max_browser_rss_mb,
+        flush_every=ns.flush_every,
+        flush_interval=ns.flush_interval,
+        session_check_hours=ns.session_check_hours,
+        caption_dedup=ns.caption_dedup,
+        precheck=PreChecker(ns.precheck_cache, workers=ns.precheck_workers) if ns.precheck else None,
+    )
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
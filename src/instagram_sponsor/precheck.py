@@ -0,0 +1,241 @@
+"""HTTP triage of profile URLs ahead of the browser.
+
+Many creator lists point at deleted, renamed or private accounts. Each of
+those costs a Chromium navigation and a grid timeout. ``PreChecker.filter``
+fetches profile pages with plain HTTP (same ``UA`` as enrichment, redirects
+not followed) in a small thread pool, a window of profiles ahead of the
+browser, and passes on only the profiles worth opening:
+
+- ``exists``: the page renders a public profile and is passed on.
+- ``private`` / ``missing``: the page says so (or is a 404) and is skipped.
+- ``redirected``: the handle now redirects to another profile, which is
+  passed on instead (normalized, and dropped if already scraped or already
+  passed on).
+- ``unknown``: a login wall, a rate limit or a network error. The profile is
+  passed on and the browser decides.
+
+Verdicts are cached in a JSON file with a TTL, so a restarted run does not
+ask again. After a 429 the checker passes everything through for a
+cool-down instead of hammering the site.
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import json
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import TYPE_CHECKING, Container, Deque, Dict, Iterable, Iterator, Optional, Set, Tuple
+from urllib.parse import urljoin, urlparse
+
+from .metrics import METRICS
+from .utils import normalize_profile_url, write_json
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+EXISTS, PRIVATE, MISSING, REDIRECTED, UNKNOWN = "exists", "private", "missing", "redirected", "unknown"
+# Verdicts that keep a profile away from the browser, or send it elsewhere
+SKIPPED = (PRIVATE, MISSING)
+
+MAX_BODY_BYTES = 256 * 1024
+_PRIVATE_MARKERS = ('"is_private":true', '"is_private": true', "This account is private")
+_MISSING_MARKERS = ("Page Not Found", "Sorry, this page isn't available", "Sorry, this page isn&#39;t available")
+_LOGIN_PATHS = ("/accounts/login", "/challenge/")
+
+Verdict = Tuple[str, str]
+
+
+def add_precheck_args(ap) -> None:
+    """Register the pre-check options shared by the scrape and pipeline CLIs."""
+    ap.add_argument(
+        "--precheck",
+        action="store_true",
+        help="Triage profiles over plain HTTP first; private and deleted ones never reach the browser",
+    )
+    ap.add_argument("--precheck-workers", type=int, default=4, help="Concurrent pre-check requests (default 4)")
+    ap.add_argument(
+        "--precheck-cache",
+        default="outputs/.precheck.json",
+        help="Where pre-check verdicts are cached (default: outputs/.precheck.json)",
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _opener():
+    # urllib.request is imported here so the CLI parser can register --precheck cheaply
+    from urllib.request import HTTPRedirectHandler, build_opener
+
+    class NoRedirect(HTTPRedirectHandler):
+        def redirect_request(self, req, fp, code, msg, headers, newurl):
+            return None
+
+    return build_opener(NoRedirect)
+
+
+def _handle(url: str) -> str:
+    return urlparse(url).path.strip("/").split("/", 1)[0].lower()
+
+
+def classify_page(body: str) -> str:
+    """Verdict for a profile page that came back 200."""
+    if any(m in body for m in _MISSING_MARKERS):
+        return MISSING
+    if any(m in body for m in _PRIVATE_MARKERS):
+        return PRIVATE
+    return EXISTS
+
+
+def triage(url: str, timeout: float = 10, _hops: int = 2) -> Verdict:
+    """``(verdict, detail)`` for one profile URL; detail is the redirect target or the reason."""
+    from urllib.error import HTTPError, URLError
+    from urllib.request import Request
+
+    from .enrichment import UA
+
+    req = Request(url, headers={"User-Agent": UA, "Accept-Language": "en-US,en;q=0.8"})
+    try:
+        with _opener().open(req, timeout=timeout) as resp:
+            body = resp.read(MAX_BODY_BYTES).decode("utf-8", errors="replace")
+    except HTTPError as e:
+        if e.code == 404:
+            return MISSING, "HTTP 404"
+        if e.code in (301, 302, 303, 307, 308) and e.headers.get("Location"):
+            target = urljoin(url, e.headers["Location"])
+            path = urlparse(target).path
+            if any(p in path for p in _LOGIN_PATHS):
+                return UNKNOWN, "login wall"
+            if not _handle(target):
+                # Instagram sends unknown handles to the homepage
+                return MISSING, "redirect to homepage"
+            if _handle(target) == _handle(url) and _hops:
+                # Same profile, canonical form (scheme, host, trailing slash)
+                return triage(target, timeout, _hops - 1)
+            return REDIRECTED, target
+        return UNKNOWN, f"HTTP {e.code}"
+    except (URLError, OSError) as e:
+        return UNKNOWN, f"{e.__class__.__name__}: {e}"
+    return classify_page(body), ""
+
+
+class VerdictCache:
+    """Verdicts by URL in a JSON file; entries older than ``ttl_days`` are ignored."""
+
+    def __init__(self, path: Optional[str | Path], ttl_days: float = 7.0) -> None:
+        self.path = Path(path) if path else None
+        self.ttl = ttl_days * 86400
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        self._dirty = 0
+        if self.path is not None and self.path.exists():
+            try:
+                with self.path.open("r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+
+    def get(self, url: str) -> Optional[Verdict]:
+        with self._lock:
+            e = self._entries.get(url)
+        if e is None or time.time() - e["checked_at"] > self.ttl:
+            return None
+        return e["verdict"], e.get("detail", "")
+
+    def put(self, url: str, verdict: Verdict) -> None:
+        with self._lock:
+            self._entries[url] = {"verdict": verdict[0], "detail": verdict[1], "checked_at": time.time()}
+            self._dirty += 1
+            due = self._dirty >= 50
+        if due:
+            self.save()
+
+    def save(self) -> None:
+        with self._lock:
+            if self.path is None or not self._dirty:
+                return
+            entries, self._dirty = dict(self._entries), 0
+        write_json(self.path, entries)
+
+
+class PreChecker:
+    def __init__(
+        self,
+        cache_path: Optional[str | Path] = "outputs/.precheck.json",
+        workers: int = 4,
+        ahead: int = 32,
+        timeout: float = 10,
+        ttl_days: float = 7.0,
+        cooldown_s: float = 600.0,
+    ) -> None:
+        self.cache = VerdictCache(cache_path, ttl_days)
+        self.workers = max(1, workers)
+        self.ahead = max(1, ahead)
+        self.timeout = timeout
+        self.cooldown_s = cooldown_s
+        self._throttled_until = 0.0
+        self._lock = threading.Lock()
+
+    def check(self, url: str) -> Verdict:
+        cached = self.cache.get(url)
+        if cached is not None:
+            return cached
+        with self._lock:
+            throttled = time.monotonic() < self._throttled_until
+        if throttled:
+            return UNKNOWN, "cooling down after HTTP 429"
+        verdict = triage(url, self.timeout)
+        if verdict == (UNKNOWN, "HTTP 429"):
+            with self._lock:
+                self._throttled_until = time.monotonic() + self.cooldown_s
+        if verdict[0] != UNKNOWN:
+            self.cache.put(url, verdict)
+        return verdict
+
+    def filter(self, urls: Iterable[str], skip: Iterable[str] = ()) -> Iterator[str]:
+        """Yield the URLs worth opening in the browser, in input order.
+
+        URLs in ``skip`` (already scraped) are passed through unchecked. A URL
+        is yielded at most once, including redirect targets, which are
+        dropped when they are in ``skip``. Like ``iter_profile_urls``, the
+        yielded set is kept as 8-byte digests.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        skip = skip if isinstance(skip, (set, frozenset, dict)) else set(skip)
+        seen: Set[bytes] = set()
+        window: Deque[Tuple[str, Optional["Future"]]] = deque()
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="precheck")
+        try:
+            for url in urls:
+                window.append((url, None if url in skip else pool.submit(self.check, url)))
+                if len(window) > self.ahead:
+                    yield from self._emit(*window.popleft(), skip, seen)
+            while window:
+                yield from self._emit(*window.popleft(), skip, seen)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+            self.cache.save()
+
+    def _emit(
+        self, url: str, fut: Optional["Future"], skip: Container[str], seen: Set[bytes]
+    ) -> Iterator[str]:
+        if fut is not None:
+            verdict, detail = fut.result()
+            METRICS.inc("precheck_total", verdict=verdict)
+            if verdict in SKIPPED:
+                print(f"[precheck] skipping {verdict}: {url}", file=sys.stderr)
+                return
+            if verdict == REDIRECTED:
+                target = normalize_profile_url(detail)
+                print(f"[precheck] {url} now redirects to {target}", file=sys.stderr)
+                if target in skip:
+                    return
+                url = target
+        digest = hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest()
+        if digest not in seen:
+            seen.add(digest)
+            yield url
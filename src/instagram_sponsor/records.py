@@ -0,0 +1,167 @@
+"""Slotted records for posts, their hotel and a profile's result.
+
+Redetect, filter and export hold every post of an aggregate, and as plain
+JSON dicts each post costs a dict of about ten keys plus a nested ``hotel``
+dict. The records here are slotted dataclasses, keep list fields as tuples
+and share one ``HotelInfo`` between all posts whose hotel fields are equal.
+Most of those posts are non-sponsored posts with an all-empty hotel.
+
+``from_dict``/``to_dict`` are the only JSON codecs and keep the on-disk
+layout (key order included) unchanged. Keys the records do not model are
+carried in ``extra`` so a round trip does not drop them. Older aggregates
+also hold posts of another schema (``link``/``content``/``timestamp``) with
+no ``post_url``; those keep all their keys in ``extra`` and are written back
+as they were, plus any annotation. ``json_default`` lets
+``json.dump`` encode records directly.
+"""
+
+from __future__ import annotations
+
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+# Shared HotelInfo objects, keyed by their field values
+HotelCache = Dict[Tuple[Optional[str], ...], "HotelInfo"]
+
+_HOTEL_KEYS = ("name", "instagram_handle", "website", "email", "address", "phone", "enrichment_source")
+_ANNOTATION_KEYS = frozenset(("sponsored", "sponsored_reasons", "hotel", "hotel_id"))
+_POST_KEYS = _ANNOTATION_KEYS | {
+    "post_url", "date_iso", "caption", "hashtags", "mentions", "tagged_accounts", "location_name",
+}
+_PROFILE_KEYS = frozenset(("profile_url", "scraped_at", "posts", "unavailable"))
+
+
+def _extra(d: Dict[str, Any], known: frozenset) -> Optional[Dict[str, Any]]:
+    return None if d.keys() <= known else {k: v for k, v in d.items() if k not in known}
+
+
+@dataclass(frozen=True, slots=True)
+class HotelInfo:
+    name: Optional[str] = None
+    instagram_handle: Optional[str] = None
+    website: Optional[str] = None
+    email: Optional[str] = None
+    address: Optional[str] = None
+    phone: Optional[str] = None
+    enrichment_source: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any], cache: Optional[HotelCache] = None) -> "HotelInfo":
+        key = tuple(d.get(k) for k in _HOTEL_KEYS)
+        if cache is None:
+            return cls(*key)
+        hotel = cache.get(key)
+        if hotel is None:
+            hotel = cache[key] = cls(*key)
+        return hotel
+
+    def to_dict(self) -> Dict[str, Optional[str]]:
+        return {
+            "name": self.name,
+            "instagram_handle": self.instagram_handle,
+            "website": self.website,
+            "email": self.email,
+            "address": self.address,
+            "phone": self.phone,
+            "enrichment_source": self.enrichment_source,
+        }
+
+
+@dataclass(slots=True)
+class Post:
+    # None for a post of another schema; its keys are all in ``extra``
+    post_url: Optional[str] = ""
+    date_iso: str = ""
+    caption: str = ""
+    hashtags: Tuple[str, ...] = ()
+    mentions: Tuple[str, ...] = ()
+    tagged_accounts: Tuple[str, ...] = ()
+    location_name: str = ""
+    # Set by annotate_post; None until the post has been through detection
+    sponsored: Optional[bool] = None
+    sponsored_reasons: Tuple[str, ...] = ()
+    hotel: Optional[HotelInfo] = None
+    hotel_id: Optional[str] = None
+    extra: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any], hotels: Optional[HotelCache] = None) -> "Post":
+        hotel = d.get("hotel")
+        post_url = d.get("post_url")
+        return cls(
+            post_url if post_url is None else post_url or "",
+            d.get("date_iso") or "",
+            d.get("caption") or "",
+            tuple(d.get("hashtags") or ()),
+            tuple(d.get("mentions") or ()),
+            tuple(d.get("tagged_accounts") or ()),
+            d.get("location_name") or "",
+            d.get("sponsored"),
+            # A handful of distinct reasons repeated over every sponsored post
+            tuple(map(sys.intern, d.get("sponsored_reasons") or ())),
+            HotelInfo.from_dict(hotel, hotels) if isinstance(hotel, dict) else None,
+            d.get("hotel_id"),
+            _extra(d, _POST_KEYS if post_url is not None else _ANNOTATION_KEYS),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        if self.post_url is None:
+            d: Dict[str, Any] = dict(self.extra or ())
+        else:
+            d = {
+                "post_url": self.post_url,
+                "date_iso": self.date_iso,
+                "caption": self.caption,
+                "hashtags": list(self.hashtags),
+                "mentions": list(self.mentions),
+                "tagged_accounts": list(self.tagged_accounts),
+                "location_name": self.location_name,
+            }
+        if self.sponsored is not None:
+            d["sponsored"] = self.sponsored
+            d["sponsored_reasons"] = list(self.sponsored_reasons)
+            d["hotel"] = self.hotel.to_dict() if self.hotel is not None else None
+            d["hotel_id"] = self.hotel_id
+        if self.extra and self.post_url is not None:
+            d.update(self.extra)
+        return d
+
+
+@dataclass(slots=True)
+class ProfileResult:
+    profile_url: str
+    scraped_at: Optional[str] = None
+    posts: List[Post] = field(default_factory=list)
+    # A permanent failure kind (see failures.FAILURE_KINDS) when the profile could not be read
+    unavailable: Optional[str] = None
+    extra: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any], hotels: Optional[HotelCache] = None) -> "ProfileResult":
+        posts = d.get("posts")
+        return cls(
+            d.get("profile_url") or "",
+            d.get("scraped_at"),
+            [Post.from_dict(p, hotels) for p in posts if isinstance(p, dict)] if isinstance(posts, list) else [],
+            d.get("unavailable"),
+            _extra(d, _PROFILE_KEYS),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        d: Dict[str, Any] = {"profile_url": self.profile_url}
+        if self.scraped_at is not None:
+            d["scraped_at"] = self.scraped_at
+        d["posts"] = [p.to_dict() for p in self.posts]
+        if self.unavailable:
+            d["unavailable"] = self.unavailable
+        if self.extra:
+            d.update(self.extra)
+        return d
+
+
+def json_default(obj: Any) -> Any:
+    """``default=`` hook for ``json.dump``: encodes records through ``to_dict``."""
+    if isinstance(obj, (ProfileResult, Post, HotelInfo)):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
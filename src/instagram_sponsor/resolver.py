@@ -0,0 +1,103 @@
+"""Trigram index for fuzzy hotel-name resolution.
+
+Caption fragments from ``find_hotel_candidates`` rarely match each other
+exactly. The index maps each character trigram to the entries containing it
+and scores candidates by the Dice coefficient of their trigram sets.
+
+Lookups use prefix filtering: a match above the threshold must share enough
+of the query's rarest trigrams, so only the shortest postings lists are
+scanned, and trigrams carried by a large share of entries (" ho", "tel"…)
+are never scanned at all. On CPython this keeps a lookup around a
+millisecond or below with 100k+ entries.
+
+Skipping common trigrams makes lookups approximate: an entry that matches
+only through skipped trigrams, or (when every prefix trigram is common)
+only through ones other than the rarest, is not found. Lookups never
+return an entry below the threshold, but may miss one above it.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+
+def _normalize(text: str) -> str:
+    s = re.sub(r"[^\w\s]|_", " ", (text or "").lower())
+    return re.sub(r"\s+", " ", s).strip()
+
+
+def trigrams(text: str) -> FrozenSet[str]:
+    s = _normalize(text)
+    if not s:
+        return frozenset()
+    padded = f"  {s} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class TrigramIndex:
+    def __init__(self, threshold: float = 0.6, extra: int = 2, max_posting_share: float = 0.01) -> None:
+        self.threshold = threshold
+        self.extra = extra
+        self.max_posting_share = max_posting_share
+        self._postings: Dict[str, List[int]] = {}
+        self._grams: List[FrozenSet[str]] = []
+        self._values: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def add(self, text: str, value: str) -> None:
+        """Index ``text`` so lookups of similar strings return ``value``."""
+        grams = trigrams(text)
+        if not grams:
+            return
+        idx = len(self._values)
+        self._grams.append(grams)
+        self._values.append(value)
+        for g in grams:
+            self._postings.setdefault(g, []).append(idx)
+
+    def lookup(self, text: str, threshold: Optional[float] = None) -> Optional[Tuple[str, float]]:
+        """Return ``(value, score)`` of the best entry found with Dice >= threshold, else None.
+
+        Approximate; see the module docstring.
+        """
+        found = self.candidates(text, threshold)
+        return found[0] if found else None
+
+    def candidates(self, text: str, threshold: Optional[float] = None) -> List[Tuple[str, float]]:
+        """``(value, score)`` of every entry found with Dice >= threshold, best first. Approximate."""
+        t = self.threshold if threshold is None else threshold
+        query = trigrams(text)
+        if not query or not self._values:
+            return []
+        # Prefix filter: Dice >= t needs an overlap of at least t*|Q|/(2-t)
+        # trigrams, so a match must hit the rarest |Q| - min_overlap + 1 of them.
+        # Probing `extra` more and requiring that many hits there prunes most
+        # candidates. Very common trigrams in the prefix are not scanned; each
+        # one only lowers the hits required by one.
+        qn = len(query)
+        min_overlap = max(1, math.ceil(t * qn / (2 - t)))
+        ranked = sorted(query, key=lambda g: len(self._postings.get(g, ())))
+        k = min(qn, qn - min_overlap + 1 + self.extra)
+        limit = max(64, int(self.max_posting_share * len(self._values)))
+        probe = [g for g in ranked[:k] if len(self._postings.get(g, ())) <= limit] or ranked[:1]
+        need = max(1, min_overlap - (qn - k) - (k - len(probe)))
+
+        counts: Counter = Counter()
+        for g in probe:
+            counts.update(self._postings.get(g, ()))
+
+        found: List[Tuple[str, float]] = []
+        for idx, c in counts.items():
+            if c < need:
+                continue
+            grams = self._grams[idx]
+            score = 2 * len(query & grams) / (qn + len(grams))
+            if score >= t:
+                found.append((self._values[idx], score))
+        found.sort(key=lambda m: -m[1])
+        return found
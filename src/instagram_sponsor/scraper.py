@@ -1,51 +1,79 @@
 from __future__ import annotations
 
-import json
 import re
 import sys
+import time
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Iterable, Iterator, List, Optional, Sized, Tuple
+from urllib.parse import urlparse
 
 from playwright.sync_api import TimeoutError, sync_playwright
 from tqdm import tqdm
 
 from .selectors import (
+    EMPTY_PROFILE_TEXTS,
     GRID_POST_LINKS,
+    LOGIN_FORM,
+    LOGIN_WALL_PATHS,
+    NOT_FOUND_TEXTS,
+    PRIVATE_ACCOUNT_TEXTS,
+    PINNED_POST_ICON,
     POST_DIALOG,
-    POST_TIME,
-    POST_LOCATION_LINK,
-    CAPTION_PRIMARY,
-    CAPTION_FALLBACK,
+    POST_PAGE,
+    POST_PAGE_PATH,
     PAID_PARTNERSHIP_TEXTS,
     CLOSE_BUTTON,
+    RESOLVER,
+    SelectorsBroken,
 )
 from .utils import (
     ensure_dir,
     jitter_sleep,
-    write_json,
+    load_aggregate,
+    parse_iso,
     extract_hashtags,
     extract_mentions,
 )
-from .detection import sponsored_flags, find_hotel_candidates
-from .enrichment import enrich_hotel_candidate
+from .browser import BrowserSupervisor
+from .annotate import annotate_post
+from .fingerprint import EXACT, NEAR, CaptionIndex
+from .failures import ProfileUnavailable, RetryQueue, backoff_delay, with_retries
+from .hotels import HotelRegistry, load_hotels
+from .metrics import METRICS, record_profile, watch_run
+from .records import Post, ProfileResult
+from .session import SessionState
+from .precheck import PreChecker
+from .timeouts import TIMEOUTS
+from .workqueue import WorkQueue
+from .writer import AggregateWriter
+
+
+def _login_form_visible(page) -> bool:
+    try:
+        return page.locator(LOGIN_FORM).count() > 0
+    except Exception:
+        return False
 
 
-def _ensure_logged_in(page, headless: bool) -> None:
+def _ensure_logged_in(page, headless: bool, session: SessionState | None = None) -> None:
+    """Make sure the context is signed in; skipped when ``session`` vouches for the saved cookie."""
+    if session is not None and session.looks_fresh(page.context):
+        return
     page.goto("https://www.instagram.com/", wait_until="domcontentloaded")
-    is_login = False
-    try:
-        is_login = page.locator("input[name='username']").count() > 0
-    except Exception:
-        pass
+    is_login = _login_form_visible(page)
     if is_login and not headless:
         print("Sign in to Instagram in the opened browser, then press Enter here…", file=sys.stderr)
         try:
             input()
         except EOFError:
             pass
+        is_login = _login_form_visible(page)
+    if not is_login and session is not None:
+        session.mark_verified(page.context)
 
 
-def _open_first_n_posts(page, n: int) -> List[str]:
+def _open_first_n_posts(page, n: int) -> List[Tuple[str, bool]]:
     # Ensure enough posts are present
     for _ in range(8):
         links = page.locator(GRID_POST_LINKS)
@@ -56,58 +84,99 @@ def _open_first_n_posts(page, n: int) -> List[str]:
 
     links = page.locator(GRID_POST_LINKS)
     count = min(links.count(), n)
-    hrefs: List[str] = []
+    hrefs: List[Tuple[str, bool]] = []
     for i in range(count):
         try:
             link = links.nth(i)
             href = link.get_attribute("href") or ""
-            hrefs.append(href)
+            hrefs.append((href, link.locator(PINNED_POST_ICON).count() > 0))
         except Exception:
             continue
     return hrefs
 
 
-def _extract_from_dialog(page) -> Tuple[str, str, str, List[str], List[str], List[str], str, bool]:
+def _post_date(time_el) -> str:
+    try:
+        return (time_el.get_attribute("datetime") if time_el is not None else "") or ""
+    except Exception:
+        return ""
+
+
+def _standalone_post(page) -> bool:
+    # A grid click that navigated to the post's own page instead of opening the dialog
+    try:
+        return bool(re.match(POST_PAGE_PATH, urlparse(page.url or "").path)) and page.locator(POST_PAGE).count() > 0
+    except Exception:
+        return False
+
+
+def _open_post(page) -> Optional[str]:
+    """Wait for the clicked post to show; its page type (``dialog`` or ``post``), or None."""
+    try:
+        # A standalone page never shows the dialog; only an unexplained miss counts as a timeout
+        with TIMEOUTS.stage("dialog", count_timeouts=False) as timeout:
+            page.locator(POST_DIALOG).first.wait_for(state="visible", timeout=timeout)
+        return "dialog"
+    except TimeoutError:
+        if _standalone_post(page):
+            return "post"
+        TIMEOUTS.timed_out("dialog")
+        return None
+
+
+def _leave_post(page, page_type: str) -> None:
+    if page_type == "dialog":
+        _close_dialog(page)
+        return
+    try:
+        with TIMEOUTS.stage("load") as timeout:
+            page.go_back(wait_until="domcontentloaded", timeout=timeout)
+        with TIMEOUTS.stage("grid") as timeout:
+            page.wait_for_selector(GRID_POST_LINKS, state="visible", timeout=timeout)
+    except Exception:
+        pass
+
+
+def _close_dialog(page) -> None:
+    try:
+        with TIMEOUTS.stage("close") as timeout:
+            page.locator(CLOSE_BUTTON).first.click(timeout=timeout)
+    except Exception:
+        # Fallback: press Escape
+        try:
+            page.keyboard.press("Escape")
+        except Exception:
+            pass
+
+
+def _extract_post(page, page_type: str, time_el) -> Tuple[str, str, str, List[str], List[str], List[str], str, bool]:
     # Returns: (post_url, date_iso, caption, hashtags, mentions, tagged_accounts, location_name, paid_banner)
-    dialog = page.locator(POST_DIALOG)
-    if not dialog.count():
+    # ``time_el`` is the post's timestamp, looked up once per post by the caller
+    root = page.locator(POST_DIALOG if page_type == "dialog" else POST_PAGE)
+    if not root.count():
         return "", "", "", [], [], [], "", False
 
     # URL via timestamp anchor or page.url change
     post_url = ""
-    try:
-        time_el = dialog.locator(POST_TIME).first
-        anchor = time_el.locator("xpath=ancestor::a[1]")
-        if anchor.count():
-            href = anchor.first.get_attribute("href")
-            if href:
-                post_url = href
-    except Exception:
-        pass
+    date_iso = ""
+    if time_el is not None:
+        try:
+            date_iso = time_el.get_attribute("datetime") or ""
+            anchor = time_el.locator("xpath=ancestor::a[1]")
+            if anchor.count():
+                href = anchor.first.get_attribute("href")
+                if href:
+                    post_url = href
+        except Exception:
+            pass
     if not post_url:
         try:
             post_url = page.url
         except Exception:
             post_url = ""
 
-    # Date
-    date_iso = ""
-    try:
-        date_iso = dialog.locator(POST_TIME).first.get_attribute("datetime") or ""
-    except Exception:
-        pass
-
-    # Caption
-    caption = ""
-    for sel in (CAPTION_PRIMARY, CAPTION_FALLBACK):
-        loc = dialog.locator(sel)
-        if loc.count():
-            try:
-                caption = loc.first.inner_text(timeout=3000).strip()
-                if caption:
-                    break
-            except Exception:
-                continue
+    # Caption: the candidate that worked on the last post is tried first
+    caption = RESOLVER.text(root, "caption", "caption", page_type)
 
     hashtags = extract_hashtags(caption)
     mentions = extract_mentions(caption)
@@ -116,106 +185,238 @@ def _extract_from_dialog(page) -> Tuple[str, str, str, List[str], List[str], Lis
     tagged_accounts: List[str] = list(mentions)
 
     # Location name
-    location_name = ""
-    try:
-        loc_link = dialog.locator(POST_LOCATION_LINK)
-        if loc_link.count():
-            location_name = (loc_link.first.inner_text(timeout=2000) or "").strip()
-    except Exception:
-        pass
+    location_name = RESOLVER.text(root, "location", "text", page_type)
 
     # Paid partnership banner detection (textual)
     paid_banner = False
     try:
-        dialog_text = (dialog.inner_text(timeout=2000) or "").lower()
-        paid_banner = any(s.lower() in dialog_text for s in PAID_PARTNERSHIP_TEXTS)
+        with TIMEOUTS.stage("text") as timeout:
+            post_text = (root.inner_text(timeout=timeout) or "").lower()
+        paid_banner = any(s.lower() in post_text for s in PAID_PARTNERSHIP_TEXTS)
     except Exception:
         pass
 
     return post_url, date_iso, caption, hashtags, mentions, tagged_accounts, location_name, paid_banner
 
 
-def scrape_profile(page, profile_url: str, limit: int, google_places_api_key: str | None) -> Dict:
-    page.goto(profile_url, wait_until="domcontentloaded")
+def _explain_missing_grid(page, profile_url: str) -> None:
+    """Return if the profile simply has no posts; otherwise raise ``ProfileUnavailable`` saying why."""
+    current = page.url or ""
+    if any(path in current for path in LOGIN_WALL_PATHS):
+        raise ProfileUnavailable("login_wall", profile_url, current)
+    try:
+        text = (page.locator("body").inner_text(timeout=TIMEOUTS.timeout("text")) or "").lower()
+    except Exception:
+        text = ""
+    if any(t.lower() in text for t in PRIVATE_ACCOUNT_TEXTS):
+        raise ProfileUnavailable("private", profile_url)
+    if any(t.lower() in text for t in NOT_FOUND_TEXTS):
+        raise ProfileUnavailable("not_found", profile_url)
+    try:
+        login_form = page.locator(LOGIN_FORM).count() > 0
+    except Exception:
+        login_form = False
+    if login_form:
+        raise ProfileUnavailable("login_wall", profile_url)
+    if any(t.lower() in text for t in EMPTY_PROFILE_TEXTS):
+        return
+    raise ProfileUnavailable("timeout", profile_url, "post grid did not appear")
+
+
+def iter_profile_posts(
+    page,
+    profile_url: str,
+    limit: int,
+    since: datetime | None = None,
+) -> Iterator[Tuple[Post, bool]]:
+    """Open up to ``limit`` posts of a profile and yield ``(post, paid_banner)``.
+
+    Posts carry only what the post shows; detection and enrichment are left
+    to ``annotate_post`` so they can run off the browser thread. A post
+    normally opens as a dialog over the grid. When no dialog appears but the
+    click navigated to the post's own page, that page is read with the
+    ``post`` selectors and the browser goes back to the grid.
+
+    With ``since``, the date is read as soon as a post opens and the profile
+    stops at the first post older than it: the grid is newest first, so the
+    rest would be older too. Pinned posts break that order; old ones are
+    skipped without stopping. Posts without a readable date are kept.
+
+    Waits use the adaptive ``TIMEOUTS``. A profile that shows no grid raises
+    ``ProfileUnavailable`` (timeout, login wall, private, not found) unless
+    it genuinely has no posts.
+    """
     try:
-        page.wait_for_selector(GRID_POST_LINKS, state="visible", timeout=8000)
+        with TIMEOUTS.stage("load") as timeout:
+            page.goto(profile_url, wait_until="domcontentloaded", timeout=timeout)
     except TimeoutError:
-        return {"profile_url": profile_url, "posts": []}
+        raise ProfileUnavailable("timeout", profile_url, "page load") from None
+    if any(path in (page.url or "") for path in LOGIN_WALL_PATHS):
+        raise ProfileUnavailable("login_wall", profile_url, page.url)
+    try:
+        # Private, missing and empty profiles never show a grid; only an unexplained miss counts as a timeout
+        with TIMEOUTS.stage("grid", count_timeouts=False) as timeout:
+            page.wait_for_selector(GRID_POST_LINKS, state="visible", timeout=timeout)
+    except TimeoutError:
+        try:
+            _explain_missing_grid(page, profile_url)
+        except ProfileUnavailable as e:
+            if e.kind == "timeout":
+                TIMEOUTS.timed_out("grid")
+            raise
+        return
 
     hrefs = _open_first_n_posts(page, n=limit)
-    posts: List[Dict] = []
 
-    for href in hrefs:
+    for href, pinned in hrefs:
         try:
             # Open dialog by clicking the link element matching href
-            page.locator(f"a[href='{href}']").first.click(timeout=3000)
+            with TIMEOUTS.stage("click") as timeout:
+                page.locator(f"a[href='{href}']").first.click(timeout=timeout)
         except Exception:
             continue
 
-        try:
-            page.locator(POST_DIALOG).first.wait_for(state="visible", timeout=6000)
-        except TimeoutError:
+        page_type = _open_post(page)
+        if page_type is None:
             continue
 
-        post_url, date_iso, caption, hashtags, mentions, tagged_accounts, location_name, paid_banner = _extract_from_dialog(page)
-
-        sponsored, reasons = sponsored_flags(
-            caption=caption,
-            paid_banner_present=paid_banner,
-            tagged_accounts=tagged_accounts,
+        root = page.locator(POST_DIALOG if page_type == "dialog" else POST_PAGE)
+        time_el = RESOLVER.locate(root, "post_time", page_type)
+        if since is not None:
+            posted = parse_iso(_post_date(time_el))
+            if posted is not None and posted < since:
+                _leave_post(page, page_type)
+                if pinned:
+                    continue
+                return
+
+        post_url, date_iso, caption, hashtags, mentions, tagged_accounts, location_name, paid_banner = _extract_post(page, page_type, time_el)
+
+        post = Post(
+            post_url,
+            date_iso,
+            caption,
+            tuple(hashtags),
+            tuple(mentions),
+            tuple(tagged_accounts),
+            location_name,
         )
 
-        hotel_info = {
-            "name": None,
-            "instagram_handle": None,
-            "website": None,
-            "email": None,
-            "address": None,
-            "phone": None,
-            "enrichment_source": None,
-        }
-
-        if sponsored:
-            candidates = find_hotel_candidates(caption, hashtags, mentions, tagged_accounts, location_name)
-            # Enrich the first plausible candidate
-            if candidates:
-                c = candidates[0]
-                enriched = enrich_hotel_candidate(c, google_places_api_key)
-                hotel_info.update({
-                    "name": c.get("name") or None,
-                    "instagram_handle": (c.get("instagram_handle") or None),
-                    **enriched,
-                })
-
-        posts.append({
-            "post_url": post_url,
-            "date_iso": date_iso,
-            "caption": caption,
-            "hashtags": hashtags,
-            "mentions": mentions,
-            "tagged_accounts": tagged_accounts,
-            "location_name": location_name,
-            "sponsored": sponsored,
-            "sponsored_reasons": reasons,
-            "hotel": hotel_info,
-        })
-
-        # Close dialog
-        try:
-            page.locator(CLOSE_BUTTON).first.click(timeout=2000)
-        except Exception:
-            # Fallback: press Escape
-            try:
-                page.keyboard.press("Escape")
-            except Exception:
-                pass
+        _leave_post(page, page_type)
+
+        yield post, paid_banner
         jitter_sleep(0.4, 0.8)
 
-    return {"profile_url": profile_url, "posts": posts}
+
+def scrape_profile(
+    browser: BrowserSupervisor,
+    profile_url: str,
+    limit: int,
+    google_places_api_key: str | None,
+    hotels: HotelRegistry | None = None,
+    since: datetime | None = None,
+    captions: CaptionIndex | None = None,
+) -> ProfileResult:
+    """Extract a profile's posts through ``browser``, then annotate them.
+
+    Only the extraction runs in ``browser.call``, which repeats it after a
+    browser error; annotation (hotel post counts, the caption index) happens
+    once, on the posts of the attempt that succeeded.
+    """
+    with METRICS.timer("stage_seconds", stage="extract"):
+        extracted = browser.call(lambda page: list(iter_profile_posts(page, profile_url, limit, since=since)))
+    posts = []
+    for post, paid_banner in extracted:
+        with METRICS.timer("stage_seconds", stage="annotate"):
+            posts.append(annotate_post(post, paid_banner, google_places_api_key, hotels, captions))
+    scraped_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    return ProfileResult(profile_url, scraped_at, posts)
+
+
+def unavailable_payload(profile_url: str, kind: str) -> ProfileResult:
+    """Payload recorded for a private or missing profile so later runs skip it."""
+    scraped_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    return ProfileResult(profile_url, scraped_at, unavailable=kind)
+
+
+def _unavailable(e: ProfileUnavailable, retries: RetryQueue) -> ProfileResult | None:
+    # Permanent failures become a payload; transient ones wait in ``retries`` and return None
+    if not e.transient:
+        tqdm.write(f"  {e.kind.replace('_', ' ')}; recorded as unavailable")
+        return unavailable_payload(e.url, e.kind)
+    delay = retries.push(e.url)
+    _count_failure(e.kind, final=delay is None)
+    if delay is None:
+        tqdm.write(f"  {e}; giving up for this run")
+    else:
+        tqdm.write(f"  {e}; retrying in {delay:.0f}s")
+    return None
+
+
+def _count_failure(status: str, final: bool) -> None:
+    # A profile counts towards profiles_total once, with its final outcome
+    METRICS.inc("profiles_total" if final else "retries_total", status=status)
+
+
+def _failed(url: str, e: Exception, retries: RetryQueue) -> None:
+    delay = retries.push(url)
+    _count_failure("failed", final=delay is None)
+    if delay is None:
+        tqdm.write(f"  failed: {e.__class__.__name__}: {e}; giving up for this run")
+    else:
+        tqdm.write(f"  failed: {e.__class__.__name__}: {e}; retrying in {delay:.0f}s")
+
+
+def _scrape_leased(
+    browser: BrowserSupervisor,
+    queue: WorkQueue,
+    url: str,
+    limit: int,
+    google_places_api_key: str | None,
+    hotels: HotelRegistry,
+    since: datetime | None = None,
+    captions: CaptionIndex | None = None,
+) -> ProfileResult | None:
+    # Scrape one leased profile and report the outcome; None if it failed
+    try:
+        with queue.keep_alive(url):
+            payload = scrape_profile(
+                browser,
+                url,
+                limit=limit,
+                google_places_api_key=google_places_api_key,
+                hotels=hotels,
+                since=since,
+                captions=captions,
+            )
+    except SelectorsBroken:
+        queue.release(url)
+        raise
+    except ProfileUnavailable as e:
+        if e.transient:
+            _count_failure(e.kind, final=queue.attempts(url) >= queue.max_attempts)
+            delay = backoff_delay(queue.attempts(url))
+            queue.fail(url, str(e), retry_after=delay)
+            tqdm.write(f"  {e}; returned to queue, retry in {delay:.0f}s")
+            return None
+        payload = unavailable_payload(url, e.kind)
+    except Exception as e:
+        _count_failure("failed", final=queue.attempts(url) >= queue.max_attempts)
+        queue.fail(url, f"{e.__class__.__name__}: {e}")
+        tqdm.write(f"  failed, returned to queue: {e.__class__.__name__}: {e}")
+        return None
+    except BaseException:
+        queue.release(url)
+        raise
+    ids = {p.hotel_id for p in payload.posts if p.hotel_id}
+    rows = [h for h in hotels.table() if h["hotel_id"] in ids] if ids else None
+    if not queue.complete(url, payload, hotels=rows):
+        tqdm.write("  already completed or leased by another worker; result discarded")
+    return payload
 
 
 def run(
-    profile_urls: List[str],
+    profile_urls: Iterable[str],
     out_dir: str,
     limit: int = 6,
     headless: bool = False,
@@ -223,70 +424,133 @@ def run(
     out_file: str | None = None,
     aggregate_format: str = "json",
     google_places_api_key: str | None = None,
+    recycle_page_every: int = 50,
+    recycle_context_every: int = 500,
+    max_rss_mb: float = 0,
+    flush_every: int = 10,
+    flush_interval: float = 30.0,
+    queue: WorkQueue | None = None,
+    since: datetime | None = None,
+    precheck: PreChecker | None = None,
+    session_check_hours: float = 12.0,
+    caption_dedup: bool = True,
 ) -> None:
+    """Scrape ``profile_urls`` into the aggregate, or, with ``queue``, whatever it hands out.
+
+    In queue mode the queue decides what is already done; each payload is also
+    reported back to it, and a profile that fails is returned for a retry
+    instead of aborting the run. ``since`` stops each profile at its first
+    post older than the cutoff (see ``iter_profile_posts``).
+
+    Private and missing profiles are stored with an ``unavailable`` marker.
+    Timeouts, login walls and any other error that outlasts the browser
+    supervisor's retry are retried with backoff (by the queue in queue mode)
+    and are not stored until a retry succeeds; the run carries on meanwhile.
+
+    With ``precheck`` (ignored in queue mode, where it applies at enqueue
+    time) profiles are triaged over HTTP ahead of the browser, and private
+    or deleted ones are never opened.
+
+    With ``caption_dedup`` a post repeating an earlier caption of the run
+    reuses its detection and hotel (see ``annotate``).
+    """
     ensure_dir(out_dir)
 
     with sync_playwright() as p:
-        context = p.chromium.launch_persistent_context(
+        browser = BrowserSupervisor(
+            p,
             user_data_dir=user_data_dir,
             headless=headless,
-            viewport={"width": 1280, "height": 900},
-            args=["--disable-blink-features=AutomationControlled"],
+            recycle_page_every=recycle_page_every,
+            recycle_context_every=recycle_context_every,
+            max_rss_mb=max_rss_mb,
+            session_check_hours=session_check_hours,
         )
-        # Clipboard not required for Instagram flow, but safe defaults
-        page = context.new_page()
+        page = browser.start()
 
-        _ensure_logged_in(page, headless=headless)
+        _ensure_logged_in(page, headless=headless, session=browser.session)
 
         agg_path = Path(out_file) if out_file else Path(out_dir) / "all.json"
-        processed_urls: set[str] = set()
-        all_payloads: list[dict] = []
-        if agg_path.exists():
-            try:
-                if aggregate_format == "ndjson":
-                    with agg_path.open("r", encoding="utf-8") as f:
-                        for line in f:
-                            line = line.strip()
-                            if not line:
-                                continue
-                            obj = json.loads(line)
-                            url = (obj.get("profile_url") or "").strip()
-                            if url:
-                                processed_urls.add(url)
+        processed_urls, all_payloads = load_aggregate(agg_path, aggregate_format)
+        hotel_rows = load_hotels(agg_path, aggregate_format)
+        if queue is not None:
+            # Hotels enriched by other workers are not fetched again
+            hotel_rows += queue.hotels()
+            profile_urls = queue.claims()
+        hotels = HotelRegistry(google_places_api_key, rows=hotel_rows)
+        watch_run(hotels)
+        captions = CaptionIndex() if caption_dedup else None
+        # Streamed URL lists have no length; tqdm then shows a running count
+        total = len(profile_urls) if isinstance(profile_urls, Sized) else None
+        retries = RetryQueue()
+        if queue is None:
+            if precheck is not None:
+                profile_urls = precheck.filter(profile_urls, skip=processed_urls)
+            profile_urls = with_retries(profile_urls, retries)
+
+        with AggregateWriter(
+            agg_path,
+            aggregate_format=aggregate_format,
+            payloads=all_payloads,
+            hotels=hotels.table,
+            flush_every=flush_every,
+            flush_interval=flush_interval,
+        ) as writer:
+            for idx, url in enumerate(tqdm(profile_urls, total=total, desc="Profiles", unit="profile"), start=1):
+                if queue is None and url in processed_urls:
+                    tqdm.write(f"[{idx}/{total or '?'}] Skipping already scraped: {url}")
+                    continue
+                tqdm.write(f"[{idx}/{total or '?'}] {url} → {agg_path}")
+
+                started = time.perf_counter()
+                if queue is None:
+                    try:
+                        payload = scrape_profile(
+                            browser,
+                            url,
+                            limit=limit,
+                            google_places_api_key=google_places_api_key,
+                            hotels=hotels,
+                            since=since,
+                            captions=captions,
+                        )
+                    except SelectorsBroken:
+                        raise
+                    except ProfileUnavailable as e:
+                        payload = _unavailable(e, retries)
+                        if payload is None:
+                            continue
+                    except Exception as e:
+                        # Failed again after the supervisor's fresh context; retry later, keep going
+                        _failed(url, e, retries)
+                        continue
                 else:
-                    with agg_path.open("r", encoding="utf-8") as f:
-                        obj = json.load(f)
-                    profiles = obj.get("profiles") if isinstance(obj, dict) else None
-                    if isinstance(profiles, list):
-                        for item in profiles:
-                            if isinstance(item, dict):
-                                url = (item.get("profile_url") or "").strip()
-                                if url:
-                                    processed_urls.add(url)
-                        all_payloads = list(profiles)
-            except Exception:
-                processed_urls = set()
-                all_payloads = []
-
-        total = len(profile_urls)
-        for idx, url in enumerate(tqdm(profile_urls, desc="Profiles", unit="profile"), start=1):
-            if url in processed_urls:
-                tqdm.write(f"[{idx}/{total}] Skipping already scraped: {url}")
-                continue
-            tqdm.write(f"[{idx}/{total}] {url} → {agg_path}")
-
-            payload = scrape_profile(page, url, limit=limit, google_places_api_key=google_places_api_key)
-            all_payloads.append(payload)
-
-            jitter_sleep(1.0, 2.0)
-
-            agg_path.parent.mkdir(parents=True, exist_ok=True)
-            if aggregate_format == "ndjson":
-                mode = "a" if agg_path.exists() else "w"
-                with agg_path.open(mode, encoding="utf-8") as f:
-                    f.write(json.dumps(payload, ensure_ascii=False) + "\n")
-            else:
-                write_json(agg_path, {"profiles": all_payloads})
-
-        context.close()
-
+                    payload = _scrape_leased(browser, queue, url, limit, google_places_api_key, hotels, since, captions)
+                    if payload is None:
+                        continue
+                record_profile(payload, time.perf_counter() - started)
+                with METRICS.timer("stage_seconds", stage="write"):
+                    writer.add(payload)
+
+                jitter_sleep(1.0, 2.0)
+
+                # The payload is held by the writer; safe to recycle the page/context now
+                browser.profile_done()
+
+        browser.close()
+        if queue is not None:
+            stats = queue.stats()
+            tqdm.write(
+                f"Queue: {stats['done']} done, {stats['pending']} pending, "
+                f"{stats['leased']} leased, {stats['failed']} failed"
+            )
+        tqdm.write(
+            f"Hotels: {len(hotels.table())} unique, {hotels.enrichments} enriched this run, "
+            f"{hotels.hits} reused ({hotels.fuzzy_hits} via fuzzy match)"
+        )
+        if captions is not None:
+            tqdm.write(
+                f"Captions: {len(captions)} distinct, "
+                f"{METRICS.value('caption_duplicates_total', match=EXACT)} exact and "
+                f"{METRICS.value('caption_duplicates_total', match=NEAR)} near repeats reused"
+            )
@@ -3,14 +3,38 @@
 Selectors are conservative with text fallbacks because Instagram's DOM evolves.
 Prefer role/text-based queries where possible; keep a small set of well-known
 anchors and complement with regex text matching in the scraper.
+
+Fields read from a post (caption, time, location) have ordered candidate
+selectors per page type: ``dialog`` for a post opened over the grid, and
+``post`` for a standalone post page, which a grid click sometimes navigates
+to instead. ``SelectorResolver`` tries the candidate that last worked first,
+counts misses, and raises ``SelectorsBroken`` once a required field's recent
+hit rate collapses: a markup change then stops the run instead of filling
+the aggregate with empty captions.
 """
 
+from __future__ import annotations
+
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from .metrics import METRICS
+from .timeouts import TIMEOUTS
+
 # Profile grid items (links to posts/reels)
 GRID_POST_LINKS = "a[href*='/p/'], a[href*='/reel/']"
 
+# Pin badge inside a grid link (pinned posts sit first regardless of age)
+PINNED_POST_ICON = "svg[aria-label*='Pinned']"
+
 # Post dialog root
 POST_DIALOG = "div[role='dialog']"
 
+# Standalone post page root (/p/… or /reel/… opened as a page, not a dialog)
+POST_PAGE = "main article"
+POST_PAGE_PATH = r"^/(?:[\w.]+/)?(?:p|reel)/[\w-]+"
+
 # Within dialog/article
 POST_TIME = "time[datetime]"
 POST_LOCATION_LINK = "a[href^='/explore/locations/']"
@@ -26,7 +50,133 @@ PAID_PARTNERSHIP_TEXTS = (
     "Paid Partnership",
 )
 
+# Profile page states that explain a missing grid (case-insensitive page-text checks)
+PRIVATE_ACCOUNT_TEXTS = (
+    "This account is private",
+    "This Account is Private",
+)
+NOT_FOUND_TEXTS = (
+    "Sorry, this page isn't available",
+    "Page not found",
+)
+EMPTY_PROFILE_TEXTS = ("No posts yet",)
+LOGIN_WALL_PATHS = ("/accounts/login", "/challenge/")
+LOGIN_FORM = "input[name='username']"
+
 # UI controls
 NEXT_BUTTON = "button[aria-label='Next']"
 CLOSE_BUTTON = "div[role='dialog'] svg[aria-label='Close']"
 
+
+# Ordered candidates per page type and field; the first is the expected markup
+CANDIDATES: Dict[str, Dict[str, Tuple[str, ...]]] = {
+    "dialog": {
+        "caption": (CAPTION_PRIMARY, "div[role='dialog'] h1", CAPTION_FALLBACK),
+        "post_time": (POST_TIME,),
+        "location": (POST_LOCATION_LINK, "a[href*='/explore/locations/']"),
+    },
+    "post": {
+        "caption": ("article ul li div div span", "article h1", "article span"),
+        "post_time": (POST_TIME,),
+        "location": (POST_LOCATION_LINK, "a[href*='/explore/locations/']"),
+    },
+}
+
+# Minimum share of recent lookups that must succeed, per required field. Captions
+# can legitimately be empty, so their bar is low; every post has a timestamp.
+REQUIRED_HIT_RATES: Dict[str, float] = {"post_time": 0.8, "caption": 0.25}
+
+
+class SelectorsBroken(RuntimeError):
+    """A required field stopped matching; Instagram's markup has probably changed."""
+
+
+class SelectorResolver:
+    def __init__(
+        self,
+        candidates: Dict[str, Dict[str, Tuple[str, ...]]] = CANDIDATES,
+        required: Dict[str, float] = REQUIRED_HIT_RATES,
+        window: int = 40,
+    ) -> None:
+        self.candidates = candidates
+        self.required = required
+        self.window = window
+        self._last: Dict[Tuple[str, str], int] = {}
+        self._recent: Dict[Tuple[str, str], Deque[bool]] = {}
+        self.misses: Dict[Tuple[str, str, int], int] = {}
+        self._lock = threading.Lock()
+
+    def order(self, page_type: str, field: str) -> List[Tuple[int, str]]:
+        """``(index, selector)`` candidates, the last successful one first."""
+        cands = list(enumerate(self.candidates[page_type][field]))
+        last = self._last.get((page_type, field))
+        if last:
+            cands.insert(0, cands.pop(last))
+        return cands
+
+    def _record(self, page_type: str, field: str, index: Optional[int], tried: List[int]) -> None:
+        key = (page_type, field)
+        with self._lock:
+            for i in tried:
+                if i != index:
+                    self.misses[(page_type, field, i)] = self.misses.get((page_type, field, i), 0) + 1
+            if index is not None:
+                self._last[key] = index
+            recent = self._recent.setdefault(key, deque(maxlen=self.window))
+            recent.append(index is not None)
+            full = len(recent) == self.window
+            rate = sum(recent) / len(recent)
+        for i in tried:
+            if i != index:
+                METRICS.inc("selector_misses_total", page=page_type, field=field, candidate=str(i))
+        METRICS.inc("selector_lookups_total", page=page_type, field=field, result="hit" if index is not None else "miss")
+        floor = self.required.get(field)
+        if floor is not None and full and rate < floor:
+            raise SelectorsBroken(
+                f"{field!r} found in only {rate:.0%} of the last {self.window} {page_type} posts "
+                f"(need {floor:.0%}); update CANDIDATES in selectors.py"
+            )
+
+    def locate(self, root, field: str, page_type: str = "dialog"):
+        """First element matching ``field`` under ``root``, or None."""
+        tried: List[int] = []
+        for i, sel in self.order(page_type, field):
+            tried.append(i)
+            try:
+                loc = root.locator(sel)
+                if loc.count():
+                    self._record(page_type, field, i, tried)
+                    return loc.first
+            except SelectorsBroken:
+                raise
+            except Exception:
+                continue
+        self._record(page_type, field, None, tried)
+        return None
+
+    def text(self, root, field: str, stage: str, page_type: str = "dialog") -> str:
+        """Stripped text of the first candidate that yields any, or "".
+
+        Each read is timed under the adaptive timeout ``stage``, so a read
+        that times out counts as a timeout there rather than as a latency
+        sample, even though the next candidate is then tried.
+        """
+        tried: List[int] = []
+        for i, sel in self.order(page_type, field):
+            tried.append(i)
+            try:
+                loc = root.locator(sel)
+                if not loc.count():
+                    continue
+                with TIMEOUTS.stage(stage) as timeout:
+                    value = (loc.first.inner_text(timeout=timeout) or "").strip()
+            except Exception:
+                continue
+            if value:
+                self._record(page_type, field, i, tried)
+                return value
+        self._record(page_type, field, None, tried)
+        return ""
+
+
+RESOLVER = SelectorResolver()
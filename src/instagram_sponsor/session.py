@@ -0,0 +1,80 @@
+"""Skip the homepage login probe when the saved session is known to be good.
+
+The persistent context keeps Instagram's ``sessionid`` cookie on disk. After
+a successful probe a marker is written next to it in ``user_data_dir`` with
+the time and the cookie's expiry. Later runs look at the cookie jar only. If
+the cookie is present, is not about to expire, is the same cookie that was
+verified, and was verified less than ``max_age_hours`` ago, the probe is
+skipped and the first navigation is the first profile. A login wall met
+while scraping drops the marker, so the next start probes again.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+SESSION_COOKIE = "sessionid"
+COOKIE_URL = "https://www.instagram.com"
+MARKER_NAME = ".session_verified.json"
+
+
+class SessionState:
+    def __init__(self, user_data_dir: str, max_age_hours: float = 12.0, min_cookie_hours: float = 24.0) -> None:
+        self.marker = Path(user_data_dir) / MARKER_NAME
+        self.max_age_s = max_age_hours * 3600
+        self.min_cookie_s = min_cookie_hours * 3600
+
+    def cookie_expiry(self, context) -> Optional[float]:
+        """Expiry (epoch seconds) of the session cookie; None without one, -1 for a browser-session cookie."""
+        try:
+            cookies = context.cookies(COOKIE_URL)
+        except Exception:
+            return None
+        for c in cookies:
+            if c.get("name") == SESSION_COOKIE and c.get("value"):
+                return float(c.get("expires", -1))
+        return None
+
+    def _read_marker(self) -> Optional[dict]:
+        try:
+            with self.marker.open("r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def looks_fresh(self, context) -> bool:
+        if self.max_age_s <= 0:
+            return False
+        expiry = self.cookie_expiry(context)
+        if expiry is None or expiry < 0:
+            return False
+        now = time.time()
+        if expiry - now < self.min_cookie_s:
+            return False
+        marker = self._read_marker()
+        if not marker or marker.get("cookie_expires") != expiry:
+            # No verification on record, or the cookie changed since
+            return False
+        return now - marker.get("verified_at", 0) < self.max_age_s
+
+    def mark_verified(self, context) -> None:
+        expiry = self.cookie_expiry(context)
+        if expiry is None:
+            return
+        tmp = self.marker.with_name(self.marker.name + ".tmp")
+        try:
+            with tmp.open("w", encoding="utf-8") as f:
+                json.dump({"verified_at": time.time(), "cookie_expires": expiry}, f)
+            os.replace(tmp, self.marker)
+        except OSError:
+            pass
+
+    def invalidate(self) -> None:
+        try:
+            self.marker.unlink()
+        except OSError:
+            pass
@@ -0,0 +1,121 @@
+"""Per-stage browser timeouts derived from observed latency.
+
+Fixed waits are either too long for a healthy session (a dead page costs the
+full wait) or too short on a slow day. Each stage (profile load, grid, click,
+dialog, caption and text reads, dialog close) keeps a rolling window of how
+long its successful waits took. Its timeout is the window's 95th percentile
+times ``headroom``, kept between a floor and ``ceiling_factor`` times the
+old fixed default. Until ``min_samples`` waits are seen the default applies.
+
+A wait that times out is not a latency sample: the grid wait times out on
+every private, missing or empty profile, and counting those at their limit
+would push its timeout to the ceiling. Instead, ``reset_after`` timeouts in
+a row with no success in between clear the stage's window, so a site that
+has slowed for real goes back to the default until it is learned again.
+Callers that can tell a timeout was not about latency pass
+``count_timeouts=False`` and report the real ones with ``timed_out``.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, Mapping
+
+from .metrics import METRICS
+
+# The former hard-coded waits, in ms
+DEFAULTS_MS: Dict[str, float] = {
+    "load": 30000,
+    "grid": 8000,
+    "dialog": 6000,
+    "click": 3000,
+    "caption": 3000,
+    "text": 2000,
+    "close": 2000,
+}
+FLOORS_MS: Dict[str, float] = {
+    "load": 5000,
+    "grid": 2500,
+    "dialog": 1500,
+    "click": 1000,
+    "caption": 800,
+    "text": 600,
+    "close": 600,
+}
+
+
+class AdaptiveTimeouts:
+    def __init__(
+        self,
+        defaults: Mapping[str, float] = DEFAULTS_MS,
+        floors: Mapping[str, float] = FLOORS_MS,
+        window: int = 64,
+        min_samples: int = 8,
+        percentile: float = 0.95,
+        headroom: float = 2.0,
+        ceiling_factor: float = 2.5,
+        reset_after: int = 3,
+    ) -> None:
+        self.defaults = dict(defaults)
+        self.floors = dict(floors)
+        self.window = window
+        self.min_samples = min_samples
+        self.percentile = percentile
+        self.headroom = headroom
+        self.ceiling_factor = ceiling_factor
+        self.reset_after = reset_after
+        self._samples: Dict[str, Deque[float]] = {}
+        # Timeouts in a row per stage since its last successful wait
+        self._streaks: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, ms: float) -> None:
+        """Record one successful wait of ``ms``."""
+        with self._lock:
+            self._samples.setdefault(stage, deque(maxlen=self.window)).append(ms)
+            self._streaks[stage] = 0
+        METRICS.set("timeout_ms", self.timeout(stage), stage=stage)
+
+    def timed_out(self, stage: str) -> None:
+        """Record a wait that ran into its timeout; see the module docstring."""
+        with self._lock:
+            streak = self._streaks.get(stage, 0) + 1
+            if streak >= self.reset_after:
+                self._samples.pop(stage, None)
+                streak = 0
+            self._streaks[stage] = streak
+        METRICS.inc("timeouts_total", stage=stage)
+        METRICS.set("timeout_ms", self.timeout(stage), stage=stage)
+
+    def timeout(self, stage: str) -> float:
+        """Current timeout for ``stage`` in ms."""
+        default = self.defaults.get(stage, 5000)
+        with self._lock:
+            samples = sorted(self._samples.get(stage, ()))
+        if len(samples) < self.min_samples:
+            return default
+        p = samples[int(self.percentile * (len(samples) - 1))]
+        return max(self.floors.get(stage, 0), min(p * self.headroom, default * self.ceiling_factor))
+
+    @contextmanager
+    def stage(self, stage: str, count_timeouts: bool = True) -> Iterator[float]:
+        """Yield the timeout to use for one wait and record how long it took.
+
+        Errors that come back before the timeout (a missing element, a
+        closed page) say nothing about latency and are not recorded.
+        """
+        timeout = self.timeout(stage)
+        t = time.perf_counter()
+        try:
+            yield timeout
+        except BaseException:
+            if count_timeouts and (time.perf_counter() - t) * 1000 >= timeout:
+                self.timed_out(stage)
+            raise
+        self.observe(stage, (time.perf_counter() - t) * 1000)
+
+
+TIMEOUTS = AdaptiveTimeouts()
@@ -1,26 +1,21 @@
 from __future__ import annotations
 
+import argparse
+import codecs
 import csv
+import hashlib
 import json
 import os
 import random
 import re
 import time
-from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 from urllib.parse import urlparse
 
-
-@dataclass
-class Post:
-    post_url: str
-    date_iso: str
-    caption: str
-    hashtags: List[str]
-    mentions: List[str]
-    tagged_accounts: List[str]
-    location_name: str
+from .metrics import METRICS
+from .records import HotelCache, ProfileResult, json_default
 
 
 def _normalize_header(s: str) -> str:
@@ -41,37 +36,115 @@ def _find_column(fieldnames: Optional[List[str]], target: str) -> Optional[str]:
     return None
 
 
-def read_profile_urls(csv_path: str, url_column: str) -> List[str]:
-    urls: List[str] = []
+_SNIFF_BYTES = 64 * 1024
+# Fallbacks tried after the sniffed encoding, in order
+_ENCODINGS = ("utf-8", "utf-8-sig", "utf-16", "utf-16le", "utf-16be", "latin-1")
+
+
+def _decodes(sample: bytes, encoding: str) -> bool:
+    # Incremental decode tolerates a multi-byte sequence cut at the sample end
+    try:
+        codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+    except UnicodeError:
+        return False
+    return True
+
+
+def sniff_encoding(sample: bytes) -> str:
+    """Guess a CSV's encoding from its leading bytes (BOM, UTF-16 NULs, UTF-8 validity)."""
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if sample.startswith(codecs.BOM_UTF16_LE) or sample.startswith(codecs.BOM_UTF16_BE):
+        return "utf-16"
+    if sample and sample.count(b"\x00") > len(sample) // 4:
+        # ASCII text in UTF-16 without a BOM: every other byte is NUL
+        return "utf-16le" if sample[1:2] == b"\x00" else "utf-16be"
+    return "utf-8" if _decodes(sample, "utf-8") else "latin-1"
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """argparse type for ``--shard``: ``"i/N"`` (0-based shard ``i`` of ``N``)."""
+    try:
+        i, n = (int(x) for x in spec.split("/", 1))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid shard {spec!r}; expected i/N, e.g. 0/4")
+    if n < 1 or not 0 <= i < n:
+        raise argparse.ArgumentTypeError(f"Invalid shard {spec!r}; need 0 <= i < N")
+    return i, n
+
+
+def iter_profile_urls(
+    csv_path: str,
+    url_column: str,
+    shard: Optional[Tuple[int, int]] = None,
+) -> Iterator[str]:
+    """Lazily yield normalized, de-duplicated profile URLs from a CSV.
+
+    The encoding sniffed from a leading sample is tried first, then the usual
+    fallbacks; an encoding is used if the sample decodes strictly and the
+    header has the column. That happens before this returns, so a bad file
+    fails fast; rows are then read one at a time, still strictly, and a
+    byte the chosen encoding cannot decode further down raises
+    ``ValueError`` there rather than turning into a corrupt URL.
+    De-duplication keeps 8-byte digests rather than URLs. With
+    ``shard=(i, N)`` only URLs whose digest falls in shard ``i`` are yielded:
+    the split is by URL rather than by row, so duplicates never straddle
+    workers and each worker's de-dup set holds only its own slice.
+    """
+    with open(csv_path, "rb") as fb:
+        sample = fb.read(_SNIFF_BYTES)
     tried: List[str] = []
-    for enc in ("utf-8", "utf-8-sig", "utf-16", "utf-16le", "utf-16be", "latin-1"):
+    for encoding in dict.fromkeys((sniff_encoding(sample), *_ENCODINGS)):
+        if not _decodes(sample, encoding):
+            tried.append(f"{encoding} (decode error)")
+            continue
+        f = open(csv_path, newline="", encoding=encoding, errors="strict")
+        reader = csv.reader(f)
         try:
-            with open(csv_path, newline="", encoding=enc, errors="strict") as f:
-                reader = csv.DictReader(f)
-                actual_col = _find_column(reader.fieldnames, url_column)  # type: ignore[arg-type]
-                if not actual_col:
-                    tried.append(f"{enc} (no matching column)")
-                    continue
-                for row in reader:  # type: ignore[assignment]
-                    raw = (row.get(actual_col) or "").strip()
-                    if not raw:
-                        continue
-                    urls.append(normalize_profile_url(raw))
-                break
-        except UnicodeDecodeError:
-            tried.append(f"{enc} (decode error)")
+            header = next(reader, None)
+        except UnicodeError:
+            f.close()
+            tried.append(f"{encoding} (decode error)")
             continue
+        actual_col = _find_column(header, url_column)
+        if actual_col:
+            break
+        f.close()
+        tried.append(f"{encoding} (no matching column)")
     else:
-        raise UnicodeDecodeError("csv", b"", 0, 1, f"Unable to decode CSV. Tried encodings: {', '.join(tried)}")
+        raise ValueError(f"Column {url_column!r} not found in {csv_path}. Tried encodings: {', '.join(tried)}")
+    col = header.index(actual_col)  # type: ignore[union-attr]
+
+    def _rows() -> Iterator[str]:
+        seen: Set[bytes] = set()
+        with f:
+            rows = iter(reader)
+            while True:
+                try:
+                    row = next(rows)
+                except StopIteration:
+                    return
+                except UnicodeDecodeError as e:
+                    raise ValueError(
+                        f"{csv_path}: bytes near line {reader.line_num + 1} are not valid {encoding} ({e.reason})"
+                    ) from e
+                raw = row[col].strip() if col < len(row) else ""
+                if not raw:
+                    continue
+                url = normalize_profile_url(raw)
+                digest = hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest()
+                if shard is not None and int.from_bytes(digest, "big") % shard[1] != shard[0]:
+                    continue
+                if digest in seen:
+                    continue
+                seen.add(digest)
+                yield url
+
+    return _rows()
+
 
-    # Deduplicate preserving order
-    seen = set()
-    deduped = []
-    for u in urls:
-        if u not in seen:
-            seen.add(u)
-            deduped.append(u)
-    return deduped
+def read_profile_urls(csv_path: str, url_column: str) -> List[str]:
+    return list(iter_profile_urls(csv_path, url_column))
 
 
 def normalize_profile_url(url: str) -> str:
@@ -101,14 +174,96 @@ def ensure_dir(path: str | Path) -> Path:
 
 
 def write_json(path: str | Path, obj: Dict) -> None:
+    """Write JSON atomically: temp file in the same directory, fsync, rename."""
     p = Path(path)
     p.parent.mkdir(parents=True, exist_ok=True)
-    with p.open("w", encoding="utf-8") as f:
-        json.dump(obj, f, ensure_ascii=False, indent=2)
+    tmp = p.with_name(f".{p.name}.tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=2, default=json_default)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, p)
+
+
+def parse_iso(ts: str) -> Optional[datetime]:
+    """Parse an ISO-8601 timestamp (``Z`` allowed) as an aware datetime; None if unparseable."""
+    s = (ts or "").strip()
+    if not s:
+        return None
+    try:
+        dt = datetime.fromisoformat(s[:-1] + "+00:00" if s.endswith("Z") else s)
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def parse_since(value: str) -> datetime:
+    """argparse type for ``--since``: an ISO date or datetime (UTC unless an offset is given)."""
+    dt = parse_iso(value)
+    if dt is None:
+        raise argparse.ArgumentTypeError(f"Invalid date {value!r}; expected e.g. 2024-05-01 or 2024-05-01T12:00:00Z")
+    return dt
+
+
+def post_cutoff(
+    since: Optional[datetime] = None,
+    max_age_days: Optional[float] = None,
+    now: Optional[datetime] = None,
+) -> Optional[datetime]:
+    """The later of ``since`` and ``now - max_age_days``; None when neither is set."""
+    cutoffs = [c for c in (since,) if c is not None]
+    if max_age_days:
+        cutoffs.append((now or datetime.now(timezone.utc)) - timedelta(days=max_age_days))
+    return max(cutoffs) if cutoffs else None
+
+
+def load_aggregate(path: str | Path, aggregate_format: str = "json") -> Tuple[Set[str], List[ProfileResult]]:
+    """Read an existing aggregate file; returns (processed profile URLs, payloads).
+
+    For NDJSON only the URLs are collected (appends never rewrite the file), so
+    the payload list is empty. A missing or unreadable file yields empty results.
+    """
+    p = Path(path)
+    processed_urls: Set[str] = set()
+    all_payloads: List[ProfileResult] = []
+    if not p.exists():
+        return processed_urls, all_payloads
+    try:
+        if aggregate_format == "ndjson":
+            with p.open("r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        obj = json.loads(line)
+                    except ValueError:
+                        # Torn last line from an interrupted append
+                        continue
+                    url = (obj.get("profile_url") or "").strip()
+                    if url:
+                        processed_urls.add(url)
+        else:
+            with p.open("r", encoding="utf-8") as f:
+                obj = json.load(f)
+            profiles = obj.get("profiles") if isinstance(obj, dict) else None
+            if isinstance(profiles, list):
+                for item in profiles:
+                    if isinstance(item, dict):
+                        url = (item.get("profile_url") or "").strip()
+                        if url:
+                            processed_urls.add(url)
+                hotels: HotelCache = {}
+                all_payloads = [ProfileResult.from_dict(item, hotels) for item in profiles if isinstance(item, dict)]
+    except Exception:
+        return set(), []
+    return processed_urls, all_payloads
 
 
 def jitter_sleep(min_s: float = 0.4, max_s: float = 1.2) -> None:
-    time.sleep(random.uniform(min_s, max_s))
+    delay = random.uniform(min_s, max_s)
+    time.sleep(delay)
+    METRICS.inc("sleep_seconds_total", delay)
 
 
 _HASHTAG_RE = re.compile(r"(?<!\w)#([\w_]{1,100})")
@@ -122,3 +277,33 @@ def extract_hashtags(text: str) -> List[str]:
 def extract_mentions(text: str) -> List[str]:
     return list(dict.fromkeys([m.group(1) for m in _MENTION_RE.finditer(text or "")]))
 
+
+def aggregate_format_for(path: str | Path) -> str:
+    return "ndjson" if Path(path).suffix.lower() in (".ndjson", ".jsonl") else "json"
+
+
+def iter_aggregate(path: str | Path) -> Iterator[ProfileResult]:
+    """Yield the profile payloads of a JSON or NDJSON aggregate (format taken from the suffix)."""
+    p = Path(path)
+    if not p.exists():
+        return
+    hotels: HotelCache = {}
+    with p.open("r", encoding="utf-8") as f:
+        if aggregate_format_for(p) == "ndjson":
+            for line in f:
+                try:
+                    obj = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(obj, dict):
+                    yield ProfileResult.from_dict(obj, hotels)
+            return
+        obj = json.load(f)
+    profiles = obj.get("profiles") if isinstance(obj, dict) else obj
+    if not isinstance(profiles, list):
+        return
+    for i, item in enumerate(profiles):
+        # Drop each parsed dict once decoded, so the file is never held twice over
+        profiles[i] = None
+        if isinstance(item, dict):
+            yield ProfileResult.from_dict(item, hotels)
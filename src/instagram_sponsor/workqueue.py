@@ -0,0 +1,313 @@
+"""SQLite-backed lease queue for scraping one profile list from many workers.
+
+Each profile is a row. A worker leases the next pending row for
+``lease_seconds``, keeps the lease alive with heartbeats while it scrapes, and
+then reports the profile payload (or the error) back. A lease that is not
+renewed expires, and the profile becomes claimable again by any worker;
+after ``max_attempts`` claims it is parked as failed. A profile failed with
+``retry_after`` backs off that long before it can be claimed again. Completed payloads and
+the hotel rows they reference are stored in the database, so
+``export_results`` can write one aggregate for the whole fleet.
+
+Workers on several machines can share the database file over a network
+filesystem as long as it provides POSIX byte-range locks. The rollback
+journal is used rather than WAL for that reason.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from .records import HotelCache, ProfileResult, json_default
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    url TEXT PRIMARY KEY,
+    status TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    result TEXT,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS profiles_claim ON profiles (status, attempts);
+CREATE TABLE IF NOT EXISTS hotels (
+    hotel_id TEXT PRIMARY KEY,
+    row TEXT NOT NULL
+);
+"""
+
+
+def add_queue_args(ap) -> None:
+    """Register the work-queue options of the scrape CLI."""
+    ap.add_argument(
+        "--queue",
+        default=None,
+        help="SQLite work-queue file shared by all workers; --csv profiles are enqueued into it",
+    )
+    ap.add_argument(
+        "--lease-seconds",
+        type=float,
+        default=600,
+        help="How long a claimed profile stays reserved without a heartbeat (default 600)",
+    )
+    ap.add_argument(
+        "--max-attempts",
+        type=int,
+        default=3,
+        help="Claims per profile before it is marked failed (default 3)",
+    )
+    ap.add_argument(
+        "--queue-export",
+        action="store_true",
+        help="Write all completed queue results to --out-file and exit",
+    )
+
+
+class WorkQueue:
+    def __init__(
+        self,
+        path: str | Path,
+        lease_seconds: float = 600,
+        max_attempts: int = 3,
+        worker_id: Optional[str] = None,
+    ) -> None:
+        self.path = Path(path)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Heartbeats come from a second thread; every statement runs under _lock
+        self._conn = sqlite3.connect(str(self.path), timeout=60, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _tx(self) -> Iterator[sqlite3.Connection]:
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers never claim the same row
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def enqueue(self, urls: Iterable[str], chunk: int = 1000) -> int:
+        """Add profiles not already queued; returns how many were new."""
+        added = 0
+        batch: List[tuple] = []
+
+        def _insert() -> int:
+            with self._tx() as conn:
+                before = conn.total_changes
+                conn.executemany("INSERT OR IGNORE INTO profiles (url, updated_at) VALUES (?, ?)", batch)
+                return conn.total_changes - before
+
+        now = time.time()
+        for url in urls:
+            batch.append((url, now))
+            if len(batch) >= chunk:
+                added += _insert()
+                batch = []
+        if batch:
+            added += _insert()
+        return added
+
+    def claim(self) -> Optional[str]:
+        """Lease the next pending (or expired) profile, or return None when none is claimable."""
+        now = time.time()
+        with self._tx() as conn:
+            conn.execute(
+                "UPDATE profiles SET status = 'failed', owner = NULL, error = 'lease expired', updated_at = ? "
+                "WHERE status = 'leased' AND lease_until < ? AND attempts >= ?",
+                (now, now, self.max_attempts),
+            )
+            # A pending row's lease_until, when set, is the earliest retry after a transient failure
+            row = conn.execute(
+                "SELECT url FROM profiles "
+                "WHERE status IN ('pending', 'leased') AND COALESCE(lease_until, 0) < ? AND attempts < ? "
+                "ORDER BY attempts, rowid LIMIT 1",
+                (now, self.max_attempts),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE profiles SET status = 'leased', owner = ?, lease_until = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE url = ?",
+                (self.worker_id, now + self.lease_seconds, now, row[0]),
+            )
+        return row[0]
+
+    def claims(self) -> Iterator[str]:
+        """Yield leased profiles until nothing is pending or leased any more.
+
+        Profiles backing off after a transient failure are waited for, and so
+        are leases held by other workers: if a worker dies, its profile is
+        claimed here once the lease expires.
+        """
+        while True:
+            url = self.claim()
+            if url is None:
+                due = self.next_claimable_at()
+                if due is None:
+                    return
+                time.sleep(max(0.0, due - time.time()) + 0.1)
+                continue
+            yield url
+
+    def next_claimable_at(self) -> Optional[float]:
+        """When the earliest backoff or lease ends, or None if nothing is pending or leased."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(lease_until) FROM profiles WHERE lease_until IS NOT NULL "
+                "AND (status = 'leased' OR (status = 'pending' AND attempts < ?))",
+                (self.max_attempts,),
+            ).fetchone()
+        return row[0]
+
+    def attempts(self, url: str) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT attempts FROM profiles WHERE url = ?", (url,)).fetchone()
+        return row[0] if row else 0
+
+    def heartbeat(self, url: str) -> bool:
+        """Extend our lease on ``url``; False if it expired and another worker took it."""
+        now = time.time()
+        with self._tx() as conn:
+            cur = conn.execute(
+                "UPDATE profiles SET lease_until = ?, updated_at = ? "
+                "WHERE url = ? AND owner = ? AND status = 'leased'",
+                (now + self.lease_seconds, now, url, self.worker_id),
+            )
+            return cur.rowcount == 1
+
+    @contextmanager
+    def keep_alive(self, url: str) -> Iterator[None]:
+        """Heartbeat the lease on ``url`` from a background thread while the block runs."""
+        stop = threading.Event()
+
+        def _beat() -> None:
+            while not stop.wait(max(1.0, self.lease_seconds / 3)):
+                try:
+                    if not self.heartbeat(url):
+                        print(f"[queue] lost lease on {url}", file=sys.stderr)
+                        return
+                except sqlite3.Error as e:
+                    print(f"[queue] heartbeat failed for {url}: {e}", file=sys.stderr)
+
+        t = threading.Thread(target=_beat, name="queue-heartbeat", daemon=True)
+        t.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            t.join()
+
+    def complete(self, url: str, payload: ProfileResult, hotels: Optional[List[Dict]] = None) -> bool:
+        """Store the result for ``url``; False if it was already done or is now leased by another worker.
+
+        An expired lease still counts as ours until someone else claims the profile.
+        """
+        now = time.time()
+        with self._tx() as conn:
+            cur = conn.execute(
+                "UPDATE profiles SET status = 'done', owner = NULL, error = NULL, result = ?, updated_at = ? "
+                "WHERE url = ? AND status != 'done' AND (owner IS NULL OR owner = ?)",
+                (json.dumps(payload, ensure_ascii=False, default=json_default), now, url, self.worker_id),
+            )
+            if cur.rowcount != 1:
+                return False
+            if hotels:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO hotels (hotel_id, row) VALUES (?, ?)",
+                    [(h["hotel_id"], json.dumps(h, ensure_ascii=False)) for h in hotels],
+                )
+            return True
+
+    def fail(self, url: str, error: str, retry_after: float = 0.0) -> None:
+        """Give up our lease after an error; the profile is retried until ``max_attempts``.
+
+        With ``retry_after`` no worker claims it again for that many seconds.
+        """
+        now = time.time()
+        with self._tx() as conn:
+            conn.execute(
+                "UPDATE profiles SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "owner = NULL, lease_until = ?, error = ?, updated_at = ? WHERE url = ? AND owner = ?",
+                (self.max_attempts, (now + retry_after) if retry_after else None, error, now, url, self.worker_id),
+            )
+
+    def release(self, url: str) -> None:
+        """Hand ``url`` back without counting the attempt (e.g. on Ctrl-C)."""
+        now = time.time()
+        with self._tx() as conn:
+            conn.execute(
+                "UPDATE profiles SET status = 'pending', owner = NULL, lease_until = NULL, "
+                "attempts = MAX(attempts - 1, 0), updated_at = ? WHERE url = ? AND owner = ? AND status = 'leased'",
+                (now, url, self.worker_id),
+            )
+
+    def hotels(self) -> List[Dict]:
+        with self._lock:
+            return [json.loads(r[0]) for r in self._conn.execute("SELECT row FROM hotels")]
+
+    def results(self) -> Iterator[ProfileResult]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT result FROM profiles WHERE status = 'done' ORDER BY updated_at"
+            ).fetchall()
+        hotels: HotelCache = {}
+        for (result,) in rows:
+            yield ProfileResult.from_dict(json.loads(result), hotels)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM profiles GROUP BY status").fetchall())
+        return {s: counts.get(s, 0) for s in ("pending", "leased", "done", "failed")}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def export_results(queue: WorkQueue, out_file: str | Path, aggregate_format: str = "json") -> int:
+    """Write every completed profile in ``queue`` to one aggregate; returns the profile count."""
+    from .writer import AggregateWriter
+
+    out = Path(out_file)
+    if out.exists():
+        out.unlink()
+    hotels = {h["hotel_id"]: h for h in queue.hotels()}
+    refs: Counter = Counter()
+    n = 0
+    with AggregateWriter(
+        out,
+        aggregate_format,
+        # JSON is written once at close; NDJSON appends as it goes
+        flush_every=1000 if aggregate_format == "ndjson" else 0,
+        flush_interval=float("inf"),
+        hotels=lambda: list(hotels.values()),
+    ) as writer:
+        for payload in queue.results():
+            refs.update(p.hotel_id for p in payload.posts if p.hotel_id)
+            writer.add(payload)
+            n += 1
+        # Per-worker counts only saw that worker's posts; recount over the whole fleet
+        for hid, row in hotels.items():
+            row["post_count"] = refs.get(hid, 0)
+    return n
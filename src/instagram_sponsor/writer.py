@@ -0,0 +1,175 @@
+"""Buffered, crash-safe writer for the aggregated output file.
+
+Profiles are buffered and committed every ``flush_every`` profiles or
+``flush_interval`` seconds, whichever comes first. For NDJSON a commit is a
+group commit: the buffered lines are appended and fsync'd together. A JSON
+aggregate cannot be appended to, so each commit rewrites the whole file
+through a temp file and an atomic rename; its cost grows with the file, and
+NDJSON is the format for long runs. Either way a crash leaves the previous
+or the new state on disk. Profiles still buffered at a hard crash are
+simply absent and get scraped again on resume; SIGINT/SIGTERM trigger a
+final flush.
+
+The NDJSON hotels sidecar is rewritten when a commit brings new hotels
+(so a crash does not lose their enrichment) and on close, which brings the
+post counts up to date; not on every commit.
+
+With ``flush_every=0`` nothing is committed before ``close``. One-shot
+conversions (``filter``, ``redetect``) use this for JSON output, which would
+otherwise be rewritten in full at every commit.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .hotels import hotels_sidecar_path
+from .records import ProfileResult, json_default
+from .utils import write_json
+
+
+def add_writer_args(ap) -> None:
+    """Register the commit options shared by the scrape and pipeline CLIs."""
+    ap.add_argument(
+        "--flush-every",
+        type=int,
+        default=10,
+        help="Commit the aggregate file every N profiles (default 10)",
+    )
+    ap.add_argument(
+        "--flush-interval",
+        type=float,
+        default=30.0,
+        help="Commit the aggregate file at least every N seconds (default 30)",
+    )
+
+
+class AggregateWriter:
+    def __init__(
+        self,
+        path: str | Path,
+        aggregate_format: str = "json",
+        payloads: Optional[List[ProfileResult]] = None,
+        flush_every: int = 10,
+        flush_interval: float = 30.0,
+        hotels: Optional[Callable[[], List[Dict]]] = None,
+    ) -> None:
+        self.path = Path(path)
+        # Supplies the hotels table committed with the aggregate
+        self.hotels = hotels
+        self.aggregate_format = aggregate_format
+        # 0: commit only on close
+        self.flush_every = max(0, flush_every)
+        self.flush_interval = flush_interval
+        # JSON keeps every payload (the file is rewritten per commit); NDJSON only the pending ones
+        self._payloads: List[ProfileResult] = list(payloads or [])
+        self._pending: List[ProfileResult] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._prev_handler = None
+        # Hotel ids in the NDJSON sidecar as last written, and whether commits have happened since
+        self._sidecar_ids: Optional[frozenset] = None
+        self._sidecar_stale = False
+        self.commits = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if aggregate_format == "ndjson":
+            _drop_torn_tail(self.path)
+
+    def add(self, payload: ProfileResult) -> None:
+        with self._lock:
+            self._pending.append(payload)
+            if self.aggregate_format != "ndjson":
+                self._payloads.append(payload)
+            due = self.flush_every > 0 and (
+                len(self._pending) >= self.flush_every
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if due:
+            self.flush()
+
+    def flush(self, final: bool = False) -> None:
+        with self._lock:
+            if self._pending:
+                if self.aggregate_format == "ndjson":
+                    with self.path.open("a", encoding="utf-8") as f:
+                        f.write("".join(json.dumps(p, ensure_ascii=False, default=json_default) + "\n" for p in self._pending))
+                        f.flush()
+                        os.fsync(f.fileno())
+                    self._sidecar_stale = self.hotels is not None
+                elif self.hotels is not None:
+                    write_json(self.path, {"profiles": self._payloads, "hotels": self.hotels()})
+                else:
+                    write_json(self.path, {"profiles": self._payloads})
+                self._pending = []
+                self._last_flush = time.monotonic()
+                self.commits += 1
+            if self._sidecar_stale:
+                self._write_sidecar(final)
+
+    def _write_sidecar(self, final: bool) -> None:
+        # Caller holds the lock
+        table = self.hotels()  # type: ignore[misc]
+        ids = frozenset(h.get("hotel_id") for h in table)
+        if final or ids != self._sidecar_ids:
+            write_json(hotels_sidecar_path(self.path), {"hotels": table})
+            self._sidecar_ids = ids
+            self._sidecar_stale = False
+
+    def install_signal_handlers(self) -> None:
+        """Turn SIGTERM into SystemExit so ``with``/``finally`` blocks get to flush.
+
+        SIGINT already raises KeyboardInterrupt. Only possible from the main thread.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return
+
+        def _on_term(signum, frame):
+            raise SystemExit(128 + signum)
+
+        self._prev_handler = signal.signal(signal.SIGTERM, _on_term)
+
+    def close(self) -> None:
+        try:
+            self.flush(final=True)
+        finally:
+            if self._prev_handler is not None:
+                signal.signal(signal.SIGTERM, self._prev_handler)
+                self._prev_handler = None
+
+    def __enter__(self) -> "AggregateWriter":
+        self.install_signal_handlers()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is not None and self._pending:
+            print(f"[writer] flushing {len(self._pending)} buffered profile(s) before exit", file=sys.stderr)
+        self.close()
+
+
+def _drop_torn_tail(path: Path) -> None:
+    # A crash mid-append can leave a partial last line; cut back to the last newline
+    if not path.exists() or path.stat().st_size == 0:
+        return
+    with path.open("rb+") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) == b"\n":
+            return
+        size = f.seek(0, os.SEEK_END)
+        pos = size
+        chunk = 4096
+        while pos > 0:
+            start = max(0, pos - chunk)
+            f.seek(start)
+            idx = f.read(pos - start).rfind(b"\n")
+            if idx != -1:
+                f.truncate(start + idx + 1)
+                return
+            pos = start
+        f.truncate(0)
@@ -0,0 +1,65 @@
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Tuple
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT / "src"), str(ROOT / "scripts")]
+
+# (status, headers, body) answered for a request
+Route = Tuple[int, Dict[str, str], bytes]
+
+
+class StubServer:
+    """A local HTTP server answering from a path -> handler table and recording requests.
+
+    A handler takes the request body and returns the response as a ``Route``.
+    """
+
+    def __init__(self) -> None:
+        self.routes: Dict[str, Callable[[bytes], Route]] = {}
+        self.requests: List[Tuple[str, str, Dict[str, str], bytes]] = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _answer(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                server.requests.append((self.command, self.path, dict(self.headers), body))
+                route = server.routes.get(self.path.split("?", 1)[0])
+                status, headers, payload = route(body) if route else (404, {}, b"not found")
+                self.send_response(status)
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = _answer
+
+            def log_message(self, format, *args) -> None:
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._httpd.server_address[1]}"
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+
+    def route(self, path: str, status: int = 200, headers: Dict[str, str] | None = None, body: bytes = b"") -> None:
+        self.routes[path] = lambda _body: (status, headers or {}, body)
+
+    def hits(self, path: str) -> int:
+        return sum(1 for _, p, _, _ in self.requests if p.split("?", 1)[0] == path)
+
+    def close(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+@pytest.fixture
+def stub_server() -> Iterator[StubServer]:
+    server = StubServer()
+    yield server
+    server.close()
@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from instagram_sponsor.bench import IMPORT_TARGETS, measure_import
+
+SRC = Path(__file__).resolve().parents[1] / "src"
+# Matches the default of ``bench --budget-ms``
+IMPORT_BUDGET_MS = 100.0
+
+
+def test_offline_commands_import_within_budget():
+    for name, (modules, offline) in IMPORT_TARGETS.items():
+        if not offline:
+            continue
+        ms, loaded_playwright, err = measure_import(modules, repeat=3)
+        assert not err, f"{name}: {err}"
+        assert not loaded_playwright, f"{name} imports playwright"
+        assert ms <= IMPORT_BUDGET_MS, f"{name} took {ms:.1f}ms to import"
+
+
+def test_help_does_not_load_playwright():
+    env = dict(os.environ, PYTHONPATH=str(SRC))
+    code = "import runpy, sys\nsys.argv = ['cli', '--help']\ntry:\n    runpy.run_module('instagram_sponsor.cli', run_name='__main__')\nexcept SystemExit:\n    pass\nprint('playwright' in sys.modules)"
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True)
+    assert proc.stdout.strip().splitlines()[-1] == "False"
+
+
+def _aggregate(path: Path) -> None:
+    from instagram_sponsor.records import Post, ProfileResult
+    from instagram_sponsor.writer import AggregateWriter
+
+    with AggregateWriter(path, "ndjson", hotels=lambda: [{"hotel_id": "h_1", "name": "Villa"}]) as w:
+        post = Post("https://www.instagram.com/p/a/", "2024-05-01T00:00:00Z", "stay #ad", hotel_id="h_1")
+        w.add(ProfileResult("https://www.instagram.com/creator/", "2024-05-02T00:00:00Z", [post]))
+
+
+def test_filter_refuses_to_overwrite_its_input(tmp_path):
+    from instagram_sponsor.cli import main
+
+    agg = tmp_path / "agg.ndjson"
+    _aggregate(agg)
+    before = agg.read_bytes()
+    assert main(["filter", "--input", str(agg), "--output", str(agg), "--all-posts"]) == 2
+    assert agg.read_bytes() == before
+
+
+def test_filter_replaces_output_only_when_done(tmp_path):
+    from instagram_sponsor.cli import main
+
+    agg, out = tmp_path / "agg.ndjson", tmp_path / "out.ndjson"
+    _aggregate(agg)
+    out.write_text("previous\n")
+    assert main(["filter", "--input", str(agg), "--output", str(out), "--all-posts"]) == 0
+    assert out.read_bytes() == agg.read_bytes()
+    assert (tmp_path / "out.hotels.json").exists()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["agg.hotels.json", "agg.ndjson", "out.hotels.json", "out.ndjson"]
@@ -0,0 +1,28 @@
+import time
+
+from instagram_sponsor import crawler
+from instagram_sponsor.crawler import crawl_contacts
+
+
+def test_contacts_found_on_different_pages_stop_the_crawl(stub_server, monkeypatch):
+    monkeypatch.setenv("HTTP_CACHE_DIR", "off")
+    html = {"Content-Type": "text/html"}
+    stub_server.route(
+        "/", headers=html, body=b'<a href="/contact">Contact</a> <a href="/impressum">Impressum</a> <a href="/about">About</a>'
+    )
+    stub_server.route("/contact", headers=html, body=b'<a href="mailto:stay@hotel.test">Write to us</a>')
+    stub_server.route("/impressum", headers=html, body=b'<a href="tel:+44 20 7946 0000">Call</a>')
+
+    def slow(_body):
+        time.sleep(1.5)
+        return 200, html, b"<p>Our story</p>"
+
+    stub_server.routes["/about"] = slow
+    monkeypatch.setattr(crawler, "CRAWL_THREADS", 3)
+    monkeypatch.setattr(crawler, "_pool", None)
+
+    started = time.monotonic()
+    email, phone, _ = crawl_contacts(stub_server.url + "/", robots=None)
+    assert (email, phone) == ("stay@hotel.test", "+44 20 7946 0000")
+    # The slow page was not waited for once email and phone had both turned up
+    assert time.monotonic() - started < 1.0
@@ -0,0 +1,177 @@
+import json
+import re
+from datetime import datetime, timedelta, timezone
+
+import filter_posts
+from filter_posts import DeepseekClient
+
+CHAT = "/v1/chat/completions"
+_ITEM_RE = re.compile(r"\[(\d+)\]\n(.*?)(?=\n\n\[\d+\]\n|\Z)", re.DOTALL)
+
+
+def _completion(content) -> bytes:
+    text = content if isinstance(content, str) else json.dumps(content)
+    return json.dumps({"choices": [{"message": {"content": text}}]}).encode("utf-8")
+
+
+def _prompt(body: bytes) -> str:
+    return json.loads(body)["messages"][1]["content"]
+
+
+def _posts(body: bytes):
+    """Posts of a chat request: [(index, text)] for a batch, or None for a single post."""
+    prompt = _prompt(body)
+    if not prompt.startswith("For each numbered"):
+        return None
+    return [(int(i), text) for i, text in _ITEM_RE.findall(prompt.split("Posts:\n\n", 1)[1])]
+
+
+def _single(body: bytes) -> str:
+    return _prompt(body).split("Content:\n\n", 1)[1]
+
+
+def _model(answer_batch):
+    """Chat handler: ``answer_batch(posts)`` decides a batch; a single post is relevant if it says AI."""
+
+    def handle(body: bytes):
+        posts = _posts(body)
+        if posts is None:
+            return 200, {}, _completion({"relevant": "AI" in _single(body)})
+        return answer_batch(posts)
+
+    return handle
+
+
+def _client(stub_server) -> DeepseekClient:
+    return DeepseekClient("test-key", base_url=stub_server.url, backoff=0)
+
+
+def test_rate_limited_request_is_retried(stub_server):
+    answers = iter([(429, {"Retry-After": "0"}, b""), (429, {}, b""), (200, {}, _completion({"relevant": True}))])
+    stub_server.routes[CHAT] = lambda _body: next(answers)
+    assert _client(stub_server).classify("AI for brokers") == (True, '{"relevant": true}')
+    assert stub_server.hits(CHAT) == 3
+    _, _, headers, _ = stub_server.requests[0]
+    assert headers["Authorization"] == "Bearer test-key"
+
+
+def test_rate_limit_gives_up_after_max_retries(stub_server):
+    stub_server.route(CHAT, status=429, headers={"Retry-After": "0"})
+    client = DeepseekClient("k", base_url=stub_server.url, max_retries=2, backoff=0)
+    # The heuristic answers, and nothing is cached from it
+    assert client.classify("machine learning") == (True, "")
+    assert stub_server.hits(CHAT) == 3
+
+
+def test_missing_verdicts_are_split_until_answered(stub_server):
+    # The model drops every post mentioning "skip" from batched answers
+    def answer(posts):
+        return 200, {}, _completion([
+            {"index": i, "relevant": "AI" in text} for i, text in posts if "skip" not in text
+        ])
+
+    stub_server.routes[CHAT] = _model(answer)
+    contents = ["AI one", "skip AI two", "skip three", "other four", "skip AI five", "skip six"]
+    results = _client(stub_server).classify_batch(contents)
+    assert [ok for ok, _ in results] == [True, True, False, False, True, False]
+    assert all(raw for _, raw in results)
+    # All 6 -> the 4 skipped as two batches of 2 -> each alone
+    assert stub_server.hits(CHAT) == 1 + 2 + 4
+
+
+def test_failed_batch_is_split_around_the_bad_item(stub_server):
+    def answer(posts):
+        if any("poison" in text for _, text in posts):
+            return 500, {}, b"boom"
+        return 200, {}, _completion([{"index": i, "relevant": "AI" in text} for i, text in posts])
+
+    def handle(body):
+        posts = _posts(body)
+        if posts is None and "poison" in _single(body):
+            return 500, {}, b"boom"
+        return _model(answer)(body)
+
+    stub_server.routes[CHAT] = handle
+    contents = ["AI one", "other two", "poison AI three", "other four"]
+    results = _client(stub_server).classify_batch(contents)
+    assert [ok for ok, _ in results] == [True, False, True, False]
+    # Only the bad item fell back to the heuristic
+    assert [bool(raw) for _, raw in results] == [True, True, False, True]
+
+
+def test_exhausted_rate_limit_on_a_batch_is_not_split(stub_server):
+    stub_server.route(CHAT, status=429, headers={"Retry-After": "0"})
+    client = DeepseekClient("k", base_url=stub_server.url, max_retries=1, backoff=0)
+    assert client.classify_batch(["AI one", "other two", "AI three"]) == [(True, ""), (False, ""), (True, "")]
+    assert stub_server.hits(CHAT) == 2
+
+
+def test_classify_contents_caches_only_model_answers(stub_server, tmp_path):
+    def answer(posts):
+        if any("poison" in text for _, text in posts):
+            return 500, {}, b"boom"
+        return 200, {}, _completion([{"index": i, "relevant": "AI" in text} for i, text in posts])
+
+    stub_server.routes[CHAT] = lambda body: (
+        (500, {}, b"boom") if _posts(body) is None else _model(answer)(body)
+    )
+    cache = filter_posts.ClassificationCache(str(tmp_path / "cache.json"))
+    fallbacks = set()
+    verdicts = filter_posts._classify_contents(
+        ["AI one", "other two", "poison AI"], _client(stub_server), cache, workers=2, batch_size=4, fallbacks=fallbacks
+    )
+    assert verdicts == {"AI one": True, "other two": False, "poison AI": True}
+    assert fallbacks == {"poison AI"}
+    assert cache.get("AI one", "deepseek-chat") is True
+    assert cache.get("poison AI", "deepseek-chat") is None
+
+
+_YESTERDAY = (datetime.now(timezone.utc) - timedelta(days=1)).isoformat()
+
+
+def _linkedin(profile: str, posts):
+    return {
+        "profile_url": f"https://www.linkedin.com/in/{profile}",
+        "posts": [
+            {
+                "link": f"https://www.linkedin.com/posts/{profile}-{slug}",
+                "content": f"{slug}: AI agents for real estate brokers",
+                "timestamp": _YESTERDAY,
+            }
+            for slug in posts
+        ],
+    }
+
+
+def _filter(tmp_path, payload, output, *extra):
+    src = tmp_path / "all.json"
+    src.write_text(json.dumps({"profiles": payload}))
+    argv = ["--input", str(src), "--output", str(output), "--no-llm", "--no-cache", "--no-dotenv", *extra]
+    assert filter_posts.main(argv) == 0
+    return json.loads(output.read_text())
+
+
+def test_incremental_output_equals_a_full_run(tmp_path):
+    incremental = tmp_path / "incremental.json"
+    _filter(tmp_path, [_linkedin("ann", ["a2", "a3"]), _linkedin("bob", ["b1"])], incremental, "--incremental")
+
+    # New posts ahead of old ones, a new profile in the middle, a removed post
+    later = [_linkedin("ann", ["a1", "a2", "a3"]), _linkedin("cat", ["c1"]), _linkedin("bob", ["b0", "b1"])]
+    later[2]["posts"].pop()
+    merged = _filter(tmp_path, later, incremental, "--incremental")
+    full = _filter(tmp_path, later, tmp_path / "full.json")
+    assert merged == full
+    assert [p["link"][-2:] for prof in merged["profiles"] for p in prof["posts"]] == ["a1", "a2", "a3", "c1", "b0"]
+
+
+def test_client_messages_follow_the_log_level(stub_server, capsys, monkeypatch):
+    monkeypatch.setattr(filter_posts, "log", filter_posts.TraceLog("error"))
+    answers = iter([(429, {"Retry-After": "0"}, b""), (200, {}, _completion({"relevant": True}))])
+    stub_server.routes[CHAT] = lambda _body: next(answers)
+    assert _client(stub_server).classify("AI for brokers")[0] is True
+    stub_server.route(CHAT, status=500)
+    _client(stub_server).classify("AI for brokers")
+    filter_posts.log.flush()
+    err = capsys.readouterr().err
+    assert "rate limited" not in err
+    assert "[deepseek] API error: HTTP Error 500" in err
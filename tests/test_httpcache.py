@@ -0,0 +1,93 @@
+import time
+from email.utils import formatdate
+from urllib.request import Request
+
+from instagram_sponsor.httpcache import HttpCache
+
+
+def _get(cache: HttpCache, url: str, n: int = -1) -> bytes:
+    with cache.open(Request(url)) as resp:
+        return resp.read(n)
+
+
+def test_etag_revalidation_serves_stored_body(stub_server, tmp_path):
+    def page(_body):
+        _, _, headers, _ = stub_server.requests[-1]
+        if headers.get("If-None-Match") == '"v1"':
+            return 304, {"ETag": '"v1"'}, b""
+        return 200, {"ETag": '"v1"', "Content-Type": "text/html"}, b"<html>hotel</html>"
+
+    stub_server.routes["/page"] = page
+    cache = HttpCache(tmp_path)
+    assert _get(cache, f"{stub_server.url}/page") == b"<html>hotel</html>"
+    assert _get(cache, f"{stub_server.url}/page") == b"<html>hotel</html>"
+    assert stub_server.hits("/page") == 2
+    assert cache.stats["fetched"] == 1 and cache.stats["revalidated"] == 1
+    assert cache.stats["bytes_from_cache"] == len(b"<html>hotel</html>")
+
+
+def test_max_age_and_expires_answer_without_a_request(stub_server, tmp_path):
+    stub_server.route("/max-age", headers={"Cache-Control": "max-age=600"}, body=b"a")
+    stub_server.route("/expires", headers={"Expires": formatdate(time.time() + 600, usegmt=True)}, body=b"b")
+    cache = HttpCache(tmp_path)
+    for path in ("/max-age", "/expires"):
+        _get(cache, stub_server.url + path)
+        _get(cache, stub_server.url + path)
+        assert stub_server.hits(path) == 1
+    assert cache.stats["fresh"] == 2
+
+
+def test_past_expires_and_max_age_zero_are_refetched(stub_server, tmp_path):
+    stub_server.route("/expired", headers={"Expires": formatdate(time.time() - 60, usegmt=True)}, body=b"x")
+    # max-age wins over a later Expires
+    stub_server.route(
+        "/stale",
+        headers={"Cache-Control": "max-age=0", "Expires": formatdate(time.time() + 600, usegmt=True)},
+        body=b"y",
+    )
+    cache = HttpCache(tmp_path)
+    for path in ("/expired", "/stale"):
+        _get(cache, stub_server.url + path)
+        _get(cache, stub_server.url + path)
+        assert stub_server.hits(path) == 2
+    assert cache.stats["fresh"] == 0
+
+
+def test_uncacheable_responses_are_not_stored(stub_server, tmp_path):
+    stub_server.route("/no-store", headers={"Cache-Control": "no-store, max-age=600"}, body=b"x")
+    stub_server.route("/big", headers={"ETag": '"b"'}, body=b"x" * 100)
+    stub_server.route("/places", headers={"Cache-Control": "max-age=600"}, body=b'{"results": []}')
+    cache = HttpCache(tmp_path, max_body_bytes=50)
+    _get(cache, f"{stub_server.url}/no-store")
+    _get(cache, f"{stub_server.url}/big")
+    _get(cache, f"{stub_server.url}/places?query=hotel&key=SECRET")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_partially_read_body_is_not_stored(stub_server, tmp_path):
+    stub_server.route("/long", headers={"ETag": '"l"'}, body=b"x" * 1000)
+    cache = HttpCache(tmp_path)
+    assert _get(cache, f"{stub_server.url}/long", 10) == b"x" * 10
+    assert list(tmp_path.iterdir()) == []
+    assert _get(cache, f"{stub_server.url}/long") == b"x" * 1000
+    assert len(list(tmp_path.glob("*.body"))) == 1
+
+
+def test_least_recently_used_pages_are_evicted_over_the_size_limit(stub_server, tmp_path):
+    for path in ("/a", "/b", "/c"):
+        stub_server.route(path, headers={"Cache-Control": "max-age=600"}, body=b"x" * 400)
+    cache = HttpCache(tmp_path, max_bytes=1000)
+    _get(cache, f"{stub_server.url}/a")
+    _get(cache, f"{stub_server.url}/b")
+    # A hit makes /a the most recently used, so /b goes first
+    _get(cache, f"{stub_server.url}/a")
+    _get(cache, f"{stub_server.url}/c")
+    assert cache.stats["evicted"] == 1
+    assert len(list(tmp_path.glob("*.body"))) == 2
+
+    # A new instance picks up the entries left on disk
+    reopened = HttpCache(tmp_path, max_bytes=1000)
+    for path in ("/a", "/c"):
+        _get(reopened, stub_server.url + path)
+    _get(reopened, f"{stub_server.url}/b")
+    assert (stub_server.hits("/a"), stub_server.hits("/b"), stub_server.hits("/c")) == (1, 2, 1)
@@ -0,0 +1,64 @@
+from instagram_sponsor import precheck
+from instagram_sponsor.precheck import EXISTS, MISSING, PRIVATE, REDIRECTED, UNKNOWN, PreChecker, triage
+
+
+def _profiles(stub_server):
+    stub_server.route("/ok/", body=b'<html>{"is_private":false} public profile</html>')
+    stub_server.route("/private/", body=b"<html>This account is private</html>")
+    stub_server.route("/gone/", status=404)
+    stub_server.route("/old/", status=301, headers={"Location": "/new/"})
+    stub_server.route("/new/", body=b"<html>public profile</html>")
+    stub_server.route("/busy/", status=429)
+
+
+def test_triage_verdicts(stub_server):
+    _profiles(stub_server)
+    base = stub_server.url
+    assert triage(f"{base}/ok/") == (EXISTS, "")
+    assert triage(f"{base}/private/") == (PRIVATE, "")
+    assert triage(f"{base}/gone/") == (MISSING, "HTTP 404")
+    assert triage(f"{base}/old/") == (REDIRECTED, f"{base}/new/")
+    assert triage(f"{base}/busy/") == (UNKNOWN, "HTTP 429")
+
+
+def test_triage_follows_canonical_redirect_and_login_wall(stub_server):
+    stub_server.route("/ok", status=301, headers={"Location": "/ok/"})
+    stub_server.route("/ok/", body=b"public profile")
+    stub_server.route("/walled/", status=302, headers={"Location": "/accounts/login/?next=/walled/"})
+    stub_server.route("/unknown/", status=302, headers={"Location": "/"})
+    assert triage(f"{stub_server.url}/ok") == (EXISTS, "")
+    assert triage(f"{stub_server.url}/walled/") == (UNKNOWN, "login wall")
+    assert triage(f"{stub_server.url}/unknown/") == (MISSING, "redirect to homepage")
+
+
+def test_filter_skips_and_redirects(stub_server, tmp_path):
+    _profiles(stub_server)
+    base = stub_server.url
+    checker = PreChecker(tmp_path / "precheck.json", workers=2, cooldown_s=0)
+    urls = [f"{base}/{p}/" for p in ("ok", "private", "gone", "old", "busy")]
+    assert list(checker.filter(urls)) == [f"{base}/ok/", f"https://{base[7:]}/new/", f"{base}/busy/"]
+    # Unknown verdicts are not cached; the others are answered without a request
+    checker = PreChecker(tmp_path / "precheck.json", workers=2)
+    assert checker.check(f"{base}/private/") == (PRIVATE, "")
+    assert stub_server.hits("/private/") == 1
+
+
+def test_filter_deduplicates_redirect_targets(stub_server):
+    _profiles(stub_server)
+    stub_server.route("/older/", status=301, headers={"Location": "/new/"})
+    base = stub_server.url
+    target = f"https://{base[7:]}/new/"
+    checker = PreChecker(None, workers=2)
+    assert list(checker.filter([f"{base}/old/", f"{base}/older/", target])) == [target]
+    assert list(checker.filter([f"{base}/old/", f"{base}/ok/"], skip={target})) == [f"{base}/ok/"]
+
+
+def test_throttled_checker_cools_down(stub_server, monkeypatch):
+    _profiles(stub_server)
+    base = stub_server.url
+    checker = PreChecker(None, cooldown_s=600)
+    assert checker.check(f"{base}/busy/") == (UNKNOWN, "HTTP 429")
+    assert checker.check(f"{base}/ok/") == (UNKNOWN, "cooling down after HTTP 429")
+    assert stub_server.hits("/ok/") == 0
+    monkeypatch.setattr(precheck.time, "monotonic", lambda: checker._throttled_until + 1)
+    assert checker.check(f"{base}/ok/") == (EXISTS, "")
@@ -0,0 +1,46 @@
+import time
+
+from instagram_sponsor import selectors
+from instagram_sponsor.metrics import METRICS
+from instagram_sponsor.selectors import SelectorResolver
+from instagram_sponsor.timeouts import AdaptiveTimeouts
+
+
+class _Element:
+    def __init__(self, text, slow=False):
+        self._text, self._slow = text, slow
+
+    @property
+    def first(self):
+        return self
+
+    def count(self):
+        return 1
+
+    def inner_text(self, timeout):
+        if self._slow:
+            time.sleep(timeout / 1000)
+            raise TimeoutError("inner_text timed out")
+        return self._text
+
+
+class _Root:
+    def __init__(self, elements):
+        self._elements = elements
+
+    def locator(self, sel):
+        return self._elements[sel]
+
+
+def test_text_counts_a_timed_out_candidate_as_a_timeout(monkeypatch):
+    timeouts = AdaptiveTimeouts(defaults={"caption": 50})
+    monkeypatch.setattr(selectors, "TIMEOUTS", timeouts)
+    resolver = SelectorResolver({"dialog": {"caption": ("slow", "fast")}}, required={})
+    before = METRICS.value("timeouts_total", stage="caption")
+
+    root = _Root({"slow": _Element("", slow=True), "fast": _Element(" a caption ")})
+    assert resolver.text(root, "caption", "caption") == "a caption"
+    assert METRICS.value("timeouts_total", stage="caption") == before + 1
+    # Only the read that succeeded is a latency sample
+    assert len(timeouts._samples["caption"]) == 1
+    assert timeouts._samples["caption"][0] < 50
@@ -0,0 +1,24 @@
+import codecs
+
+import pytest
+
+from instagram_sponsor.utils import iter_profile_urls
+
+
+def test_profile_urls_from_utf16_and_latin1(tmp_path):
+    utf16 = tmp_path / "utf16.csv"
+    utf16.write_bytes(codecs.BOM_UTF16_LE + "Instagram Url\n@café\n@café\n".encode("utf-16-le"))
+    latin1 = tmp_path / "latin1.csv"
+    latin1.write_bytes("Instagram Url\n@café\n".encode("latin-1"))
+    assert list(iter_profile_urls(str(utf16), "Instagram Url")) == ["https://www.instagram.com/café/"]
+    assert list(iter_profile_urls(str(latin1), "Instagram Url")) == ["https://www.instagram.com/café/"]
+
+
+def test_bad_bytes_past_the_sample_fail_at_their_row(tmp_path):
+    path = tmp_path / "late.csv"
+    rows = b"".join(b"@creator%d\n" % i for i in range(20000))
+    path.write_bytes(b"Instagram Url\n" + rows + b"@caf\xe9\n")
+    urls = iter_profile_urls(str(path), "Instagram Url")
+    with pytest.raises(ValueError, match="not valid utf-8"):
+        for _ in urls:
+            pass
@@ -0,0 +1,35 @@
+import time
+
+from instagram_sponsor.records import ProfileResult
+from instagram_sponsor.workqueue import WorkQueue
+
+
+def test_claims_waits_for_a_dead_workers_lease(tmp_path):
+    db = tmp_path / "queue.db"
+    dead = WorkQueue(db, lease_seconds=0.5, worker_id="dead")
+    live = WorkQueue(db, lease_seconds=0.5, worker_id="live")
+    dead.enqueue(["u1", "u2"])
+    assert dead.claim() == "u1"
+
+    done = []
+    for url in live.claims():
+        assert live.complete(url, ProfileResult(url))
+        done.append(url)
+    assert done == ["u2", "u1"]
+    assert live.next_claimable_at() is None
+
+
+def test_complete_rejects_a_lease_taken_over_by_another_worker(tmp_path):
+    db = tmp_path / "queue.db"
+    slow = WorkQueue(db, lease_seconds=0.01, worker_id="slow")
+    fast = WorkQueue(db, lease_seconds=60, worker_id="fast")
+    slow.enqueue(["u1", "u2"])
+    assert slow.claim() == "u1"
+    assert slow.claim() == "u2"
+
+    # u1 expires and moves to another worker; u2's lapsed lease is still slow's
+    time.sleep(max(0.0, fast.next_claimable_at() - time.time()) + 0.05)
+    assert fast.claim() == "u1"
+    assert not slow.complete("u1", ProfileResult("u1"))
+    assert slow.complete("u2", ProfileResult("u2"))
+    assert fast.complete("u1", ProfileResult("u1"))